@@ -0,0 +1,103 @@
+"""
+	Compares prefix discovery through the old per-lookup `find` subprocesses against the
+	single-pass PrefixIndex. Uses a synthetic prefix unless --prefix is given. Also checks that the
+	home search skips the default excludes (e.g. the Trash); exits w/ 1 on any mismatch.
+
+	usage: python bench/bench_discovery.py [--prefix PATH] [--files N] [--runs N]
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from common import load_gmbuild, make_synthetic_prefix, best_of, write_file
+
+def run(command):
+	return str(subprocess.run([command], shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE).stdout)[2:-3]
+
+# The lookups performed by a cold start + `build wine` before PrefixIndex existed:
+def discover_subprocess(prefix):
+	result = {}
+	result["gamemaker"] = run("find \"{}\" -regextype posix-egrep -type f -regex \".*/GameMaker(Studio|-LTS)?\\.exe\" | head -1".format(prefix))
+	result["manifest"] = run("find \"{}\" -name \"Manifest.enc\" | head -1".format(prefix))
+	result["runtimes"] = run("find \"{}\" -name \"runtimes\" | head -1".format(prefix))
+	runtime = os.path.join(result["runtimes"], sorted(os.listdir(result["runtimes"]))[0])
+	result["asset_compiler"] = run("find \"{}\" -type f -name \"GMAssetCompiler.exe\" | head -1".format(runtime))
+	result["runner"] = run("find \"{}\" -type f -name \"Runner.exe\" | head -2 | grep -v x64".format(runtime))
+	result["runner64"] = run("find \"{}\" -type f -name \"Runner.exe\" | head -2 | grep x64".format(runtime))
+	result["igor"] = run("find \"{}\" -type f -name \"Igor.exe\" | head -1".format(runtime))
+	result["bff"] = run("find \"{}\" -name \"build.bff\" | head -1".format(prefix))
+	return result
+
+def discover_index(gmbuild, prefix):
+	index = gmbuild.PrefixIndex(prefix).scan()
+	result = {}
+	result["gamemaker"] = index.find("gamemaker")
+	result["manifest"] = index.find("manifest")
+	result["runtimes"] = index.find("runtimes")
+	runtime = os.path.join(result["runtimes"], sorted(os.listdir(result["runtimes"]))[0])
+	result["asset_compiler"] = index.find("asset_compiler", runtime)
+	runners = index.find_all("runner", runtime)
+	result["runner"] = next((path for path in runners if not "x64" in path), "")
+	result["runner64"] = next((path for path in runners if "x64" in path), "")
+	result["igor"] = index.find("igor", runtime)
+	result["bff"] = index.find("bff")
+	return result, index.entry_count
+
+# Searches a home w/ a project in the open and copies in excluded directories; returns the
+# excluded projects the search still found.
+def check_search_excludes(gmbuild):
+	home = tempfile.mkdtemp(prefix="gmbuild-bench-")
+	try:
+		write_file(os.path.join(home, "Projects", "Game", "Game.yyp"))
+		excluded = [os.path.join(home, path, "Game.yyp") for path in [".local/share/Trash/files/Game", "Projects/Game/node_modules/Game"]]
+		for path in excluded:
+			write_file(path)
+		found = [path for kind, path in gmbuild.search_home([home], gmbuild.search_excludes, gmbuild.search_max_depth)]
+	finally:
+		shutil.rmtree(home)
+
+	return [os.path.relpath(path, home) for path in found if path in excluded]
+
+def main():
+	parser = argparse.ArgumentParser(description="PrefixIndex vs. find timing comparison")
+	parser.add_argument("--prefix", help="existing WINE prefix to scan (default: synthetic)")
+	parser.add_argument("--files", type=int, default=100000, help="filler files in the synthetic prefix")
+	parser.add_argument("--runs", type=int, default=3, help="runs per method, best is reported")
+	args = parser.parse_args()
+
+	gmbuild = load_gmbuild()
+	temp_dir = None
+	prefix = args.prefix
+	if prefix is None:
+		temp_dir = tempfile.mkdtemp(prefix="gmbuild-bench-")
+		prefix = make_synthetic_prefix(os.path.join(temp_dir, "prefix"), args.files)
+
+	try:
+		time_find, result_find = best_of(args.runs, lambda: discover_subprocess(prefix))
+		time_index, (result_index, entry_count) = best_of(args.runs, lambda: discover_index(gmbuild, prefix))
+	finally:
+		if temp_dir is not None:
+			shutil.rmtree(temp_dir)
+
+	mismatch = [key for key in result_find if result_find[key] != result_index[key]]
+	excluded_found = check_search_excludes(gmbuild)
+	print(json.dumps({
+		"benchmark" : "discovery",
+		"prefix" : args.prefix or "synthetic",
+		"entries" : entry_count,
+		"find_subprocess_s" : round(time_find, 4),
+		"prefix_index_s" : round(time_index, 4),
+		"speedup" : round(time_find / max(time_index, 1e-9), 2),
+		"mismatched_lookups" : mismatch,
+		"excluded_projects_found" : excluded_found,
+	}, indent=4))
+
+	return 1 if len(mismatch) > 0 or len(excluded_found) > 0 else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
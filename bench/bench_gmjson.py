@@ -0,0 +1,64 @@
+"""
+	Compares reading a large .yyp the old way (two regex passes over the whole text, then
+	json.loads) w/ GMJsonReader: for the configs alone, for the members get_project_files() needs
+	and for the whole document. Also checks that both agree and that strings holding ",}" / ",]"
+	survive.
+
+	usage: python bench/bench_gmjson.py [--resources N] [--repeat N] [--yyp PATH]
+"""
+
+import re
+import sys
+import json
+import argparse
+
+from common import load_gmbuild, make_synthetic_yyp, best_of
+
+# json_strip_dead_commas() before the reader existed:
+def legacy_read(text):
+	text = re.sub(",[\\s\\t\\n]*\\}", "}", text)
+	text = re.sub(",[\\s\\t\\n]*\\]", "]", text)
+	return json.loads(text)
+
+# Best of several runs, in milliseconds:
+def time_best(function, repeat):
+	return round(best_of(repeat, function)[0] * 1000, 2)
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark reading GameMaker JSON")
+	parser.add_argument("--resources", type=int, default=30000, help="resources in the synthetic .yyp")
+	parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (the best is kept)")
+	parser.add_argument("--yyp", help="read this .yyp instead of a synthetic one")
+	args = parser.parse_args()
+
+	gmbuild = load_gmbuild()
+	if args.yyp is not None:
+		with open(args.yyp, "r") as file:
+			text = file.read()
+	else:
+		resources = [("res_{}".format(i), "objects/res_{}/res_{}.yy".format(i, i)) for i in range(0, args.resources)]
+		text = make_synthetic_yyp(resources, configs=("Default", [("Release", [("Steam, ]}", [])])]), included=[("datafiles", "notes, }.txt")])
+
+	members = ["resources", "Options", "IncludedFiles"]
+	results = {
+		"benchmark" : "gmjson",
+		"bytes" : len(text),
+		"legacy_full_ms" : time_best(lambda: legacy_read(text), args.repeat),
+		"reader_full_ms" : time_best(lambda: gmbuild.GMJsonReader(text).get_document(), args.repeat),
+		"legacy_configs_ms" : time_best(lambda: legacy_read(text)["configs"], args.repeat),
+		"reader_configs_ms" : time_best(lambda: gmbuild.GMJsonReader(text).get("configs"), args.repeat),
+		"legacy_project_files_ms" : time_best(lambda: [document.get(key) for document in [legacy_read(text)] for key in members], args.repeat),
+		"reader_project_files_ms" : time_best(lambda: [gmbuild.GMJsonReader(text).get(key) for key in members], args.repeat),
+	}
+
+	reader = gmbuild.GMJsonReader(text)
+	document = gmbuild.GMJsonReader(text).get_document()
+	results["same_members"] = all([reader.get(key) == document.get(key) for key in document])
+	results["strings_intact"] = json.dumps(document).count(", ]}") == text.count(", ]}") and json.dumps(document).count(", }") == text.count(", }")
+	results["legacy_strings_intact"] = json.dumps(legacy_read(text)).count(", ]}") == text.count(", ]}")
+	print(json.dumps(results, indent=4))
+
+	return 0 if results["same_members"] and results["strings_intact"] else 1
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+	Times project change detection on a synthetic project (20k files by default): a plain full
+	read + hash of every file (what the build fingerprint did before ProjectHasher), then
+	ProjectHasher cold (empty stat cache), warm (nothing changed) and warm after touching a few
+	files.
+
+	usage: python bench/bench_hasher.py [--project PATH.yyp] [--files N] [--touch N] [--jobs N]
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+
+from common import load_gmbuild, make_synthetic_project, timed
+
+def hash_full(files):
+	digest = hashlib.sha256()
+	for path in files:
+		with open(path, "rb") as file:
+			for chunk in iter(lambda: file.read(1 << 20), b""):
+				digest.update(chunk)
+	return digest.hexdigest()
+
+def main():
+	parser = argparse.ArgumentParser(description="ProjectHasher cold / warm timings")
+	parser.add_argument("--project", help="existing .yyp to hash (default: synthetic)")
+	parser.add_argument("--files", type=int, default=20000, help="files in the synthetic project")
+	parser.add_argument("--touch", type=int, default=20, help="files to modify for the incremental run")
+	parser.add_argument("--jobs", type=int, default=0, help="hashing threads (default: core count)")
+	args = parser.parse_args()
+
+	gmbuild = load_gmbuild()
+	temp_dir = tempfile.mkdtemp(prefix="gmbuild-bench-")
+	project_path = args.project
+	if project_path is None:
+		project_path = make_synthetic_project(os.path.join(temp_dir, "project"), args.files)
+
+	try:
+		time_list, (files, resources) = timed(lambda: gmbuild.get_project_files(project_path))
+		project_dir = os.path.dirname(project_path)
+		size = sum(os.path.getsize(path) for path in files)
+		time_full, digest_full = timed(lambda: hash_full(files))
+
+		hasher = gmbuild.ProjectHasher(os.path.join(temp_dir, "hashes.json"), args.jobs)
+		time_cold, scan_cold = timed(lambda: hasher.scan(project_dir, files))
+		hasher = gmbuild.ProjectHasher(hasher.path, args.jobs) # Fresh process: cache comes from disk
+		time_warm, scan_warm = timed(lambda: hasher.scan(project_dir, files))
+
+		touched = [path for path in files if not path.endswith(".yyp")][::max(len(files) // max(args.touch, 1), 1)][:args.touch]
+		if args.project is None:
+			for path in touched:
+				with open(path, "ab") as file:
+					file.write(b"\n")
+		hasher = gmbuild.ProjectHasher(hasher.path, args.jobs)
+		time_touched, scan_touched = timed(lambda: hasher.scan(project_dir, files))
+		changed = gmbuild.get_changed_resources(scan_touched["modified"], resources)
+	finally:
+		shutil.rmtree(temp_dir)
+
+	print(json.dumps({
+		"benchmark" : "hasher",
+		"project" : args.project or "synthetic",
+		"files" : len(files),
+		"bytes" : size,
+		"list_files_s" : round(time_list, 4),
+		"full_read_s" : round(time_full, 4),
+		"cold_s" : round(time_cold, 4),
+		"warm_s" : round(time_warm, 4),
+		"warm_hashed" : scan_warm["hashed"],
+		"touched_s" : round(time_touched, 4),
+		"touched_hashed" : scan_touched["hashed"],
+		"touched_resources" : len(changed),
+		"warm_speedup" : round(time_full / max(time_warm, 1e-9), 2),
+	}, indent=4))
+
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
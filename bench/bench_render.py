@@ -0,0 +1,177 @@
+"""
+	Measures the cost of rendering a chatty build: every frame appends a burst of lines to the
+	output history and redraws the view, like window_run_wine does ten times a second. Compares
+	the original full-redraw print_history against the damage-tracked HistoryView and reports
+	frames per second, CPU time per frame and curses calls / characters sent per frame. A narrow
+	terminal (--width 60) makes most lines overflow, which is where the old addstr retry loop hurt.
+	Exits w/ 1 if HistoryView doesn't draw the same screen, also after switching histories.
+
+	usage: python bench/bench_render.py [--frames N] [--lines-per-frame N] [--width W] [--height H]
+"""
+
+import sys
+import time
+import json
+import argparse
+
+from common import load_gmbuild, FakeWindow
+
+# addstr before clip_text, kept for comparison: retries w/ one character less until curses accepts it
+def legacy_addstr(stdscr, y, x, str):
+	is_success = False
+	cutoff = 0
+	while not is_success and cutoff < len(str):
+		try:
+			if cutoff == 0:
+				stdscr.addstr(y, x, str)
+				is_success = True
+			else:
+				stdscr.addstr(y, x, str[:-cutoff])
+				is_success = True
+		except:
+			cutoff += 1
+
+# print_history before HistoryView, kept for comparison:
+def legacy_print_history(gmbuild, stdscr, output_history, start_index=-1, yoff=0):
+	curses = gmbuild.curses
+	addstr = legacy_addstr
+	height, width = stdscr.getmaxyx()
+	output_history_y = height - 2 + yoff
+
+	if start_index < 0:
+		start_index += len(output_history)
+	for i in range(start_index, 0, -1):
+		value = output_history[i]
+		if output_history_y < 1:
+			break
+
+		value = value.strip()
+		is_urgent = False
+		if value.startswith("[!]"):
+			stdscr.attron(curses.color_pair(2))
+			is_urgent = True
+
+		if len(": " + value) < width:
+			addstr(stdscr, output_history_y, 0, ": " + value)
+			addstr(stdscr, output_history_y, len(": " + value), " " * (width - len(": " + value) - 1))
+		else:
+			value_list = []
+			value_mod = value
+			while len(value_mod) >= width - 2:
+				value_list.append(value_mod[:width - 7])
+				value_mod = value_mod[width - 7:]
+
+			if len(value_mod) > 0:
+				value_list.append(value_mod)
+
+			for i in range(0, len(value_list)):
+				if output_history_y < 1:
+					break
+
+				subvalue = value_list[len(value_list) - 1 - i]
+				if len(subvalue) <= 0:
+					continue
+				if i == len(value_list) - 1:
+					subvalue = ": " + subvalue + "..."
+				elif i > 0:
+					subvalue = "  " + subvalue + "..."
+				else:
+					subvalue = "  " + subvalue
+
+				addstr(stdscr, output_history_y, 0, subvalue);
+				addstr(stdscr, output_history_y, len(subvalue), " " * (width - len(subvalue) - 1))
+
+				output_history_y -= 1
+
+			if is_urgent:
+				stdscr.attroff(curses.color_pair(2))
+			continue
+
+		output_history_y -= 1
+		if is_urgent:
+			stdscr.attroff(curses.color_pair(2))
+
+def make_line(index):
+	if index % 50 == 0:
+		return "[!] warning: something noteworthy happened at step {}".format(index)
+	if index % 7 == 0:
+		return "Compile Objects: gml_Object_obj_enemy_{}_Step_0 ".format(index) + "x" * 150
+	return "show_debug_message: frame {} position ({}, {})".format(index, index * 3 % 640, index * 7 % 480)
+
+def run_frames(gmbuild, args, render):
+	window = FakeWindow(args.height, args.width)
+	history = gmbuild.OutputHistory()
+	line_index = 0
+	calls = 0
+	chars = 0
+	cpu_start = time.process_time()
+	time_start = time.perf_counter()
+	for frame in range(0, args.frames):
+		for i in range(0, args.lines_per_frame):
+			history.append(make_line(line_index))
+			line_index += 1
+
+		window.reset_counters()
+		render(window, history)
+		calls += window.call_count
+		chars += window.char_count
+
+	duration = time.perf_counter() - time_start
+	cpu = time.process_time() - cpu_start
+	return {
+		"fps" : round(args.frames / duration, 1),
+		"cpu_ms_per_frame" : round(cpu * 1000 / args.frames, 3),
+		"curses_calls_per_frame" : round(calls / args.frames, 1),
+		"chars_per_frame" : round(chars / args.frames, 1),
+	}, window
+
+# Draws one history, then switches the same view to another one like [F] in window_run_wine does
+# and compares the screen against a fresh view of the second history; nothing of the first may
+# be left over (the wrap cache is keyed by history index).
+def check_history_switch(gmbuild, args):
+	first = gmbuild.OutputHistory()
+	second = gmbuild.OutputHistory()
+	for i in range(0, args.height * 2):
+		first.append(make_line(i))
+		second.append("game instance 2: frame {}".format(i))
+
+	window = FakeWindow(args.height, args.width)
+	view = gmbuild.HistoryView()
+	view.render(window, first, -1, 0)
+	view.render(window, second, -1, 0)
+	fresh_window = FakeWindow(args.height, args.width)
+	gmbuild.HistoryView().render(fresh_window, second, -1, 0)
+	return window.get_text(1, args.height - 2) == fresh_window.get_text(1, args.height - 2)
+
+def main():
+	parser = argparse.ArgumentParser(description="print_history vs. HistoryView render cost")
+	parser.add_argument("--frames", type=int, default=2000)
+	parser.add_argument("--lines-per-frame", type=int, default=3, help="new output lines per frame")
+	parser.add_argument("--width", type=int, default=160)
+	parser.add_argument("--height", type=int, default=50)
+	args = parser.parse_args()
+
+	gmbuild = load_gmbuild()
+	gmbuild.curses = FakeWindow.get_curses()
+
+	legacy, legacy_window = run_frames(gmbuild, args, lambda window, history: legacy_print_history(gmbuild, window, history, -1, 0))
+	view = gmbuild.HistoryView()
+	damage, damage_window = run_frames(gmbuild, args, lambda window, history: view.render(window, history, -1, 0))
+
+	same_screen = legacy_window.get_text(1, args.height - 2) == damage_window.get_text(1, args.height - 2)
+	same_screen_after_switch = check_history_switch(gmbuild, args)
+	print(json.dumps({
+		"benchmark" : "render",
+		"frames" : args.frames,
+		"lines_per_frame" : args.lines_per_frame,
+		"terminal" : "{}x{}".format(args.width, args.height),
+		"print_history" : legacy,
+		"history_view" : damage,
+		"same_screen" : same_screen,
+		"same_screen_after_switch" : same_screen_after_switch,
+	}, indent=4))
+
+	return 0 if same_screen and same_screen_after_switch else 1
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+	End-to-end benchmark of gmbuild-cli w/o a GameMaker install: a fake `wine` (fake_wine.py) is
+	put on PATH and a synthetic home w/ a WINE prefix, a project and an autoload is generated, so
+	nothing in the real ~/.gmbuild_* files is touched. Measures:
+
+		discovery	autoload + prefix / runtime / project / config discovery, cold and warm cache
+		startup	launching the interactive UI until the first prompt after the autoload
+		throughput	game output through OutputPump -> OutputHistory -> print_history, frame by
+			frame like window_run_wine: lines per second, render CPU per frame, memory growth
+		build	a headless `build`, full (a project file changed) and w/ the .win up to date
+
+	Prints one JSON object; --output also appends it as a line to a file so runs can be compared
+	over time.
+
+	usage: python bench/bench_suite.py [--only discovery,startup,throughput,build] [--runs N]
+		[--prefix-files N] [--project-files N] [--lines N] [--rate N] [--output PATH]
+"""
+
+import os
+import pty
+import sys
+import json
+import time
+import shutil
+import select
+import signal
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+from common import ROOT_PATH, load_gmbuild, install_fake_wine, make_bench_home, timed, get_rss, FakeWindow
+
+BENCHMARKS = ["discovery", "startup", "throughput", "build"]
+GMBUILD_PATH = os.path.join(ROOT_PATH, "gmbuild-cli.py")
+
+def summarize(durations):
+	return {
+		"runs" : len(durations),
+		"min_s" : round(min(durations), 4),
+		"median_s" : round(statistics.median(durations), 4),
+	}
+
+# Loads a fresh copy of gmbuild-cli (so nothing is cached in memory) set up for the bench home:
+def load_bench_gmbuild(user, env):
+	os.environ["PATH"] = env["PATH"]
+	gmbuild = load_gmbuild()
+	gmbuild.system_user = user
+	return gmbuild
+
+# Everything the UI resolves on startup w/ an autoload; the cold run starts w/o a discovery cache.
+def discover(gmbuild, is_cold):
+	history = gmbuild.OutputHistory()
+	gmbuild.import_autoload()
+	gmbuild.set_project_path(gmbuild.system_project_path)
+	if is_cold:
+		gmbuild.rescan_discovery(history)
+	else:
+		gmbuild.find_gm_user_dir(history)
+		gmbuild.scan_wine_data(history)
+		gmbuild.get_runtime_list()
+		for list in [gmbuild.get_prefix_list(), gmbuild.get_project_list()]:
+			if isinstance(list, gmbuild.StreamedList):
+				list.wait()
+	return gmbuild.get_config_list()
+
+def bench_discovery(args, user, env):
+	cold = []
+	warm = []
+	for i in range(0, args.runs):
+		duration, configs = timed(lambda: discover(load_bench_gmbuild(user, env), True))
+		cold.append(duration)
+		duration, configs = timed(lambda: discover(load_bench_gmbuild(user, env), False))
+		warm.append(duration)
+
+	return {"cold" : summarize(cold), "warm" : summarize(warm), "configs" : len(configs)}
+
+# Seconds from launching the UI in a pseudo terminal until it shows the prompt after the autoload
+def time_startup(env, timeout):
+	time_start = time.perf_counter()
+	pid, fd = pty.fork()
+	if pid == 0:
+		os.execve(sys.executable, [sys.executable, GMBUILD_PATH], env)
+
+	output = b""
+	duration = None
+	try:
+		while time.perf_counter() - time_start < timeout:
+			ready, _, _ = select.select([fd], [], [], 0.05)
+			if len(ready) == 0:
+				continue
+			try:
+				output += os.read(fd, 65536)
+			except OSError:
+				break
+			index = output.find(b"finished performing autoload")
+			if index >= 0 and output.find(b">", index) >= 0:
+				duration = time.perf_counter() - time_start
+				break
+	finally:
+		os.kill(pid, signal.SIGKILL)
+		os.waitpid(pid, 0)
+		os.close(fd)
+
+	return duration
+
+def bench_startup(args, user, env):
+	env = dict(env, USER=user, TERM="xterm", LINES="40", COLUMNS="120")
+	durations = [time_startup(env, args.timeout) for i in range(0, args.runs)]
+	failed = len([duration for duration in durations if duration is None])
+	durations = [duration for duration in durations if duration is not None]
+	if len(durations) == 0:
+		return {"error" : "no prompt within {}s".format(args.timeout)}
+
+	return dict(summarize(durations), failed=failed)
+
+# Runs the fake game and feeds its output through the pump, output history and renderer the way
+# window_run_wine does: collect lines for up to 0.1s, then draw a frame.
+def bench_throughput(args, user, env):
+	gmbuild = load_bench_gmbuild(user, env)
+	gmbuild.curses = FakeWindow.get_curses()
+	gmbuild.import_autoload()
+	window = FakeWindow(args.height, args.width)
+	history = gmbuild.OutputHistory()
+	view = gmbuild.HistoryView()
+
+	rss_start = get_rss()
+	cpu_start = time.process_time()
+	pump = gmbuild.OutputPump()
+	command = gmbuild.format_runner_command(gmbuild.wine_path, "C:/bench/Runner.exe", "Z:/bench/game.win")
+	process = subprocess.Popen([command], shell=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, start_new_session=True,
+		env=dict(env, GMBUILD_FAKE_LINES=str(args.lines), GMBUILD_FAKE_RATE=str(args.rate)))
+	time_start = time.perf_counter()
+	pump.add(process.stdout, "game instance 1", process)
+
+	lines = 0
+	frames = 0
+	render_cpu = 0
+	is_running = True
+	while is_running:
+		time_end = time.time() + 0.1
+		while True:
+			event = pump.get(time_end - time.time())
+			if event is None:
+				break
+			tag, kind, value = event
+			if kind == "exit":
+				is_running = False
+				break
+			history.append("{}: {}".format(tag, gmbuild.IgorLog.decode(value)))
+			lines += 1
+
+		render_start = time.process_time()
+		gmbuild.print_history(window, history, -1, 0, view)
+		render_cpu += time.process_time() - render_start
+		frames += 1
+
+	duration = time.perf_counter() - time_start
+	cpu = time.process_time() - cpu_start
+	pump.terminate()
+	process.wait()
+
+	return {
+		"lines" : lines,
+		"seconds" : round(duration, 3),
+		"lines_per_s" : round(lines / max(duration, 1e-9)),
+		"frames" : frames,
+		"render_cpu_ms_per_frame" : round(render_cpu * 1000 / max(frames, 1), 3),
+		"cpu_s" : round(cpu, 3),
+		"rss_growth_bytes" : get_rss() - rss_start,
+		"rate" : args.rate,
+	}
+
+def run_build(args, user, env, project_path):
+	command = [sys.executable, GMBUILD_PATH, "build", "--project", project_path]
+	result = subprocess.run(command, env=dict(env, USER=user, GMBUILD_FAKE_LINES=str(args.build_lines)), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=args.timeout)
+	return result.returncode
+
+def bench_build(args, user, env, project_path):
+	touched = os.path.join(os.path.dirname(project_path), "datafiles", "bench.txt")
+	full = []
+	current = []
+	codes = set()
+	for i in range(0, args.runs):
+		os.makedirs(os.path.dirname(touched), exist_ok=True)
+		with open(touched, "a") as file:
+			file.write("{}\n".format(i))
+		duration, code = timed(lambda: run_build(args, user, env, project_path))
+		full.append(duration)
+		codes.add(code)
+		duration, code = timed(lambda: run_build(args, user, env, project_path))
+		current.append(duration)
+		codes.add(code)
+
+	return {"full" : summarize(full), "current" : summarize(current), "exit_codes" : sorted(codes)}
+
+def main():
+	parser = argparse.ArgumentParser(description="gmbuild-cli benchmark suite w/ a fake WINE / Igor")
+	parser.add_argument("--only", help="comma-separated benchmarks to run (default: {})".format(",".join(BENCHMARKS)))
+	parser.add_argument("--runs", type=int, default=3, help="runs per measurement")
+	parser.add_argument("--prefix-files", type=int, default=20000, help="filler files in the synthetic prefix")
+	parser.add_argument("--project-files", type=int, default=2000, help="files in the synthetic project")
+	parser.add_argument("--lines", type=int, default=200000, help="lines the game prints in the throughput run")
+	parser.add_argument("--rate", type=float, default=0, help="lines per second the game prints, 0 for as fast as possible")
+	parser.add_argument("--build-lines", type=int, default=100, help="lines the game prints after a build")
+	parser.add_argument("--width", type=int, default=160)
+	parser.add_argument("--height", type=int, default=50)
+	parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for a startup / build")
+	parser.add_argument("--output", help="also append the results as a JSON line to this file")
+	args = parser.parse_args()
+
+	benchmarks = BENCHMARKS if args.only is None else args.only.split(",")
+	for name in benchmarks:
+		if not name in BENCHMARKS:
+			parser.error("unknown benchmark '{}', available: {}".format(name, ", ".join(BENCHMARKS)))
+
+	temp_dir = tempfile.mkdtemp(prefix="gmbuild-bench-")
+	environ = dict(os.environ)
+	results = {}
+	try:
+		env = install_fake_wine(os.path.join(temp_dir, "bin"))
+		user, prefix, project_path = make_bench_home(os.path.join(temp_dir, "home"), args.prefix_files, args.project_files)
+		if "discovery" in benchmarks:
+			results["discovery"] = bench_discovery(args, user, env)
+		if "startup" in benchmarks:
+			results["startup"] = bench_startup(args, user, env)
+		if "throughput" in benchmarks:
+			results["throughput"] = bench_throughput(args, user, env)
+		if "build" in benchmarks:
+			results["build"] = bench_build(args, user, env, project_path)
+	finally:
+		os.environ.clear()
+		os.environ.update(environ)
+		shutil.rmtree(temp_dir, ignore_errors=True)
+
+	report = {
+		"benchmark" : "suite",
+		"time" : round(time.time(), 3),
+		"python" : platform.python_version(),
+		"cpus" : os.cpu_count(),
+		"prefix_files" : args.prefix_files,
+		"project_files" : args.project_files,
+		"results" : results,
+	}
+	print(json.dumps(report, indent=4))
+	if args.output is not None:
+		with open(args.output, "a") as file:
+			file.write(json.dumps(report) + "\n")
+
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
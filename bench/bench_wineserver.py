@@ -0,0 +1,103 @@
+"""
+	Measures the time from spawning Igor through WINE to its first line of output, once w/ the
+	wineserver cold (killed before every run, as after each build w/o a persistent server) and
+	once warm (`wineserver -p` kept running, only Igor's process group is killed between runs).
+
+	Needs a real WINE install w/ GameMaker; the prefix's build.bff is used when there is one.
+
+	usage: python bench/bench_wineserver.py --prefix ~/.wine [--runtime NAME] [--runs N]
+"""
+
+import os
+import sys
+import time
+import json
+import signal
+import argparse
+import subprocess
+import statistics
+
+from common import load_gmbuild
+
+# `-p` forks a server that keeps stdout / stderr open, so they mustn't be pipes we wait on
+def run_wineserver(prefix, flag):
+	subprocess.run(["wineserver", flag], env=dict(os.environ, WINEPREFIX=prefix), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+# Returns the seconds until the command printed its first line (None if it printed nothing)
+def time_first_output(command, timeout):
+	time_start = time.perf_counter()
+	process = subprocess.Popen([command], shell=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, start_new_session=True)
+	duration = None
+	try:
+		line = process.stdout.readline()
+		if len(line) > 0:
+			duration = time.perf_counter() - time_start
+	finally:
+		try:
+			os.killpg(process.pid, signal.SIGKILL)
+		except ProcessLookupError:
+			pass
+		process.wait(timeout)
+
+	return duration
+
+def summarize(durations):
+	durations = [duration for duration in durations if duration is not None]
+	if len(durations) == 0:
+		return None
+
+	return {
+		"runs" : len(durations),
+		"min_s" : round(min(durations), 3),
+		"median_s" : round(statistics.median(durations), 3),
+	}
+
+def main():
+	parser = argparse.ArgumentParser(description="Time to first Igor output w/ a cold vs. warm wineserver")
+	parser.add_argument("--prefix", required=True, help="WINE prefix GameMaker is installed in")
+	parser.add_argument("--runtime", help="runtime folder name (default: first one found)")
+	parser.add_argument("--runs", type=int, default=5, help="runs per mode")
+	parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for a run to stop")
+	args = parser.parse_args()
+
+	gmbuild = load_gmbuild()
+	prefix = os.path.abspath(os.path.expanduser(args.prefix))
+	index = gmbuild.PrefixIndex(prefix).scan()
+	runtimes = index.find("runtimes")
+	if len(runtimes) == 0:
+		print("no runtimes found in {}".format(prefix), file=sys.stderr)
+		return 1
+	runtime = args.runtime or sorted(os.listdir(runtimes))[0]
+	igorpath = index.find("igor", os.path.join(runtimes, runtime))
+	bff_path = index.find("bff")
+	bff_path = ("Z:" + bff_path) if len(bff_path) > 0 else "missing.bff" # Igor still starts up and complains
+	command = gmbuild.format_igor_command(prefix, igorpath, bff_path, "Run")
+
+	cold = []
+	for i in range(0, args.runs):
+		run_wineserver(prefix, "-k")
+		run_wineserver(prefix, "-w")
+		cold.append(time_first_output(command, args.timeout))
+
+	run_wineserver(prefix, "-p")
+	time_first_output(command, args.timeout) # Let the server finish bootstrapping the prefix
+	warm = []
+	for i in range(0, args.runs):
+		warm.append(time_first_output(command, args.timeout))
+	run_wineserver(prefix, "-k")
+
+	cold = summarize(cold)
+	warm = summarize(warm)
+	print(json.dumps({
+		"benchmark" : "wineserver",
+		"prefix" : prefix,
+		"runtime" : runtime,
+		"cold" : cold,
+		"warm" : warm,
+		"speedup" : round(cold["median_s"] / max(warm["median_s"], 1e-9), 2) if cold and warm else None,
+	}, indent=4))
+
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
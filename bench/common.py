@@ -0,0 +1,308 @@
+"""
+	Shared helpers for the benchmark scripts. gmbuild-cli.py isn't importable by name (hyphen)
+	so it is loaded straight from its file; importing it does not start curses.
+"""
+
+import os
+import sys
+import json
+import time
+import importlib.util
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_PATH = os.path.join(ROOT_PATH, "bench")
+
+def load_gmbuild():
+	spec = importlib.util.spec_from_file_location("gmbuild_cli", os.path.join(ROOT_PATH, "gmbuild-cli.py"))
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
+
+# Returns the seconds a call took along w/ its result:
+def timed(function):
+	time_start = time.perf_counter()
+	result = function()
+	return time.perf_counter() - time_start, result
+
+# Returns the fastest of several runs in seconds, along w/ the result of the last one:
+def best_of(runs, function):
+	best = None
+	result = None
+	for i in range(0, runs):
+		duration, result = timed(function)
+		if best is None or duration < best:
+			best = duration
+
+	return best, result
+
+# Returns the resident memory of this process in bytes:
+def get_rss():
+	with open("/proc/self/status", "rb") as file:
+		for line in file:
+			if line.startswith(b"VmRSS:"):
+				return int(line.split()[1]) * 1024
+
+	return 0
+
+# Puts fake_wine.py and fake_wineserver.py on PATH as `wine` and `wineserver` in bin_dir. Returns the
+# environment to run gmbuild-cli in.
+def install_fake_wine(bin_dir, env=None):
+	os.makedirs(bin_dir, exist_ok=True)
+	for name, script in [("wine", "fake_wine.py"), ("wineserver", "fake_wineserver.py")]:
+		write_file(os.path.join(bin_dir, name), "#!/bin/sh\nexec \"{}\" \"{}\" \"$@\"\n".format(sys.executable, os.path.join(BENCH_PATH, script)))
+	for name in ["wine", "wineserver"]:
+		os.chmod(os.path.join(bin_dir, name), 0o755)
+
+	env = dict(os.environ if env is None else env)
+	env["PATH"] = bin_dir + os.pathsep + env.get("PATH", "")
+	return env
+
+# gmbuild-cli keeps its state in /home/$USER (autoload, caches, build history). Pointing USER at a
+# temporary home through a relative path ("../tmp/...") keeps benchmarks away from the real files.
+def get_bench_user(home):
+	return os.path.relpath(home, "/home")
+
+# Generates a home directory w/ a synthetic WINE prefix (~/.wine) and project
+# (~/Projects/Bench), plus an autoload selecting them. Returns (user, prefix, project path).
+def make_bench_home(home, prefix_files=20000, project_files=2000, runtime="runtime-2.3.7.606"):
+	user = get_bench_user(home)
+	prefix = make_synthetic_prefix(os.path.join(home, ".wine"), prefix_files, (runtime,))
+	project_path = make_synthetic_project(os.path.join(home, "Projects", "Bench"), project_files)
+	write_file(os.path.join(home, ".gmbuild_autoload"), json.dumps({
+		"ppath" : project_path,
+		"prefix" : prefix,
+		"rtpath" : os.path.join(prefix, "drive_c/ProgramData/GameMakerStudio2/Cache/runtimes/"),
+		"rt" : runtime,
+		"debug" : 0,
+		"drive" : "Z",
+		"config" : "Default",
+		"lts" : "",
+		"perror" : False,
+	}))
+
+	return user, prefix, project_path
+
+def write_file(path, content=""):
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	with open(path, "w") as file:
+		file.write(content)
+
+# Generates a WINE prefix with a GameMaker install, login data and runtimes plus `file_count`
+# filler files spread out over nested directories (roughly what drive_c/windows looks like).
+def make_synthetic_prefix(root, file_count=100000, runtimes=("runtime-2.3.7.606",), user="gmbuild"):
+	drive_c = os.path.join(root, "drive_c")
+	write_file(os.path.join(drive_c, "Program Files/GameMaker Studio 2/GameMakerStudio.exe"))
+	write_file(os.path.join(drive_c, "users/{}/AppData/Roaming/GameMakerStudio2/{}_1234/Manifest.enc".format(user, user)))
+	for runtime in runtimes:
+		runtime_root = os.path.join(drive_c, "ProgramData/GameMakerStudio2/Cache/runtimes", runtime)
+		write_file(os.path.join(runtime_root, "bin/Igor.exe"))
+		write_file(os.path.join(runtime_root, "bin/GMAssetCompiler.exe"))
+		write_file(os.path.join(runtime_root, "windows/Runner.exe"))
+		write_file(os.path.join(runtime_root, "windows/x64/Runner.exe"))
+
+	# Filler; 50 files per directory, 20 directories per parent
+	for i in range(0, file_count):
+		directory = os.path.join(drive_c, "windows", "d{}".format(i // 1000), "d{}".format((i // 50) % 20))
+		if i % 50 == 0:
+			os.makedirs(directory, exist_ok=True)
+		open(os.path.join(directory, "f{}.dll".format(i)), "w").close()
+
+	# WINE always links Z: to the file system root; scanners must not follow it
+	os.makedirs(os.path.join(root, "dosdevices"), exist_ok=True)
+	if not os.path.lexists(os.path.join(root, "dosdevices/z:")):
+		os.symlink("/", os.path.join(root, "dosdevices/z:"))
+
+	return root
+
+def write_bytes(path, size, seed=0):
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	with open(path, "wb") as file:
+		block = bytes((seed + i) % 251 for i in range(0, 4096))
+		for i in range(0, size // len(block)):
+			file.write(block)
+		file.write(block[:size % len(block)])
+
+# Generates a GameMaker project w/ roughly `file_count` files: sprites (.yy + frames + layer
+# images), objects (.yy + events) and sounds (a few of them large enough to be mmapped by the
+# project hasher), all referenced from the .yyp like the IDE writes it (trailing commas included).
+def make_synthetic_project(root, file_count=20000, name="Bench"):
+	sounds = file_count // 80
+	sprites = file_count * 3 // 20
+	objects = max((file_count - sprites * 4 - sounds * 2 - 1) // 3, 0)
+	resources = []
+
+	for i in range(0, sprites):
+		resource = "spr_{}".format(i)
+		directory = os.path.join(root, "sprites", resource)
+		write_file(os.path.join(directory, resource + ".yy"), "{\"name\":\"%s\",\"frames\":[],}" % resource)
+		write_bytes(os.path.join(directory, "frame_0.png"), 2048, i)
+		write_bytes(os.path.join(directory, "frame_1.png"), 2048, i + 1)
+		write_bytes(os.path.join(directory, "layers/frame_0/layer_0.png"), 2048, i + 2)
+		resources.append((resource, "sprites/{}/{}.yy".format(resource, resource)))
+
+	for i in range(0, objects):
+		resource = "obj_{}".format(i)
+		directory = os.path.join(root, "objects", resource)
+		write_file(os.path.join(directory, resource + ".yy"), "{\"name\":\"%s\",\"eventList\":[],}" % resource)
+		write_file(os.path.join(directory, "Create_0.gml"), "x = {};\ny = {};\n".format(i, i * 2))
+		write_file(os.path.join(directory, "Step_0.gml"), "x += 1; // {}\n".format(i))
+		resources.append((resource, "objects/{}/{}.yy".format(resource, resource)))
+
+	for i in range(0, sounds):
+		resource = "snd_{}".format(i)
+		directory = os.path.join(root, "sounds", resource)
+		write_file(os.path.join(directory, resource + ".yy"), "{\"name\":\"%s\",}" % resource)
+		write_bytes(os.path.join(directory, resource + ".ogg"), (2 << 20) if i % 10 == 0 else (64 << 10), i)
+		resources.append((resource, "sounds/{}/{}.yy".format(resource, resource)))
+
+	# The options make_synthetic_yyp() lists:
+	for option in ["main", "windows"]:
+		write_file(os.path.join(root, "options", option, "options_{}.yy".format(option)), "{\"name\":\"%s\",}" % option)
+
+	project_path = os.path.join(root, name + ".yyp")
+	write_file(project_path, make_synthetic_yyp(resources, name))
+
+	# Backdate everything so nothing looks like it is still being written to
+	mtime = time.time() - 3600
+	for directory, dirnames, filenames in os.walk(root):
+		for filename in filenames:
+			os.utime(os.path.join(directory, filename), (mtime, mtime))
+
+	return project_path
+
+# Returns the text of a .yyp listing the given (name, path) resources, laid out the way the IDE
+# writes it: one member per line at the top level, one resource per line, trailing commas after
+# every last element. configs are (name, [child configs]) trees.
+def make_synthetic_yyp(resources, name="Bench", configs=("Default", [("Release", [])]), included=(), folders=200):
+	def format_config(config, indent):
+		children = "".join(["\n{}  {},".format(indent, format_config(child, indent + "  ")) for child in config[1]])
+		return "{{\"name\":{},\"children\":[{}{}],}}".format(json.dumps(config[0]), children, ("", "\n" + indent)[len(children) > 0])
+
+	lines = ["{", "  \"resources\": ["]
+	for i, (resource, path) in enumerate(resources):
+		lines.append("    {\"id\":{\"name\":%s,\"path\":%s,},\"order\":%d,}," % (json.dumps(resource), json.dumps(path), i))
+	lines += [
+		"  ],",
+		"  \"Options\": [",
+		"    {\"name\":\"Main\",\"path\":\"options/main/options_main.yy\",},",
+		"    {\"name\":\"Windows\",\"path\":\"options/windows/options_windows.yy\",},",
+		"  ],",
+		"  \"isDnDProject\": false,",
+		"  \"isEcma\": false,",
+		"  \"tutorialPath\": \"\",",
+		"  \"configs\": " + format_config(configs, "  ") + ",",
+		"  \"RoomOrderNodes\": [],",
+		"  \"Folders\": [",
+	]
+	for i in range(0, folders):
+		lines.append("    {\"folderPath\":\"folders/Group %d.yy\",\"order\":%d,\"resourceVersion\":\"1.0\",\"name\":\"Group %d\",\"tags\":[],\"resourceType\":\"GMFolder\",}," % (i, i, i))
+	lines += [
+		"  ],",
+		"  \"AudioGroups\": [",
+		"    {\"targets\":-1,\"resourceVersion\":\"1.3\",\"name\":\"audiogroup_default\",\"resourceType\":\"GMAudioGroup\",},",
+		"  ],",
+		"  \"TextureGroups\": [",
+		"    {\"isScaled\":true,\"autocrop\":true,\"border\":2,\"groupParent\":null,\"targets\":-1,\"resourceVersion\":\"1.0\",\"name\":\"Default\",\"resourceType\":\"GMTextureGroup\",},",
+		"  ],",
+		"  \"IncludedFiles\": [",
+	]
+	for directory, filename in included:
+		lines.append("    {\"CopyToMask\":-1,\"filePath\":%s,\"resourceVersion\":\"1.0\",\"name\":%s,\"tags\":[],\"resourceType\":\"GMIncludedFile\",}," % (json.dumps(directory), json.dumps(filename)))
+	lines += [
+		"  ],",
+		"  \"MetaData\": {",
+		"    \"IDEVersion\": \"2.3.7.606\",",
+		"  },",
+		"  \"resourceVersion\": \"1.4\",",
+		"  \"name\": %s," % json.dumps(name),
+		"  \"tags\": [],",
+		"  \"resourceType\": \"GMProject\",",
+		"}",
+	]
+	return "\n".join(lines)
+
+# Minimal stand-in for a curses window: keeps a character buffer (so frames can be compared),
+# honours scroll regions and counts the calls / characters that would reach curses.
+class FakeWindow:
+	def __init__(self, height, width):
+		self.height = height
+		self.width = width
+		self.buffer = [[" "] * width for y in range(0, height)]
+		self.region = (0, height - 1)
+		self.is_scrollok = False
+		self.reset_counters()
+
+	@staticmethod
+	def get_curses():
+		class FakeCurses:
+			KEY_UP = 259
+			KEY_DOWN = 258
+			KEY_PPAGE = 339
+			KEY_NPAGE = 338
+			error = Exception
+
+			@staticmethod
+			def color_pair(index):
+				return index << 8
+
+			@staticmethod
+			def doupdate():
+				pass
+
+		return FakeCurses
+
+	def reset_counters(self):
+		self.call_count = 0
+		self.char_count = 0
+
+	def getmaxyx(self):
+		return self.height, self.width
+
+	def getyx(self):
+		return 0, 0
+
+	def addstr(self, y, x, string, attr=0):
+		self.call_count += 1
+		self.char_count += len(string)
+		if y < 0 or y >= self.height or x < 0 or x + len(string) > self.width or (y == self.height - 1 and x + len(string) >= self.width):
+			raise Exception("addwstr() returned ERR")
+
+		for i in range(0, len(string)):
+			self.buffer[y][x + i] = string[i]
+
+	def addnstr(self, y, x, string, n, attr=0):
+		self.addstr(y, x, string[:n], attr)
+
+	def attron(self, attr):
+		pass
+
+	def attroff(self, attr):
+		pass
+
+	def setscrreg(self, top, bottom):
+		self.region = (top, bottom)
+
+	def scrollok(self, flag):
+		self.is_scrollok = flag
+
+	def scroll(self, lines=1):
+		self.call_count += 1
+		if not self.is_scrollok:
+			raise Exception("scroll() returned ERR")
+
+		top, bottom = self.region
+		rows = self.buffer[top:bottom + 1]
+		rows = rows[lines:] + [[" "] * self.width for i in range(0, lines)]
+		self.buffer[top:bottom + 1] = rows
+
+	def move(self, y, x):
+		pass
+
+	def noutrefresh(self):
+		pass
+
+	def refresh(self):
+		pass
+
+	def get_text(self, top, bottom):
+		return ["".join(row) for row in self.buffer[top:bottom + 1]]
@@ -0,0 +1,125 @@
+"""
+	Stand-in for `wine` so gmbuild-cli can be benchmarked w/o a GameMaker install; see
+	install_fake_wine() in common.py, which puts it on PATH. Igor.exe reads the build.bff, writes
+	the .win it names and prints an Igor log shaped like a real one (asset compile, GML compile,
+	texture pages, audio groups, writing the .win, launching the Runner) followed by the game's
+	output; Runner.exe only prints the game's output.
+
+	Tuned through the environment:
+		GMBUILD_FAKE_RESOURCES	resources in the project, scales the build log (default 100)
+		GMBUILD_FAKE_LINES	lines the game prints before it exits (default 1000)
+		GMBUILD_FAKE_RATE	lines per second, 0 for as fast as possible (default 0)
+		GMBUILD_FAKE_STARTUP	seconds before the first line, like WINE starting up (default 0)
+		GMBUILD_FAKE_EXIT	exit code (default 0)
+"""
+
+import os
+import sys
+import json
+import time
+
+class Emitter:
+	def __init__(self, rate):
+		self.rate = rate
+		self.count = 0
+		self.time_start = time.perf_counter()
+		self.out = sys.stdout.buffer
+
+	# Writes a line, sleeping whenever it gets ahead of the rate; lines go out in bursts of
+	# roughly 10ms like a real process flushing its buffer
+	def emit(self, line):
+		self.out.write(line.encode("utf-8") + b"\r\n")
+		self.count += 1
+		if self.rate <= 0:
+			return
+
+		ahead = self.count / self.rate - (time.perf_counter() - self.time_start)
+		if ahead > 0.01:
+			self.out.flush()
+			time.sleep(ahead)
+
+	def flush(self):
+		self.out.flush()
+
+def get_igor_lines(resources, win_path):
+	lines = [
+		"Loaded Macros from C:\\users\\gmbuild\\macros.json",
+		"Options: C:\\users\\gmbuild\\build.bff",
+		"[Compile] Run asset compiler",
+		"C:\\ProgramData\\GameMakerStudio2\\Cache\\runtimes\\runtime-2.3.7.606\\bin\\GMAssetCompiler.exe /c /zpex /mv=1 /iv=0",
+		"Reading project file....",
+	]
+	lines += ["Reading resource {} of {}".format(i + 1, resources) for i in range(0, resources)]
+	lines += [
+		"Finished reading project file.",
+		"Compile Constants...finished.",
+		"Remove DnD...finished.",
+		"Compile Scripts...finished.",
+	]
+	for i in range(0, resources // 10):
+		lines.append("Warning : gml_Script_scr_{}({}) : variable never used".format(i, i % 40 + 1))
+	lines += [
+		"Compile Objects...finished.... {} empty events".format(resources // 5),
+		"Compile Timelines...finished.",
+		"Compile Triggers...finished.",
+		"Final Compile...finished.",
+		"Saving IFF file... {}".format(win_path),
+		"Writing Chunk... GEN8 size ... -0.00 MB",
+		"Writing Chunk... OPTN size ... -0.00 MB",
+		"Writing Chunk... SPRT size ... -0.01 MB",
+		"Writing Chunk... TXTR size ... -0.00 MB",
+	]
+	lines += ["{} Compressing texture... writing texture texture_{}.yytex...".format(i, i) for i in range(0, max(resources // 25, 1))]
+	lines.append("Writing Chunk... AUDO size ... -0.00 MB")
+	lines += ["Writing audio file audiogroup{}.dat...".format(i) for i in range(0, max(resources // 50, 1))]
+	lines += [
+		"Writing Chunk... STRG size ... 0.00 MB",
+		"Stats : GMA : Elapsed=1234.5678",
+		"Igor complete.",
+		"[Run] Run game",
+		"Running C:\\ProgramData\\GameMakerStudio2\\Cache\\runtimes\\runtime-2.3.7.606\\windows\\Runner.exe -game {}".format(win_path),
+	]
+	return lines
+
+def get_game_line(index):
+	return "frame {}: obj_player x={} y={} state=run hp=100 ammo={} enemies={}".format(index, index % 640, (index * 7) % 480, 30 - index % 30, index % 17)
+
+# Writes the .win the build.bff asks for (Z: maps to the file system root):
+def write_win(options):
+	with open(options.split(":", 1)[1], "r") as file:
+		bff = json.load(file)
+	win_path = bff["compile_output_file_name"].split(":", 1)[1]
+	os.makedirs(os.path.dirname(win_path), exist_ok=True)
+	with open(win_path, "wb") as file:
+		file.write(b"FORM" + bytes(1020))
+
+	return bff["compile_output_file_name"]
+
+def main():
+	if len(sys.argv) < 2:
+		return 0
+
+	executable = os.path.basename(sys.argv[1].replace("\\", "/")).lower()
+	if executable not in ["igor.exe", "runner.exe"]:
+		return 0
+
+	emitter = Emitter(float(os.environ.get("GMBUILD_FAKE_RATE", "0")))
+	time.sleep(float(os.environ.get("GMBUILD_FAKE_STARTUP", "0")))
+	if executable == "igor.exe":
+		options = [arg[len("-options="):] for arg in sys.argv[2:] if arg.startswith("-options=")]
+		win_path = write_win(options[0]) if len(options) > 0 else "C:\\users\\gmbuild\\build\\game.win"
+		for line in get_igor_lines(int(os.environ.get("GMBUILD_FAKE_RESOURCES", "100")), win_path):
+			emitter.emit(line)
+		emitter.flush()
+
+	for i in range(0, int(os.environ.get("GMBUILD_FAKE_LINES", "1000"))):
+		emitter.emit(get_game_line(i))
+	emitter.flush()
+
+	return int(os.environ.get("GMBUILD_FAKE_EXIT", "0"))
+
+if __name__ == "__main__":
+	try:
+		sys.exit(main())
+	except BrokenPipeError:
+		sys.exit(0)
@@ -0,0 +1,78 @@
+"""
+	Stand-in for `wineserver`; see install_fake_wine() in common.py, which puts it on PATH. Like
+	the real one it forks into the background and the foreground process exits right away while
+	the server keeps the stdout / stderr it inherited open, so a caller that waits on those pipes
+	hangs until the server is gone. The server creates the socket gmbuild-cli looks for in
+	/tmp/.wine-UID/server-DEV-INO and removes it again when it stops.
+
+		-p [N]	start a server that stays up N seconds (default GMBUILD_FAKE_SERVER_LINGER, 60)
+		-k	kill the prefix's server
+		-w	wait until the prefix's server is gone
+"""
+
+import os
+import sys
+import time
+import signal
+
+def get_server_dir(prefix):
+	stat = os.stat(prefix)
+	return "/tmp/.wine-{}/server-{:x}-{:x}".format(os.getuid(), stat.st_dev, stat.st_ino)
+
+# Returns the pid of the prefix's server, or None if none is running
+def get_server_pid(server_dir):
+	try:
+		with open(os.path.join(server_dir, "pid"), "r") as file:
+			pid = int(file.read())
+		os.kill(pid, 0)
+		return pid
+	except (OSError, ValueError):
+		return None
+
+def remove_server_files(server_dir):
+	for name in ["socket", "pid"]:
+		try:
+			os.remove(os.path.join(server_dir, name))
+		except OSError:
+			pass
+
+# Runs in the forked child: holds on to the inherited fds until it lingered long enough or is killed
+def serve(server_dir, linger):
+	os.setsid()
+	signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+	try:
+		with open(os.path.join(server_dir, "pid"), "w") as file:
+			file.write(str(os.getpid()))
+		open(os.path.join(server_dir, "socket"), "w").close()
+		time.sleep(linger)
+	finally:
+		remove_server_files(server_dir)
+
+def main():
+	prefix = os.environ.get("WINEPREFIX", os.path.expanduser("~/.wine"))
+	if len(sys.argv) < 2 or not os.path.isdir(prefix):
+		return 0
+
+	server_dir = get_server_dir(prefix)
+	flag = sys.argv[1]
+	if flag == "-p":
+		if get_server_pid(server_dir) is not None:
+			return 0
+
+		os.makedirs(server_dir, exist_ok=True)
+		linger = float(sys.argv[2] if len(sys.argv) > 2 else os.environ.get("GMBUILD_FAKE_SERVER_LINGER", "60"))
+		if os.fork() == 0:
+			serve(server_dir, linger)
+			os._exit(0)
+	elif flag == "-k":
+		pid = get_server_pid(server_dir)
+		if pid is not None:
+			os.kill(pid, signal.SIGTERM)
+	elif flag == "-w":
+		while get_server_pid(server_dir) is not None:
+			time.sleep(0.05)
+
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -18,51 +18,527 @@
 # TODO:	Add support to compile for Linux (from Windows)
 
 import sys,os
-import curses
 import subprocess
 import re
 import json
 import time
-
-# NOTE: Non-blocking async read is a tweaked version of this gist:
-# 	https://gist.github.com/EyalAr/7915597
-from threading import Thread
+import fnmatch
+import argparse
+import tempfile
+import shutil
+import zlib
+import hashlib
+import mmap
+import struct
+import ctypes
+import ctypes.util
+import signal
+import statistics
+import unicodedata
+from functools import lru_cache, wraps
+from concurrent.futures import ThreadPoolExecutor
+
+# curses is only imported once the interactive UI starts so headless runs never load it:
+curses = None
+
+import selectors
+import socket
+from threading import Thread, Lock, Event, current_thread
 from queue import Queue, Empty
 
-class AsyncRead:
-	def __init__(self, iostream):
-		self.iostream = iostream        # Stream of data to read from
-		self.queue = Queue()            # Queue of results from the string
+# Reads the output of every child process (Igor's stdout / stderr, game instances, ...) from a
+# single thread. The thread sleeps in select() until a stream has data so an idle session costs no
+# CPU. Streams are dropped on EOF and, once all of a process' streams are closed, its exit status
+# is reported.
+# 	Events are (tag, "line", bytes) for every line read and (tag, "exit", code) per process.
+class OutputPump:
+	def __init__(self):
+		self.selector = selectors.DefaultSelector()
+		self.queue = Queue()	# Events for the reader
+		self.pending = Queue()	# Streams waiting to be registered by the pump thread
+		self.processes = {}	# Process -> [tag, number of open streams]
+		self.exiting = []	# Processes w/ all streams closed, waiting on their exit status
 		self.is_running = True
-		def read_io(self, iostream, queue):
-			while self.is_running:
-				line = iostream.readline()
-				if line:
-					queue.put(line)
 
-		self.process = Thread(target = read_io, args = (self, self.iostream, self.queue))
+		# Writing to this pipe wakes the pump thread up to register streams or exit:
+		self.wake_read, self.wake_write = os.pipe()
+		os.set_blocking(self.wake_read, False)
+		self.selector.register(self.wake_read, selectors.EVENT_READ, None)
+
+		self.process = Thread(target = self.run, daemon = True)
 		self.process.start()
 
-	def readline(self, timeout=None):
-		try:
-			return self.queue.get(block = timeout is not None, timeout = timeout)
+	# Starts reading a stream; tag identifies it in events. Pass the process owning the stream to
+	# have its exit status reported under the tag of its first stream.
+	def add(self, stream, tag, process=None):
+		self.pending.put((stream, tag, process))
+		os.write(self.wake_write, b"\0")
+
+	def register(self, stream, tag, process):
+		os.set_blocking(stream.fileno(), False)
+		if process is not None:
+			if not process in self.processes:
+				self.processes[process] = [tag, 0]
+			self.processes[process][1] += 1
+
+		self.selector.register(stream.fileno(), selectors.EVENT_READ, [stream, tag, process, b""])
+
+	def close(self, key):
+		stream, tag, process, buffer = key.data
+		if len(buffer) > 0:
+			self.queue.put((tag, "line", buffer))
+
+		self.selector.unregister(key.fileobj)
+		if process is not None:
+			self.processes[process][1] -= 1
+			if self.processes[process][1] <= 0:
+				self.exiting.append(process)
+
+	def run(self):
+		while self.is_running:
+			# Only wake up periodically while waiting on a process to exit:
+			timeout = None
+			if len(self.exiting) > 0:
+				timeout = 0.1
+
+			for key, mask in self.selector.select(timeout):
+				if key.data is None:
+					try:
+						os.read(self.wake_read, 4096)
+					except BlockingIOError:
+						pass
+
+					while True:
+						try:
+							self.register(*self.pending.get_nowait())
+						except Empty:
+							break
+					continue
+
+				try:
+					chunk = os.read(key.fileobj, 65536)
+				except BlockingIOError:
+					continue
+				except OSError:
+					chunk = b""
+
+				if len(chunk) == 0:
+					self.close(key)
+					continue
+
+				# Split off complete lines, keeping any partial line for the next read:
+				lines = (key.data[3] + chunk).split(b"\n")
+				key.data[3] = lines.pop()
+				for line in lines:
+					self.queue.put((key.data[1], "line", line + b"\n"))
 
+			for process in [process for process in self.exiting if process.poll() is not None]:
+				self.exiting.remove(process)
+				self.queue.put((self.processes[process][0], "exit", process.returncode))
+
+	# Returns the next event, waiting up to timeout seconds (None blocks), or None if nothing arrived
+	def get(self, timeout=None):
+		try:
+			if timeout is not None and timeout <= 0:
+				return self.queue.get_nowait()
+			return self.queue.get(timeout = timeout)
 		except Empty:
 			return None
+
 	def terminate(self):
 		self.is_running = False
+		os.write(self.wake_write, b"\0")
 		self.process.join()
+		self.selector.close()
+		os.close(self.wake_read)
+		os.close(self.wake_write)
+
+# Output history addressed by stable sequence numbers: the n-th line ever appended is always at
+# index n. Only the newest `capacity` lines are kept in memory (in a fixed-size ring); older lines
+# are spilled to a temporary file in zlib-compressed blocks so dumps and scrolling still reach them.
+OUTPUT_HISTORY_CAPACITY = 20000	# Lines kept in memory
+OUTPUT_HISTORY_BLOCK = 1024	# Lines per compressed block on disk
+
+class OutputHistory:
+	def __init__(self, capacity=OUTPUT_HISTORY_CAPACITY):
+		self.capacity = max(capacity, 1)
+		self.ring = [None] * self.capacity
+		self.count = 0	# Lines appended so far (and thus the next sequence number)
+		self.pending = []	# Lines evicted from the ring but not yet written to disk
+		self.blocks = []	# (offset, size) of each compressed block in the spill file
+		self.spill = None	# Spill file, created on the first full block
+		self.block_cache = (-1, None)	# Last block read back from disk
+
+	def __len__(self):
+		return self.count
+
+	def __iter__(self):
+		return self.iter_range(0, self.count)
+
+	def append(self, line):
+		slot = self.count % self.capacity
+		if self.count >= self.capacity:
+			self.pending.append(self.ring[slot])
+			if len(self.pending) >= OUTPUT_HISTORY_BLOCK:
+				self.write_block()
+
+		self.ring[slot] = line
+		self.count += 1
+
+	def write_block(self):
+		if self.spill is None:
+			self.spill = tempfile.TemporaryFile(prefix="gmbuild-history-")
+
+		data = zlib.compress(json.dumps(self.pending).encode(), 1)
+		self.spill.seek(0, os.SEEK_END)
+		self.blocks.append((self.spill.tell(), len(data)))
+		self.spill.write(data)
+		self.pending = []
+
+	def read_block(self, index):
+		if self.block_cache[0] != index:
+			offset, size = self.blocks[index]
+			self.spill.seek(offset)
+			self.block_cache = (index, json.loads(zlib.decompress(self.spill.read(size))))
+
+		return self.block_cache[1]
+
+	# Sequence number of the oldest line still held in memory:
+	def get_first_index(self):
+		return max(0, self.count - self.capacity)
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			start, end, step = index.indices(self.count)
+			return list(self.iter_range(start, end))
+
+		if index < 0:
+			index += self.count
+		if index < 0 or index >= self.count:
+			raise IndexError("output history index out of range")
+
+		if index >= self.get_first_index():
+			return self.ring[index % self.capacity]
+
+		spilled_count = len(self.blocks) * OUTPUT_HISTORY_BLOCK
+		if index >= spilled_count:
+			return self.pending[index - spilled_count]
+
+		return self.read_block(index // OUTPUT_HISTORY_BLOCK)[index % OUTPUT_HISTORY_BLOCK]
+
+	def iter_range(self, start, end):
+		for index in range(max(start, 0), min(end, self.count)):
+			yield self[index]
+
+# Everything we look up inside of a WINE prefix. The prefix is walked a single time and every
+# discovery function reads from the resulting index instead of spawning its own `find`.
+# 	Maps file name -> index key; files must be regular files (same as `find -type f`)
+PREFIX_INDEX_FILES = {
+	"GameMaker.exe" : "gamemaker",
+	"GameMakerStudio.exe" : "gamemaker",
+	"GameMaker-LTS.exe" : "gamemaker",
+	"Igor.exe" : "igor",
+	"GMAssetCompiler.exe" : "asset_compiler",
+	"Runner.exe" : "runner",
+	"build.bff" : "bff",
+}
+# 	Maps entry name -> index key; matches files and directories alike (same as plain `find -name`)
+PREFIX_INDEX_ANY = {
+	"Manifest.enc" : "manifest",
+	"runtimes" : "runtimes",
+}
+
+class PrefixIndex:
+	def __init__(self, root):
+		self.root = os.path.normpath(root)
+		self.entries = {}	# Index key -> list of paths in walk order
+		self.scanned = []	# Sub-trees that were re-walked after the initial scan
+		self.scan_time = 0	# Duration of the last walk, in S
+		self.entry_count = 0	# Number of directory entries visited by the last walk
+		self.is_dirty = True	# Entries changed since last written to the discovery cache
+
+	# Depth-first, pre-order walk (same order `find` reports in) that never follows symlinks
+	# so the dosdevices/z: -> / link doesn't drag the whole system into the scan.
+	def walk(self, root):
+		found = []
+		count = 0
+		try:
+			stack = [os.scandir(root)]
+		except OSError:
+			return found, count
 
-# Global variables:
-command_list = ["exit", "quit", "print runtimes", "set gm runtime", "set gamemaker runtime", "set debug", "build wine", 
-		"set wine drive", "set wine prefix", "set gamemaker project", "set gm project", "clean wine build",
-		"build wine existing", "kill wineserver", "export autoload", "set gm config", "set gamemaker config",
-		"set wine print errors"]
-for i in range(0, len(command_list)):
-	command_list.append("help " + command_list[i])
-command_list.append("help")
-command_list.sort()
+		while len(stack) > 0:
+			try:
+				entry = next(stack[-1], None)
+			except OSError:
+				entry = None
+
+			if entry is None:
+				stack.pop().close()
+				continue
+
+			count += 1
+			try:
+				is_dir = entry.is_dir(follow_symlinks=False)
+			except OSError:
+				is_dir = False
+
+			key = PREFIX_INDEX_ANY.get(entry.name)
+			if key is None and not is_dir and entry.name in PREFIX_INDEX_FILES:
+				try:
+					if entry.is_file(follow_symlinks=False):
+						key = PREFIX_INDEX_FILES[entry.name]
+				except OSError:
+					pass
+
+			if key is not None:
+				found.append((key, entry.path))
+
+			if is_dir:
+				try:
+					stack.append(os.scandir(entry.path))
+				except OSError:
+					pass
+
+		return found, count
+
+	def scan(self):
+		time_start = time.time()
+		self.entries = {}
+		self.scanned = []
+		found, self.entry_count = self.walk(self.root)
+		for key, path in found:
+			self.add(path, key)
+
+		self.scan_time = time.time() - time_start
+		self.is_dirty = True
+		return self
+
+	def add(self, path, key=None):
+		if key is None:
+			name = os.path.basename(path)
+			key = PREFIX_INDEX_FILES.get(name, PREFIX_INDEX_ANY.get(name))
+			if key is None:
+				return
+
+		paths = self.entries.setdefault(key, [])
+		if not path in paths:
+			paths.append(path)
+			self.is_dirty = True
+
+	# Returns every indexed path for a key, optionally limited to a sub-tree. If a sub-tree
+	# has no results it is re-walked once in case it was created after the initial scan
+	# (e.g., a freshly downloaded runtime).
+	def find_all(self, key, under=None):
+		if under is None:
+			return list(self.entries.get(key, []))
+
+		under = os.path.normpath(under)
+		result = [path for path in self.entries.get(key, []) if path.startswith(under + "/")]
+		if len(result) == 0 and not under in self.scanned and os.path.isdir(under):
+			self.scanned.append(under)
+			found, count = self.walk(under)
+			for found_key, path in found:
+				self.add(path, found_key)
+			return self.find_all(key, under)
+
+		return result
+
+	def find(self, key, under=None):
+		result = self.find_all(key, under)
+		if len(result) == 0:
+			return ""
+		return result[0]
+
+# Persistent store for discovery results (~/.gmbuild_cache). Every entry records the mtimes of the
+# directories its value came from; if any of them changed the entry is dropped and only that
+# piece of discovery is redone.
+DISCOVERY_CACHE_VERSION = 1
+
+class DiscoveryCache:
+	def __init__(self, path):
+		self.path = path
+		self.entries = None	# Key -> {"value", "mtimes"}, loaded on first access
+
+	def load(self):
+		if self.entries is not None:
+			return
+
+		self.entries = {}
+		try:
+			file = open(self.path, "r")
+			data = json.loads(file.read())
+			file.close()
+			if data["version"] == DISCOVERY_CACHE_VERSION:
+				self.entries = data["entries"]
+		except:
+			pass
+
+	def save(self):
+		try:
+			file = open(self.path, "w")
+			file.write(json.dumps({"version" : DISCOVERY_CACHE_VERSION, "entries" : self.entries}))
+			file.close()
+		except OSError:
+			pass
+
+	@staticmethod
+	def get_mtime(path):
+		try:
+			return os.stat(path).st_mtime_ns
+		except OSError:
+			return None
+
+	# Returns the cached value or None if missing / stale; costs one stat() per recorded directory
+	def get(self, key):
+		self.load()
+		entry = self.entries.get(key)
+		if entry is None:
+			return None
+
+		for path, mtime in entry["mtimes"].items():
+			if self.get_mtime(path) != mtime:
+				self.invalidate(key)
+				return None
+
+		return entry["value"]
+
+	def put(self, key, value, dirs):
+		self.load()
+		# Creating the cache file touches its directory (usually the home directory, which is a
+		# search root) so make sure it exists before any mtimes are taken:
+		if not os.path.exists(self.path):
+			self.save()
+
+		mtimes = {}
+		for path in dirs:
+			mtimes[path] = self.get_mtime(path)
+
+		self.entries[key] = {"value" : value, "mtimes" : mtimes}
+		self.save()
+
+	# Drops a single entry, every entry starting w/ a key prefix, or everything if no key is given
+	def invalidate(self, key=None, is_prefix=False):
+		self.load()
+		if key is None:
+			self.entries = {}
+		elif is_prefix:
+			for entry_key in [entry_key for entry_key in self.entries if entry_key.startswith(key)]:
+				del self.entries[entry_key]
+		elif key in self.entries:
+			del self.entries[key]
+		else:
+			return
 
+		self.save()
+
+# A list that is filled in from a background generator. Readers call poll() to pull in whatever
+# has been found so far; is_done is set once the generator is exhausted and everything was pulled.
+class StreamedList(list):
+	def __init__(self, generator, on_done=None):
+		super().__init__()
+		self.queue = Queue()
+		self.on_done = on_done	# Called w/ the list, from the polling thread, once complete
+		self.is_finished = False	# Generator exhausted (set by the worker thread)
+		self.is_done = False	# Generator exhausted and all results pulled in
+
+		def read_generator(self, generator):
+			try:
+				for value in generator:
+					self.queue.put(value)
+			finally:
+				self.is_finished = True
+
+		self.process = Thread(target = read_generator, args = (self, generator), daemon = True)
+		self.process.start()
+
+	# Returns True if new values were added:
+	def poll(self):
+		if self.is_done:
+			return False
+
+		is_finished = self.is_finished
+		count = len(self)
+		while True:
+			try:
+				self.append(self.queue.get_nowait())
+			except Empty:
+				break
+
+		if is_finished:
+			self.is_done = True
+			if self.on_done is not None:
+				self.on_done(self)
+
+		return len(self) != count
+
+	def wait(self):
+		self.process.join()
+		self.poll()
+		return self
+
+# Walks the search roots a single time for both WINE prefixes and GameMaker projects, yielding
+# ("prefix", path) and ("project", path) as they are found. Excluded names / paths and anything
+# past max_depth are never entered. The walk does not descend into WINE prefixes (drive_c) or
+# git internals (.git) since neither holds anything we're looking for.
+def search_home(roots, excludes, max_depth):
+	for root in roots:
+		stack = [(root, 0)]
+		while len(stack) > 0:
+			path, depth = stack.pop()
+			try:
+				iterator = os.scandir(path)
+			except OSError:
+				continue
+
+			subdirs = []
+			is_prefix = False
+			with iterator:
+				for entry in iterator:
+					try:
+						is_dir = entry.is_dir(follow_symlinks=False)
+					except OSError:
+						continue
+
+					if is_dir:
+						if entry.name == "drive_c":
+							is_prefix = True
+							if path.find("/.directory_history/") < 0:
+								yield ("prefix", path)
+							continue
+
+						if entry.name == ".git" or depth + 1 > max_depth:
+							continue
+
+						if get_is_search_excluded(entry.path, excludes):
+							continue
+
+						subdirs.append((entry.path, depth + 1))
+					elif entry.name.endswith(".yyp") and entry.path.lower().find("cache") < 0:
+						yield ("project", entry.path)
+
+			# Nothing inside of a prefix is of interest:
+			if is_prefix:
+				continue
+
+			# Reverse so sub-directories are visited in the order they were listed:
+			subdirs.reverse()
+			stack.extend(subdirs)
+
+# Exclude globs w/o a slash match directory names. Globs w/ a slash match the end of the path
+# (".local/share/Trash" matches /home/user/.local/share/Trash), or the full path if absolute.
+def get_is_search_excluded(path, excludes):
+	name = os.path.basename(path)
+	for pattern in excludes:
+		if "/" in pattern:
+			if fnmatch.fnmatch(path, pattern if pattern.startswith("/") else "*/" + pattern):
+				return True
+		elif fnmatch.fnmatch(name, pattern):
+			return True
+
+	return False
+
+# Global variables:
 wine_path = "/home/$USER/.wine" 	# Location of root WINE prefix
 wine_gm_path = ""	# Location of GM windows executable
 wine_gm_runtime_path = ""	# Path w/o runtime version
@@ -80,120 +556,345 @@ wine_gm_config = "Default"
 wine_gm_config_index = 0
 wine_gm_lts_suffix = ""
 wine_output_errors = False
+wine_persistent_server = False	# Keep a wineserver running for the prefix between builds
+wine_instance_count = 1	# Game instances to run once a build's game is up
+wine_prefix_index = None	# PrefixIndex of the active WINE prefix, built on first lookup
+discovery_cache = None	# DiscoveryCache, created once the system user is known
+project_hasher = None	# ProjectHasher, created once the system user is known
+build_history = None	# BuildHistory, created once the system user is known
+project_models = {}	# .yyp path -> Project, parsed again once the file changes
+build_regression_factor = 1.5	# Builds slower than this times the rolling median are flagged
+asset_cache = None	# AssetCache of the active WINE prefix
+asset_cache_budget = 10	# GiB the asset compiler caches may take up before the least recently used are evicted
+search_roots = []	# Roots to search for prefixes / projects; empty searches /home/$USER
+search_excludes = ["node_modules", ".cache", ".directory_history", ".local/share/Trash", "Steam", "steamapps", "__pycache__", ".venv", "venv"]
+search_max_depth = 8	# Directory levels below a search root to descend into
+home_search = None	# Active HomeSearch; shared so prefixes and projects come from one walk
 
 cache_bff_data = {}
 
+profiler = None	# Profiler collecting timing spans, only set w/ --profile
+PROFILE_TOP = 20	# Functions printed from the cProfile stats when the tool exits
+
+# Collects timing spans of the tool's own work (discovery, file generation, process spawns, render
+# frames, ...) from every thread and writes them as Chrome trace events (load the file in
+# chrome://tracing or https://ui.perfetto.dev). Only exists w/ --profile; w/o it, spans cost a
+# global lookup.
+class Profiler:
+	def __init__(self):
+		self.time_start = time.perf_counter()
+		self.events = []	# Chrome trace events of the finished spans
+		self.threads = {}	# Thread id -> name
+		self.lock = Lock()
+
+	def add(self, name, time_start, time_end, args=None):
+		thread = current_thread()
+		event = {"name" : name, "cat" : "gmbuild", "ph" : "X", "pid" : os.getpid(), "tid" : thread.ident,
+			"ts" : round((time_start - self.time_start) * 1e6, 1), "dur" : round((time_end - time_start) * 1e6, 1)}
+		if args:
+			event["args"] = args
+		with self.lock:
+			self.events.append(event)
+			self.threads[thread.ident] = thread.name
+
+	def get_trace(self):
+		with self.lock:
+			names = [{"name" : "thread_name", "ph" : "M", "pid" : os.getpid(), "tid" : ident, "args" : {"name" : name}} for ident, name in self.threads.items()]
+			return {"traceEvents" : names + sorted(self.events, key=lambda event: event["ts"]), "displayTimeUnit" : "ms"}
+
+# A timing span; use as `with ProfileSpan("name"):`. Does nothing unless profiling.
+class ProfileSpan:
+	__slots__ = ("name", "args", "time_start")
+
+	def __init__(self, name, args=None):
+		self.name = name
+		self.args = args
+		self.time_start = 0
+
+	def __enter__(self):
+		if profiler is not None:
+			self.time_start = time.perf_counter()
+		return self
+
+	def __exit__(self, kind, value, traceback):
+		if profiler is not None and self.time_start > 0:
+			profiler.add(self.name, self.time_start, time.perf_counter(), self.args)
+		return False
+
+# Decorator wrapping every call of a function in a ProfileSpan named after it:
+def profiled(function):
+	@wraps(function)
+	def wrapper(*args, **kwargs):
+		if profiler is None:
+			return function(*args, **kwargs)
+		with ProfileSpan(function.__name__):
+			return function(*args, **kwargs)
+
+	return wrapper
+
+GM_JSON_DEAD_COMMA = re.compile(",(?=\\s*[\\]}])")
+GM_JSON_TOKEN = re.compile("(\"(?:[^\"\\\\]|\\\\.)*\")|,(?=\\s*[\\]}])")	# A string or a dead comma
+GM_JSON_FIRST_MEMBER = re.compile("\\s*\\{[ \\t]*\\r?\\n([ \\t]*)\"")
+
 	# GameMaker doesn't follow the JSON spec so we need to remove some
 	# extra commas or else the JSON parser crashes. Could use YAML but... eh.
+	# Only commas outside of strings are removed, in a single walk: the text is split at every dead
+	# comma and, as long as no quote is escaped, a comma sits inside a string whenever an odd number
+	# of quotes comes before it, so only those are put back. Documents w/ escaped quotes take a
+	# slower, string-aware pass.
 def json_strip_dead_commas(string):
-	string = re.sub(",[\\s\\t\\n]*\\}", "}", string)
-	string = re.sub(",[\\s\\t\\n]*\\]", "]", string)
-	return string
+	pieces = GM_JSON_DEAD_COMMA.split(string)
+	if len(pieces) == 1:
+		return string
+	if "\\\"" in string:
+		return GM_JSON_TOKEN.sub(lambda match: match.group(1) or "", string)
+
+	quotes = 0
+	for i in range(0, len(pieces) - 1):
+		quotes += pieces[i].count("\"")
+		if quotes % 2 == 1:
+			pieces[i] += ","
+	return "".join(pieces)
+
+@lru_cache(maxsize=8)
+def get_gm_json_member_pattern(indent):
+	return re.compile("\\n" + re.escape(indent) + "\"((?:[^\"\\\\\\n]|\\\\.)*)\"[ \\t]*:")
+
+# Reads a GameMaker JSON document (.yyp, .yy) member by member. The IDE writes every member of the
+# top-level object on a line of its own and strings can't span lines, so one scan for those lines
+# finds where every member's value starts and ends w/o tokenizing the document. A value is only
+# parsed when it is asked for, so e.g. the configs can be read w/o building the resource list.
+# Documents laid out any other way (e.g. minified) are parsed as a whole on first access.
+class GMJsonReader:
+	def __init__(self, text):
+		self.text = text
+		self.members = None	# Key -> (start, end) of its value in the text
+		self.values = {}	# Key -> parsed value
+		self.document = None	# Whole document, only if it couldn't be read member by member
+
+	@staticmethod
+	def read(path):
+		with open(path, "r") as file:
+			return GMJsonReader(file.read())
+
+	def scan(self):
+		members = {}
+		match = GM_JSON_FIRST_MEMBER.match(self.text)
+		if match is None:
+			return members
+
+		sites = list(get_gm_json_member_pattern(match.group(1)).finditer(self.text, match.start(1) - 1))
+		for i in range(0, len(sites)):
+			key = sites[i].group(1)
+			if "\\" in key:
+				key = json.loads("\"" + key + "\"")
+			end = sites[i + 1].start() if i + 1 < len(sites) else self.text.rindex("}")
+			members[key] = (sites[i].end(), end)
+
+		return members
+
+	# Returns the whole document
+	def get_document(self):
+		if self.document is None:
+			self.document = json.loads(json_strip_dead_commas(self.text))
+
+		return self.document
+
+	# Returns the value of a top-level member, or default if there is no such member
+	def get(self, key, default=None):
+		if key in self.values:
+			return self.values[key]
+		if self.document is not None:
+			return self.document.get(key, default)
+
+		if self.members is None:
+			self.members = self.scan()
+		if len(self.members) == 0:
+			return self.get_document().get(key, default)
+		if not key in self.members:
+			return default
+
+		start, end = self.members[key]
+		value = self.text[start:end].rstrip()
+		if value.endswith(","):
+			value = value[:-1]
+		try:
+			self.values[key] = json.loads(json_strip_dead_commas(value))
+		except ValueError:
+			# The lines didn't split the document into members after all
+			self.members = {}
+			return self.get_document().get(key, default)
+
+		return self.values[key]
+
+# Returns the number of terminal columns a single character occupies: 0 for combining marks, 2 for
+# wide (CJK, emoji, ...) characters and 2 for control characters (curses prints those as ^X).
+@lru_cache(maxsize=4096)
+def get_char_width(char):
+	if unicodedata.combining(char) or char == "\u200b":
+		return 0
+	if unicodedata.category(char) == "Cc":
+		return 2
+	if unicodedata.east_asian_width(char) in ("W", "F"):
+		return 2
+	return 1
+
+# Returns the number of columns a string occupies on screen when printed at column x:
+def get_text_width(text, x=0):
+	if text.isascii() and text.isprintable():
+		return len(text)
+	return clip_text(text, sys.maxsize, x)[1]
+
+# Returns the longest head of a string that fits in the given number of columns starting at
+# column x (tabs depend on it) along w/ the width it occupies. Nothing past a newline is kept as
+# curses would clear the rest of the row.
+def clip_text(text, columns, x=0):
+	if text.isascii() and text.isprintable():
+		text = text[:max(columns, 0)]
+		return (text, len(text))
+
+	used = 0
+	for i in range(0, len(text)):
+		char = text[i]
+		if char == "\n":
+			return (text[:i], used)
+		if char == "\t":
+			char_width = 8 - (x + used) % 8
+		else:
+			char_width = get_char_width(char)
+		if used + char_width > columns:
+			return (text[:i], used)
+		used += char_width
 
-# @STUB Wrapper until I find a solution to this problem
+	return (text, used)
+
+# Writes a string at (y, x), or at the cursor if they are None, clipped to what is left of the
+# row. Writing into the bottom-right cell makes curses fail after printing so that one is skipped.
+# Exactly one curses call is made; returns the number of columns written.
 def addstr(stdscr, y, x, str):
-	is_success = False
-	cutoff = 0
-	while not is_success and cutoff < len(str):
-		try:
-			# @STUB For now, cut down string if it overflows
-			if cutoff == 0:
-				stdscr.addstr(y, x, str)
-				is_success = True
-			else:
-				stdscr.addstr(y, x, str[:-cutoff])
-				is_success = True
-		except:
-			cutoff += 1
-		#height, width = stdscr.getmaxyx()
-		#subprocess.run(["echo \"ERROR:\n\tX,Y: {},{}\n\tString: {}\n\tString Len: {}\n\tWindow W,H: {}, {}\" >> ./gmbuild.log".format(x, y, str, len(str), width, height)], stdout=subprocess.PIPE,stderr=subprocess.PIPE,shell=True)
+	height, width = stdscr.getmaxyx()
+	if y is None or x is None:
+		y, x = stdscr.getyx()
 
-def get_is_regex_command(str, command):
-	pattern = command.replace(" ","\\s*")
-	pattern = "^\\s*(help\\s*)?" + pattern + "\\s*$"
-	return re.compile(pattern).match(str)
+	columns = width - x
+	if y == height - 1:
+		columns -= 1
+	if y < 0 or y >= height or x < 0 or columns <= 0:
+		return 0
 
-# Creates directories / files w/ default values
-def write_default_files():
+	str, used = clip_text(str, columns, x)
+	if len(str) == 0:
+		return 0
+
+	try:
+		stdscr.addstr(y, x, str)
+	except curses.error:
+		pass # Only if the window shrank underneath us; the next frame redraws it
+	return used
+
+# Writes a string at (y, x) and pads it w/ spaces up to `end` columns from the right edge (so by
+# default the last column is left alone), in a single curses call.
+def addstr_fill(stdscr, y, x, str, end=1):
+	height, width = stdscr.getmaxyx()
+	str, used = clip_text(str, width - end - x, x)
+	return addstr(stdscr, y, x, str + " " * (width - end - x - used))
+
+# Returns the directory all build files are generated in (Linux path):
+def get_build_dir():
+	return "{}/drive_c/users/gmbuild".format(wine_path.replace("$USER", system_user, 1))
+
+# Creates directories / files w/ default values. By default everything is written to the shared
+# gmbuild directory for the active runtime / config; matrix builds pass their own directory.
+@profiled
+def write_default_files(build_dir=None, runtime=None, config=None, target_file=""):
 	global cache_bff_data
+	is_default = build_dir is None
+	if is_default:
+		build_dir = get_build_dir()
+
 	# Generate base WINE project folder:
-	subprocess.run(["mkdir {}/drive_c/users/gmbuild".format(wine_path)],shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-	subprocess.run(["mkdir {}/drive_c/users/gmbuild/cache".format(wine_path)],shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-	subprocess.run(["mkdir {}/drive_c/users/gmbuild/temp".format(wine_path)],shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-	subprocess.run(["mkdir {}/drive_c/users/gmbuild/build".format(wine_path)],shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-	subprocess.run(["mkdir {}/drive_c/users/gmbuild/cache/ide".format(wine_path)],shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-	subprocess.run(["mkdir {}/drive_c/users/gmbuild/cache/ide/{}".format(wine_path, system_project_name)],shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-	wine_path_mod = wine_path.replace("$USER", system_user, 1)
+	for subdir in ["cache", "temp", "build"]:
+		os.makedirs("{}/{}".format(build_dir, subdir), exist_ok=True)
 
-	with open("{}/drive_c/users/gmbuild/build.bff".format(wine_path_mod), "w") as file:
-		cache_bff_data = generate_bff()
-		file.write(json.dumps(cache_bff_data, indent=4))
+	bff_data = generate_bff(build_dir, runtime, config, target_file)
+	with open("{}/build.bff".format(build_dir), "w") as file:
+		file.write(json.dumps(bff_data, indent=4))
 		file.close()
-	with open("{}/drive_c/users/gmbuild/macros.json".format(wine_path_mod), "w") as file:
-		file.write(json.dumps(generate_macros(), indent=4))
+	with open("{}/macros.json".format(build_dir), "w") as file:
+		file.write(json.dumps(generate_macros(build_dir, runtime, config), indent=4))
 		file.close()
-	with open("{}/drive_c/users/gmbuild/targetoptions.json".format(wine_path_mod), "w") as file:
+	with open("{}/targetoptions.json".format(build_dir), "w") as file:
 		file.write(json.dumps(generate_targetoptions(), indent=4))
 		file.close()
 
+	if is_default:
+		cache_bff_data = bff_data
+		get_prefix_index().add("{}/build.bff".format(build_dir))
+
+	return bff_data
+
 def generate_targetoptions():
 	options = {"runtime" : "VM"}
 	return options
 
-def generate_macros():
-	wine_path_mod = wine_path.replace("$USER", system_user, 1)
-
-	gmac_path = ""
-	bashresult = subprocess.run(["find \"{}\" -type f -name \"GMAssetCompiler.exe\" | head -1".format(wine_gm_runtime_path + wine_gm_runtime)],shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-	gmac_path = str(bashresult.stdout)[2:-3]
+def generate_macros(build_dir=None, runtime=None, config=None):
+	if build_dir is None:
+		build_dir = get_build_dir()
+	if runtime is None:
+		runtime = wine_gm_runtime
+	if config is None:
+		config = wine_gm_config
 
-	runner_path = ""
-	bashresult = subprocess.run(["find \"{}\" -type f -name \"Runner.exe\" | head -2 | grep -v x64".format(wine_gm_runtime_path + wine_gm_runtime)],shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-	runner_path = str(bashresult.stdout)[2:-3]
-
-	runner64_path = ""
-	bashresult = subprocess.run(["find \"{}\" -type f -name \"Runner.exe\" | head -2 | grep x64".format(wine_gm_runtime_path + wine_gm_runtime)],shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-	runner64_path = str(bashresult.stdout)[2:-3]
+	index = get_prefix_index()
+	gmac_path = index.find("asset_compiler", wine_gm_runtime_path + runtime)
+	runner_path = get_runner_path(False, runtime)
+	runner64_path = get_runner_path(True, runtime)
 
 	macros = {
-		"asset_compiler_cache_directory" : "{}:{}/drive_c/users/gmbuild/cache/ide".format(wine_local_drive, wine_path_mod),
+		"asset_compiler_cache_directory" : "{}:{}".format(wine_local_drive, get_asset_cache().get_path(system_project_path, runtime, config)),
 		"project_cache_directory_name" : system_project_name,
 		"project_name" : system_project_name,
 		"asset_compiler_path" : "{}:{}".format(wine_local_drive, gmac_path),
 		"runner_path" : "{}:{}".format(wine_local_drive, runner_path),
-		"x64_runner_path" : "{}:{}".format(wine_local_drive, runner_path),
+		"x64_runner_path" : "{}:{}".format(wine_local_drive, runner64_path),
 	}
 	return macros
 
-def generate_bff():
-	global wine_gm_runtime
+def generate_bff(build_dir=None, runtime=None, config=None, target_file=""):
 	global wine_local_drive
 	global wine_gm_lts_suffix
+	if build_dir is None:
+		build_dir = get_build_dir()
+	if runtime is None:
+		runtime = wine_gm_runtime
+	if config is None:
+		config = wine_gm_config
+
 	wine_path_mod = wine_path.replace("$USER", system_user, 1)
 	wine_gm_path_mod = wine_gm_path
 	# If newer runtimes, we need to launch the DLL not the EXE
-	if re.compile("^runtime-\d{4}\.").match(wine_gm_runtime):
+	if re.compile("^runtime-\\d{4}\\.").match(runtime):
 		wine_gm_path_mod = wine_gm_path_mod[0:-4] + ".dll"
 	json = {
-		"targetFile": "",
+		"targetFile": target_file,
 		"assetCompiler": "",
 		"debug": ("false", "true")[wine_gm_debug_mode],
-		"compile_output_file_name": "{}:{}/drive_c/users/gmbuild/build/{}.win".format(wine_local_drive, wine_path_mod, system_project_name),
+		"compile_output_file_name": "{}:{}/build/{}.win".format(wine_local_drive, build_dir, system_project_name),
 		"useShaders": "True",
-		"steamOptions" : "{}:{}/drive_c/users/gmbuild/steam_options.yy".format(wine_local_drive, wine_path_mod),
-		"config" : wine_gm_config,
+		"steamOptions" : "{}:{}/steam_options.yy".format(wine_local_drive, build_dir),
+		"config" : config,
 		"configParents": "",
-		"outputFolder" : "{}:{}/drive_c/users/gmbuild/build".format(wine_local_drive, wine_path_mod),
+		"outputFolder" : "{}:{}/build".format(wine_local_drive, build_dir),
 		"projectName" : system_project_name,
-		"macros" : "{}:{}/drive_c/users/gmbuild/macros.json".format(wine_local_drive, wine_path_mod),
+		"macros" : "{}:{}/macros.json".format(wine_local_drive, build_dir),
 		"projectDir": "{}:{}".format(wine_local_drive, system_project_directory),
-		"preferences": "{}:{}/drive_c/users/gmbuild/preferences.yy".format(wine_local_drive, wine_path_mod),
+		"preferences": "{}:{}/preferences.yy".format(wine_local_drive, build_dir),
 		"projectPath": "{}:{}".format(wine_local_drive, system_project_path),
-		"tempFolder": "{}:{}/drive_c/users/gmbuild/temp".format(wine_local_drive, wine_path_mod),
-		"tempFolderUnmapped": "{}:{}/drive_c/users/gmbuild/temp".format(wine_local_drive, wine_path_mod),
+		"tempFolder": "{}:{}/temp".format(wine_local_drive, build_dir),
+		"tempFolderUnmapped": "{}:{}/temp".format(wine_local_drive, build_dir),
 		"userDir" : wine_gm_user_dir,
-		"runtimeLocation": "{}:{}/drive_c/ProgramData/GameMakerStudio2{}/Cache/Runtimes/{}".format(wine_local_drive, wine_path_mod, wine_gm_lts_suffix, wine_gm_runtime),
-		"targetOptions" : "{}:{}/drive_c/users/gmbuild/targetoptions.json".format(wine_local_drive, wine_path_mod),
+		"runtimeLocation": "{}:{}/drive_c/ProgramData/GameMakerStudio2{}/Cache/Runtimes/{}".format(wine_local_drive, wine_path_mod, wine_gm_lts_suffix, runtime),
+		"targetOptions" : "{}:{}/targetoptions.json".format(wine_local_drive, build_dir),
 		"targetMask": "64",
 		"applicationPath": "{}:{}".format(wine_local_drive, wine_gm_path_mod),
 		"verbose": "False",
@@ -203,58 +904,712 @@ def generate_bff():
 	}
 	return json
 
+# Hashes the files of a project incrementally. A persistent stat cache (per project: relative
+# path -> size, mtime_ns, inode, digest) means only files whose stat changed are read again; those
+# are hashed in batches on a thread pool (hashlib releases the GIL) and large assets are read
+# through mmap. Files modified during the scan aren't trusted next time as their mtime may not
+# change again on a later edit.
+PROJECT_HASHER_VERSION = 1
+PROJECT_HASHER_MMAP_SIZE = 1 << 20	# Files at least this large are mapped instead of read
+PROJECT_HASHER_BATCH = 64	# Files per thread pool task
+
+class ProjectHasher:
+	def __init__(self, path, jobs=0):
+		self.path = path
+		self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+		self.projects = None	# Project path -> {relative path -> [size, mtime_ns, inode, digest]}
+		self.is_dirty = False
+
+	def load(self):
+		if self.projects is not None:
+			return
+
+		self.projects = {}
+		try:
+			file = open(self.path, "r")
+			data = json.loads(file.read())
+			file.close()
+			if data["version"] == PROJECT_HASHER_VERSION:
+				self.projects = data["projects"]
+		except:
+			pass
+
+	def save(self):
+		if not self.is_dirty:
+			return
+
+		try:
+			# Written in place; a rename would touch the directory (a search root) every time
+			file = open(self.path, "w")
+			file.write(json.dumps({"version" : PROJECT_HASHER_VERSION, "projects" : self.projects}))
+			file.close()
+			self.is_dirty = False
+		except OSError:
+			pass
+
+	@staticmethod
+	def hash_file(path, size):
+		digest = hashlib.sha256()
+		with open(path, "rb") as file:
+			if size >= PROJECT_HASHER_MMAP_SIZE:
+				with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+					digest.update(data)
+			else:
+				digest.update(file.read())
+
+		return digest.hexdigest()
+
+	@staticmethod
+	def hash_batch(batch):
+		digests = []
+		for path, size in batch:
+			try:
+				digests.append(ProjectHasher.hash_file(path, size))
+			except (OSError, ValueError):
+				digests.append(None)
+
+		return digests
+
+	# Hashes the given files (absolute paths below project_dir). Returns a dict w/ the combined
+	# "digest", the relative paths that were "added", "modified" or "removed" since the last scan,
+	# how many files had to be "hashed" and if the project was never scanned before ("is_new").
+	def scan(self, project_dir, files):
+		self.load()
+		scan_start = time.time_ns()
+		entries = self.projects.get(project_dir, {})
+		result = {"added" : [], "modified" : [], "removed" : [], "hashed" : 0, "is_new" : not project_dir in self.projects}
+
+		pending = []
+		new_entries = {}
+		prefix = os.path.join(project_dir, "")
+		for path in files:
+			name = path[len(prefix):] if path.startswith(prefix) else os.path.relpath(path, project_dir)
+			try:
+				stat = os.stat(path)
+			except OSError:
+				new_entries[name] = [-1, 0, 0, None]
+				if name in entries and entries[name][0] >= 0:
+					result["modified"].append(name)
+				continue
+
+			entry = entries.get(name)
+			key = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+			if entry is not None and entry[:3] == key:
+				new_entries[name] = entry
+				continue
+
+			new_entries[name] = key + [None]
+			pending.append((name, path, stat.st_size))
+
+		if len(pending) > 0:
+			batches = [pending[i:i + PROJECT_HASHER_BATCH] for i in range(0, len(pending), PROJECT_HASHER_BATCH)]
+			with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+				results = executor.map(self.hash_batch, [[(path, size) for name, path, size in batch] for batch in batches])
+				for batch, digests in zip(batches, results):
+					for (name, path, size), digest in zip(batch, digests):
+						new_entries[name][3] = digest
+			result["hashed"] = len(pending)
+
+		for name, path, size in pending:
+			entry = new_entries[name]
+			old_entry = entries.get(name)
+			if old_entry is None:
+				result["added"].append(name)
+			elif old_entry[3] != entry[3]:
+				result["modified"].append(name)
+			# Racily clean: modified within the timestamp granularity of the scan, so hash again next time
+			if entry[1] >= scan_start - 2000000000:
+				entry[1] = 0
+
+		result["removed"] = sorted([name for name in entries if not name in new_entries])
+		if len(pending) > 0 or len(result["modified"]) > 0 or len(result["removed"]) > 0 or len(new_entries) != len(entries):
+			self.projects[project_dir] = new_entries
+			self.is_dirty = True
+			self.save()
+
+		digest = hashlib.sha256()
+		for name in sorted(new_entries):
+			digest.update("{}\0{}\0".format(name, new_entries[name][3]).encode())
+		result["digest"] = digest.hexdigest()
+		return result
+
+# Watches a project directory for changes. poll() never blocks: it gathers whatever changed so far
+# and only hands the changes out once no new ones arrived for WATCH_DEBOUNCE seconds (or
+# WATCH_DEBOUNCE_MAX after the first one), so a burst of saves results in a single rebuild.
+# Changes come from inotify when available (InotifyWatcher), otherwise the tree is polled.
+WATCH_DEBOUNCE = 0.4	# Quiet time before changes are handed out
+WATCH_DEBOUNCE_MAX = 3.0	# Changes are handed out after this long even if saves keep coming
+WATCH_POLL_INTERVAL = 1.0	# Seconds between scans when polling
+WATCH_IGNORE = [".*", "*~", "*.swp", "*.tmp", "*.bak"]	# Editor / VCS files never trigger rebuilds
+
+class ProjectWatcher:
+	def __init__(self, root):
+		self.root = root
+		self.changes = set()	# Relative paths changed since the last hand-out
+		self.first_change = 0
+		self.last_change = 0
+
+	@staticmethod
+	def get_is_ignored(name):
+		for part in name.split(os.sep):
+			for pattern in WATCH_IGNORE:
+				if fnmatch.fnmatch(part, pattern):
+					return True
+
+		return False
+
+	def add_change(self, name):
+		if self.get_is_ignored(name):
+			return
+
+		now = time.time()
+		if len(self.changes) == 0:
+			self.first_change = now
+		self.changes.add(name)
+		self.last_change = now
+
+	# Returns the sorted list of changed paths (relative to the root) once they settled, else []
+	def poll(self):
+		self.read_changes()
+		if len(self.changes) == 0:
+			return []
+
+		now = time.time()
+		if now - self.last_change < WATCH_DEBOUNCE and now - self.first_change < WATCH_DEBOUNCE_MAX:
+			return []
+
+		changes = sorted(self.changes)
+		self.changes = set()
+		return changes
+
+	def read_changes(self):
+		pass
+
+	def close(self):
+		pass
+
+# Polls the tree every WATCH_POLL_INTERVAL seconds, comparing size / mtime of every file.
+class PollingWatcher(ProjectWatcher):
+	def __init__(self, root):
+		super().__init__(root)
+		self.snapshot = self.scan()
+		self.last_scan = time.time()
+
+	def scan(self):
+		snapshot = {}
+		stack = [self.root]
+		while len(stack) > 0:
+			try:
+				entries = list(os.scandir(stack.pop()))
+			except OSError:
+				continue
+
+			for entry in entries:
+				name = entry.path[len(self.root) + 1:]
+				if self.get_is_ignored(entry.name):
+					continue
+				try:
+					if entry.is_dir(follow_symlinks=False):
+						stack.append(entry.path)
+					else:
+						stat = entry.stat(follow_symlinks=False)
+						snapshot[name] = (stat.st_size, stat.st_mtime_ns)
+				except OSError:
+					pass
+
+		return snapshot
+
+	def read_changes(self):
+		if time.time() - self.last_scan < WATCH_POLL_INTERVAL:
+			return
+
+		snapshot = self.scan()
+		self.last_scan = time.time()
+		for name in set(snapshot) | set(self.snapshot):
+			if snapshot.get(name) != self.snapshot.get(name):
+				self.add_change(name)
+		self.snapshot = snapshot
+
+# inotify through ctypes; one watch per directory, new directories are watched as they appear.
+# Raises OSError if inotify isn't available (or the watch limit is hit) so callers can fall back
+# to polling.
+INOTIFY_MASK = 0x8 | 0x40 | 0x80 | 0x100 | 0x200 | 0x400	# CLOSE_WRITE, MOVED_FROM / TO, CREATE, DELETE, DELETE_SELF
+INOTIFY_ISDIR = 0x40000000
+INOTIFY_OVERFLOW = 0x4000
+INOTIFY_IGNORED = 0x8000
+
+class InotifyWatcher(ProjectWatcher):
+	def __init__(self, root):
+		super().__init__(root)
+		self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+		self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+		if self.fd < 0:
+			raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+		self.dirs = {}	# Watch descriptor -> directory
+		try:
+			self.add_tree(root)
+		except OSError:
+			self.close()
+			raise
+
+	def add_tree(self, path, is_new=False):
+		stack = [path]
+		while len(stack) > 0:
+			directory = stack.pop()
+			wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), INOTIFY_MASK)
+			if wd < 0:
+				raise OSError(ctypes.get_errno(), "inotify_add_watch failed for {}".format(directory))
+			self.dirs[wd] = directory
+
+			try:
+				entries = list(os.scandir(directory))
+			except OSError:
+				continue
+			for entry in entries:
+				if self.get_is_ignored(entry.name):
+					continue
+				if entry.is_dir(follow_symlinks=False):
+					stack.append(entry.path)
+				elif is_new:
+					# Files written before the watch existed only show up here
+					self.add_change(entry.path[len(self.root) + 1:])
+
+	def read_changes(self):
+		while True:
+			try:
+				data = os.read(self.fd, 65536)
+			except BlockingIOError:
+				return
+			except OSError:
+				return
+
+			offset = 0
+			while offset + 16 <= len(data):
+				wd, mask, cookie, length = struct.unpack_from("iIII", data, offset)
+				name = data[offset + 16:offset + 16 + length].split(b"\0", 1)[0]
+				offset += 16 + length
+
+				if mask & INOTIFY_OVERFLOW:
+					self.add_change("*")	# Events were lost, treat it as a change of everything
+					continue
+				if mask & INOTIFY_IGNORED:
+					self.dirs.pop(wd, None)
+					continue
+
+				directory = self.dirs.get(wd)
+				if directory is None or len(name) == 0:
+					continue
+
+				path = os.path.join(directory, os.fsdecode(name))
+				if mask & INOTIFY_ISDIR:
+					if mask & (0x100 | 0x80) and not self.get_is_ignored(os.fsdecode(name)):
+						try:
+							self.add_tree(path, True)
+						except OSError:
+							pass
+					continue
+
+				self.add_change(path[len(self.root) + 1:])
+
+	def close(self):
+		if self.fd >= 0:
+			os.close(self.fd)
+			self.fd = -1
+
+# Returns a one-line description of a list of changed paths:
+def get_changes_summary(changes):
+	if "*" in changes:
+		return "too many changes to track"
+	summary = ", ".join(changes[:5]) + ("", ", ...")[len(changes) > 5]
+	return "{} file{} changed: {}".format(len(changes), ("s", "")[len(changes) == 1], summary)
+
+# Returns a watcher for a directory, preferring inotify over polling.
+def get_project_watcher(root):
+	try:
+		return InotifyWatcher(root)
+	except (OSError, AttributeError):
+		return PollingWatcher(root)
+
+# Build fingerprints: a hash over everything that goes into a build (the project files, the
+# generated build files, runtime and config). It is stored next to the build files once a build
+# succeeds and, if it still matches next time while the .win is untouched, the game is launched
+# straight from the existing .win instead of running Igor again.
+BUILD_FINGERPRINT_FILE = "fingerprint.json"
+
+# A resource (or options entry) listed in the .yyp. Its .yy is only read when asked for.
+class ProjectResource:
+	__slots__ = ("project", "name", "path", "order", "document", "mtime")
+
+	def __init__(self, project, name, path, order=0):
+		self.project = project
+		self.name = name
+		self.path = path	# .yy path relative to the project directory
+		self.order = order
+		self.document = None	# GMJsonReader of the .yy, once read
+		self.mtime = None	# mtime of the .yy when it was read
+
+	# Returns the resource's kind, i.e. its top folder ("sprites", "objects", "options", ...)
+	def get_kind(self):
+		return self.path.split("/", 1)[0]
+
+	def get_dir(self):
+		return os.path.dirname(self.path)
+
+	# Returns the .yy as a GMJsonReader, reading it again only if it changed. Raises OSError /
+	# ValueError like GMJsonReader.read() if it is missing or broken.
+	def get_document(self):
+		path = os.path.join(self.project.directory, self.path)
+		mtime = os.stat(path).st_mtime
+		if self.document is None or self.mtime != mtime:
+			self.document = GMJsonReader.read(path)
+			self.mtime = mtime
+
+		return self.document
+
+class ProjectFolder:
+	__slots__ = ("name", "path", "order")
+
+	def __init__(self, name, path, order=0):
+		self.name = name
+		self.path = path	# Virtual path, e.g. folders/Sprites/Player.yy
+		self.order = order
+
+class ProjectConfig:
+	__slots__ = ("name", "parent", "children")
+
+	def __init__(self, name, parent=None):
+		self.name = name
+		self.parent = parent
+		self.children = []
+
+	# Returns the config w/ its parent chain, e.g. "Default -> Release"
+	def get_label(self):
+		if self.parent is None:
+			return self.name
+		return self.parent.get_label() + " -> " + self.name
+
+# A parsed .yyp. Every member is read from the document the first time it is needed and kept;
+# get_project() hands out the same Project until the file's mtime or size changes.
+class Project:
+	def __init__(self, path):
+		self.path = path
+		self.directory = os.path.dirname(path)
+		stat = os.stat(path)
+		self.stamp = (stat.st_mtime, stat.st_size)
+		self.document = GMJsonReader.read(path)
+		self.resources = None
+		self.resource_dirs = None	# Resource directory -> ProjectResource
+		self.folders = None
+		self.config = None	# Root ProjectConfig
+		self.included_files = None	# Paths of the included files, relative to the project directory
+
+	def get_name(self):
+		return os.path.splitext(os.path.basename(self.path))[0]
+
+	# Returns the resources followed by the options entries
+	def get_resources(self):
+		if self.resources is None:
+			self.resources = []
+			for resource in self.document.get("resources", []):
+				self.resources.append(ProjectResource(self, resource["id"]["name"], resource["id"]["path"], resource.get("order", 0)))
+			for option in self.document.get("Options", []):
+				self.resources.append(ProjectResource(self, option["name"], option["path"]))
+			self.resource_dirs = dict([(resource.get_dir(), resource) for resource in self.resources])
+
+		return self.resources
+
+	# Returns the resource a path (relative to the project directory) belongs to, or None
+	def get_resource_for(self, path):
+		self.get_resources()
+		subdir = os.path.dirname(path)
+		while len(subdir) > 0 and not subdir in self.resource_dirs:
+			subdir = os.path.dirname(subdir)
+
+		return self.resource_dirs.get(subdir)
+
+	def get_folders(self):
+		if self.folders is None:
+			self.folders = [ProjectFolder(folder["name"], folder["folderPath"], folder.get("order", 0)) for folder in self.document.get("Folders", [])]
+
+		return self.folders
+
+	def get_config(self):
+		if self.config is None:
+			def read_config(entry, parent):
+				config = ProjectConfig(entry["name"], parent)
+				config.children = [read_config(child, config) for child in entry.get("children", [])]
+				return config
+
+			self.config = read_config(self.document.get("configs", {"name" : "Default"}), None)
+
+		return self.config
+
+	# Returns every config, parents before their children
+	def get_configs(self):
+		configs = []
+		pending = [self.get_config()]
+		while len(pending) > 0:
+			config = pending.pop()
+			configs.append(config)
+			pending += reversed(config.children)
+
+		return configs
+
+	def get_included_files(self):
+		if self.included_files is None:
+			self.included_files = [os.path.join(included["filePath"], included["name"]) for included in self.document.get("IncludedFiles", [])]
+
+		return self.included_files
+
+	# Returns the sorted paths of every file that goes into a build: the .yyp, the files in the
+	# resources' directories and the included files. The directories are walked on every call as
+	# their contents can change w/o the .yyp changing.
+	def get_files(self):
+		files = set([self.path])
+		for path in self.get_included_files():
+			files.add(os.path.join(self.directory, path))
+		self.get_resources()
+		for subdir in self.resource_dirs:
+			for root, dirnames, filenames in os.walk(os.path.join(self.directory, subdir)):
+				for filename in filenames:
+					files.add(os.path.join(root, filename))
+
+		return sorted(files)
+
+# Returns the Project of a .yyp (the active one by default), parsing it again only if the file
+# changed since it was last parsed. Raises OSError / ValueError if it can't be read.
+@profiled
+def get_project(path=None):
+	if path is None:
+		path = system_project_path
+
+	project = project_models.get(path)
+	stat = os.stat(path)
+	if project is None or project.stamp != (stat.st_mtime, stat.st_size):
+		project = Project(path)
+		project_models[path] = project
+
+	return project
+
+# Returns the sorted list of files a project build depends on (the .yyp, the folder of every
+# resource / option it references and its included files) along w/ a dict mapping each resource
+# folder (relative to the project) to its resource name. Returns (None, None) if the .yyp can't be
+# read.
+def get_project_files(project_path=None):
+	try:
+		project = get_project(project_path)
+		files = project.get_files()
+	except (OSError, ValueError, KeyError, TypeError):
+		return (None, None)
+
+	return (files, dict([(subdir, resource.name) for subdir, resource in project.resource_dirs.items()]))
+
+# Returns the sorted names of the resources the given relative file paths belong to; files
+# outside of a resource folder (the .yyp, included files) are listed by path.
+def get_changed_resources(names, resources):
+	changed = set()
+	for name in names:
+		subdir = os.path.dirname(name)
+		while len(subdir) > 0 and not subdir in resources:
+			subdir = os.path.dirname(subdir)
+		changed.add(resources[subdir] if len(subdir) > 0 else name)
+
+	return sorted(changed)
+
+def get_project_hasher():
+	global project_hasher
+	if project_hasher is None:
+		project_hasher = ProjectHasher("/home/{}/.gmbuild_hashes".format(system_user))
+
+	return project_hasher
+
+# Returns the fingerprint of a build w/ the build files already generated, or None if it can't
+# be determined. Resources that changed since the project was last hashed are listed in the
+# history if one is given.
+@profiled
+def get_build_fingerprint(build_dir=None, runtime=None, config=None, history=None):
+	if build_dir is None:
+		build_dir = get_build_dir()
+	if runtime is None:
+		runtime = wine_gm_runtime
+	if config is None:
+		config = wine_gm_config
+
+	project_files, resources = get_project_files()
+	if project_files is None:
+		return None
+
+	scan = get_project_hasher().scan(os.path.dirname(system_project_path), project_files)
+	changed = get_changed_resources(scan["added"] + scan["modified"] + scan["removed"], resources)
+	if history is not None and len(changed) > 0 and not scan["is_new"]:
+		history.append("changed since the last build: {}".format(", ".join(changed[:10]) + ("", ", ...")[len(changed) > 10]))
+
+	digest = hashlib.sha256()
+	digest.update("{}\0{}\0{}\0".format(runtime, config, scan["digest"]).encode())
+	for name in ["build.bff", "macros.json", "targetoptions.json"]:
+		try:
+			with open("{}/{}".format(build_dir, name), "rb") as file:
+				digest.update(file.read())
+		except OSError:
+			digest.update(b"\0missing")
+		digest.update(b"\0")
+
+	return digest.hexdigest()
+
+# Returns the Linux path of the .win a build writes:
+def get_build_output_path(build_dir=None):
+	if build_dir is None:
+		build_dir = get_build_dir()
+
+	return "{}/build/{}.win".format(build_dir, system_project_name)
+
+# Records a fingerprint for the .win that is currently in the build directory:
+def save_build_fingerprint(fingerprint, build_dir=None):
+	if build_dir is None:
+		build_dir = get_build_dir()
+
+	try:
+		stat = os.stat(get_build_output_path(build_dir))
+		with open("{}/{}".format(build_dir, BUILD_FINGERPRINT_FILE), "w") as file:
+			file.write(json.dumps({"fingerprint" : fingerprint, "size" : stat.st_size, "mtime" : stat.st_mtime}))
+		return True
+	except OSError:
+		return False
+
+# Returns if the build directory holds a .win built from exactly the given fingerprint:
+def get_is_build_current(fingerprint, build_dir=None):
+	if build_dir is None:
+		build_dir = get_build_dir()
+
+	try:
+		with open("{}/{}".format(build_dir, BUILD_FINGERPRINT_FILE), "r") as file:
+			record = json.loads(file.read())
+		stat = os.stat(get_build_output_path(build_dir))
+	except (OSError, ValueError):
+		return False
+
+	return record.get("fingerprint") == fingerprint and record.get("size") == stat.st_size and record.get("mtime") == stat.st_mtime
+
+# Returns if the .win was (re)written since the given time, i.e. the build actually produced it:
+def get_is_output_fresh(since, build_dir=None):
+	try:
+		return os.stat(get_build_output_path(build_dir)).st_mtime >= since - 1
+	except OSError:
+		return False
+
+def get_discovery_cache():
+	global discovery_cache
+	if discovery_cache is None:
+		discovery_cache = DiscoveryCache("/home/{}/.gmbuild_cache".format(system_user))
+
+	return discovery_cache
+
+# Returns the index for the active WINE prefix. It is read from the discovery cache if none of the
+# directories holding indexed artifacts changed, otherwise the prefix is walked again.
+def get_prefix_index():
+	global wine_prefix_index
+	wine_path_mod = os.path.normpath(wine_path.replace("$USER", system_user, 1))
+	if wine_prefix_index is None or wine_prefix_index.root != wine_path_mod:
+		wine_prefix_index = PrefixIndex(wine_path_mod)
+		entries = get_discovery_cache().get("prefix:" + wine_path_mod)
+		if entries is None:
+			wine_prefix_index.scan()
+		else:
+			wine_prefix_index.entries = entries
+			wine_prefix_index.is_dirty = False
+
+	# Store anything that was discovered or added since the last lookup:
+	if wine_prefix_index.is_dirty:
+		wine_prefix_index.is_dirty = False
+		dirs = [wine_prefix_index.root]
+		for key, paths in wine_prefix_index.entries.items():
+			for path in paths:
+				dirs.append(os.path.dirname(path))
+				if key == "runtimes":
+					dirs.append(path)
+		get_discovery_cache().put("prefix:" + wine_path_mod, wine_prefix_index.entries, dirs)
+
+	return wine_prefix_index
+
+# Returns the first 32-bit or 64-bit Runner.exe of a runtime (default: the active one):
+def get_runner_path(is_x64, runtime=None):
+	if runtime is None:
+		runtime = wine_gm_runtime
+
+	for path in get_prefix_index().find_all("runner", wine_gm_runtime_path + runtime):
+		if ("x64" in path) == is_x64:
+			return path
+
+	return ""
+
+@profiled
 def find_gm_user_dir(history):
 	global wine_gm_user_dir
-	wine_path_mod = wine_path.replace("$USER", system_user, 1)
-	bashresult = subprocess.run(["find \"{}\" -name \"Manifest.enc\" | head -1".format(wine_path_mod)],shell=True,stdout=subprocess.PIPE);
-	wine_gm_user_dir = str(bashresult.stdout)[2:-3].replace("/Manifest.enc", "")
-	if bashresult.returncode == 1 or len(wine_gm_user_dir.strip()) <= 2:
+	wine_gm_user_dir = os.path.dirname(get_prefix_index().find("manifest"))
+	if len(wine_gm_user_dir.strip()) <= 2:
 		history.append("[!] failed to locate GameMaker user login data!");
 		wine_gm_user_dir = ""
 		return
 
 	history.append("found GameMaker user data in {}".format(wine_gm_user_dir))
 
-# Performs a very simplistic command match:
-def get_best_command_match(command):
-	best_match_count = 0
-	best_match_index = -1
-
-	while command[:1] == " ":
-		command = command[1:]
-
-	loop = 0
-	for value in command_list:
-		min_len = min(len(value), len(command))
-		is_match = True;
-		for i in range(1, min_len + 1):
-			if value[:i] == command[:i]:
-				continue;
-
-			is_match = False
-			break
+# Prefix tree over the command names (and 'help ...' forms) used for prompt hints and tab
+# completion. Every node knows the first command (alphabetically) below it so a lookup only walks
+# the typed characters.
+class CommandTrie:
+	def __init__(self, words=()):
+		self.root = {"children" : {}, "word" : None, "first" : None}
+		for word in sorted(words):
+			self.add(word)
+
+	def add(self, word):
+		node = self.root
+		for char in word:
+			if node["first"] is None:
+				node["first"] = word
+			node = node["children"].setdefault(char, {"children" : {}, "word" : None, "first" : None})
+
+		if node["first"] is None:
+			node["first"] = word
+		node["word"] = word
+
+	# Returns the command the text is a prefix of or, if there is none, the longest command that
+	# is a prefix of the text; None if nothing matches.
+	def complete(self, text):
+		if len(text) == 0:
+			return None
 
-		if is_match and best_match_count < min_len:
-			best_match_count = min_len
-			best_match_index = loop
+		node = self.root
+		longest = None
+		for char in text:
+			if node["word"] is not None:
+				longest = node["word"]
+			node = node["children"].get(char)
+			if node is None:
+				return longest
 
-		loop += 1
+		return node["first"]
 
-	if best_match_index < 0:
-		return {"hint" : "", "index" : -1}
+# Performs a very simplistic command match:
+def get_best_command_match(command):
+	command = command.lstrip(" ")
+	match = command_trie.complete(command)
+	if match is None:
+		return {"hint" : "", "command" : None}
 
 	return {
-		"hint" : command_list[best_match_index][len(command):],
-		"index" : best_match_index
+		"hint" : match[len(command):],
+		"command" : match
 	}
 
+@profiled
 def scan_wine_data(history):
 	# Scan for GameMaker executable:
-	bashresult = subprocess.run(["find \"{}\" -regextype posix-egrep -type f -regex \".*/GameMaker(Studio|-LTS)?\\.exe\" | head -1".format(wine_path)],shell=True,stdout=subprocess.PIPE);
 	global wine_gm_path
 	global wine_gm_lts_suffix
-	wine_gm_path = str(bashresult.stdout)[2:-3]
-	if bashresult.returncode == 1 or len(wine_gm_path.strip()) <= 2:
+	wine_gm_path = get_prefix_index().find("gamemaker")
+	if len(wine_gm_path.strip()) <= 2:
 		history.append("[!] GameMaker executable not found!")
 		wine_gm_path = ""
 	else:
@@ -264,32 +1619,93 @@ def scan_wine_data(history):
 		else:
 			wine_gm_lts_suffix = ""
 
-def get_prefix_list():
-	bashresult = subprocess.run(["find \"/home/{}\" -type d -name \"drive_c\"".format(system_user)],shell=True,stdout=subprocess.PIPE)
-	wine_string = str(bashresult.stdout)[2:-3]
-	if bashresult.returncode == 1 or len(wine_string.strip()) <= 0:
-		return []
+# Forces a full refresh of everything kept in the discovery cache:
+@profiled
+def rescan_discovery(history):
+	global wine_prefix_index
+	time_start = time.time()
+	get_discovery_cache().invalidate()
+	wine_prefix_index = None
+	find_gm_user_dir(history)
+	scan_wine_data(history)
+	runtime_list = get_runtime_list()
+	for list in [get_prefix_list(), get_project_list()]:
+		if isinstance(list, StreamedList):
+			list.wait()
+	history.append("rescan finished in {:.2f}s, {} runtime(s) available".format(time.time() - time_start, len(runtime_list)))
+
+def get_search_roots():
+	if len(search_roots) == 0:
+		return ["/home/{}".format(system_user)]
+
+	return [os.path.expanduser(root) for root in search_roots]
+
+# Cache key covering everything that changes what a search returns:
+def get_search_cache_key(kind):
+	return "{}:{}|{}|{}".format(kind, ",".join(get_search_roots()), ",".join(search_excludes), search_max_depth)
+
+# Starts (or re-uses) the shared background walk that fills both the prefix and project list:
+class HomeSearch:
+	def __init__(self):
+		roots = get_search_roots()
+		self.queues = {"prefix" : Queue(), "project" : Queue()}
+
+		def dispatch(self, kind):
+			# Splits the single walk into one generator per kind:
+			while True:
+				value = self.queues[kind].get()
+				if value is None:
+					return
+				yield value
+
+		# Only the roots and the directories of what was found are validated; watching every
+		# directory walked would invalidate the list on nearly every edit inside a project. New
+		# prefixes / projects in a new sub-directory thereby only show up after `rescan`.
+		def cache_list(values, kind):
+			dirs = roots + [(path if kind == "prefix" else os.path.dirname(path)) for path in values]
+			get_discovery_cache().put(get_search_cache_key(kind), [path for path in values], dirs)
+
+		self.prefixes = StreamedList(dispatch(self, "prefix"), lambda values: cache_list(values, "prefix"))
+		self.projects = StreamedList(dispatch(self, "project"), lambda values: cache_list(values, "project"))
+
+		def walk(self):
+			try:
+				for kind, path in search_home(roots, search_excludes, search_max_depth):
+					self.queues[kind].put(path)
+			finally:
+				self.queues["prefix"].put(None)
+				self.queues["project"].put(None)
 
-	wine_string = wine_string.replace("/drive_c", "")
-	list = wine_string.split("\\n")
-	list_final = []
-	for i in range(0, len(list)):
-		if list[i].find("/.directory_history/") >= 0:
-			continue
+		self.process = Thread(target = walk, args = (self,), daemon = True)
+		self.process.start()
 
-		list_final.append(list[i])
+	def get_is_running(self):
+		return self.process.is_alive()
 
-	return list_final
+def get_home_search(kind):
+	global home_search
+	if home_search is None or (not home_search.get_is_running() and getattr(home_search, kind).is_done):
+		home_search = HomeSearch()
+
+	return getattr(home_search, kind)
+
+# Both return either a complete list from the discovery cache or a StreamedList that is still being
+# filled by the home search; use StreamedList.wait() when the full result is needed up front.
+def get_prefix_list():
+	list = get_discovery_cache().get(get_search_cache_key("prefix"))
+	if list is not None:
+		return list
+
+	return get_home_search("prefixes")
 
 def get_project_list():
-	bashresult = subprocess.run(["find \"/home/{}\" -type f -name \"*.yyp\" | grep -iv cache".format(system_user)], shell=True,stdout=subprocess.PIPE);
-	project_string = str(bashresult.stdout)[2:-3]
-	if bashresult.returncode == 1 or len(project_string.strip()) <= 0:
-		return []
+	list = get_discovery_cache().get(get_search_cache_key("project"))
+	if list is not None:
+		return list
 
-	list = project_string.split("\\n")
-	return list
+	return get_home_search("projects")
 
+@profiled
 def get_runtime_list():
 	global wine_gm_path
 	global wine_gm_runtime_path
@@ -297,50 +1713,66 @@ def get_runtime_list():
 	if wine_gm_path == "":
 		return []
 
-	bashresult = subprocess.run(["find \"{}\" -name \"runtimes\" | head -1".format(wine_path)],shell=True,stdout=subprocess.PIPE)
-	runtime_path = str(bashresult.stdout)[1:-3] + "'"
-	if bashresult.returncode == 1 or len(runtime_path.strip()) <= 2:
+	runtime_path = get_prefix_index().find("runtimes")
+	if len(runtime_path.strip()) <= 2:
+		return []
+
+	wine_gm_runtime_path = runtime_path + "/"
+	list = get_discovery_cache().get("runtimes:" + runtime_path)
+	if list is not None:
+		return list
+
+	try:
+		list = sorted(os.listdir(runtime_path))
+	except OSError:
 		return []
 
-	wine_gm_runtime_path = runtime_path[1:-1] + "/"
-	bashresult = subprocess.run(["ls {}".format(runtime_path)], shell=True,stdout=subprocess.PIPE)
-	runtime_str = str(bashresult.stdout)[2:-3]
-	list = runtime_str.split("\\n")
+	get_discovery_cache().put("runtimes:" + runtime_path, list, [runtime_path])
 	return list
 
+@profiled
 def get_config_list():
 	global system_project_path
 	if system_project_path == "":
 		return []
 
-	def scan_for_config(scan_list, final_list, prefix=""):
-		for entry in scan_list:
-			final_list.append(prefix + entry["name"])
-			if len(entry["children"]) > 0:
-				scan_for_config(entry["children"], final_list, prefix + entry["name"] + " -> ")
+	return [config.get_label() for config in get_project().get_configs()]
 
-	file = open(system_project_path, "r")
-	content = file.read()
-	file.close()
-	pyobj = json.loads(json_strip_dead_commas(content))
-	scan_list = pyobj["configs"]
-	final_list = []
+# Strips the parent chain from an entry of get_config_list():
+def get_config_name(entry):
+	return entry.split(" -> ")[-1]
 
-	scan_for_config([scan_list], final_list)
-	return final_list
-
-def window_select_list(stdscr, titlebar, list, index=0):
+# Returns the selected index or -1 if there was nothing to select. A StreamedList is displayed
+# while it is still being filled. If a 'selected' list of indices is passed, SPACE toggles
+# entries in and out of it.
+def window_select_list(stdscr, titlebar, list, index=0, selected=None):
 	scroll = 0 # Used if window is too small
 	lastchar = 0
+	is_streaming = isinstance(list, StreamedList) and not list.is_done
 	if index >= len(list):
 		index = 0
 	if index < 0:
 		index = 0
 
 	while (True):
+		if is_streaming:
+			list.poll()
+			if list.is_done:
+				is_streaming = False
+				stdscr.timeout(-1)
+			else:
+				stdscr.timeout(100) # Redraw as new entries come in
+
+		if not is_streaming and len(list) == 0:
+			return -1
+
 		stdscr.clear()
 		height, width = stdscr.getmaxyx()
 		title = "  gmbuild-cli | " + titlebar
+		if is_streaming:
+			title += " (searching, {} found...)".format(len(list))
+		elif selected is not None:
+			title += " ([SPACE] toggle, {} selected)".format(len(selected))
 		is_too_small = False
 
 		if height < 2 or width < 24:
@@ -355,8 +1787,7 @@ def window_select_list(stdscr, titlebar, list, index=0):
 
 		# Render title bar:
 		stdscr.attron(curses.color_pair(3))
-		addstr(stdscr, 0, 0, title) # Print title text
-		addstr(stdscr, 0, len(title), " " * (width - len(title) - 1)) # Fill remaining column w/ white
+		addstr_fill(stdscr, 0, 0, title) # Print title text, fill remaining column w/ white
 		stdscr.attroff(curses.color_pair(3))
 
 		if is_too_small:
@@ -369,7 +1800,9 @@ def window_select_list(stdscr, titlebar, list, index=0):
 		while index >= height + scroll - 1:
 			scroll += 1
 
-		if lastchar == curses.KEY_DOWN:
+		if len(list) == 0:
+			pass
+		elif lastchar == curses.KEY_DOWN:
 			index += 1
 			if index >= len(list):
 				index = 0
@@ -383,137 +1816,1513 @@ def window_select_list(stdscr, titlebar, list, index=0):
 				scroll = max(0, len(list) - height + 1)
 			if index < scroll:
 				scroll -= 1
+		elif lastchar == 32 and selected is not None:
+			if index in selected:
+				selected.remove(index)
+			else:
+				selected.append(index)
 		elif lastchar == 10:
 			break
 
-		for i in range(scroll + 1, min(height - 1 + scroll, len(list)) + 1):
-			if i - 1 == index:
-				stdscr.attron(curses.color_pair(4))
-			else:
-				stdscr.attron(curses.color_pair(1))
+		for i in range(scroll + 1, min(height - 1 + scroll, len(list)) + 1):
+			if i - 1 == index:
+				stdscr.attron(curses.color_pair(4))
+			else:
+				stdscr.attron(curses.color_pair(1))
+
+			if selected is not None:
+				addstr(stdscr, i - scroll, 2, ("[ ] ", "[x] ")[i - 1 in selected] + list[i - 1])
+			else:
+				addstr(stdscr, i - scroll, 2, list[i - 1])
+
+			if i - 1 == index:
+				stdscr.attroff(curses.color_pair(4))
+			else:
+				stdscr.attroff(curses.color_pair(1))
+
+		# Refresh the screen:
+		stdscr.move(0, width - 1)
+		stdscr.refresh()
+
+		# Wait for next input
+		lastchar = stdscr.getch()
+
+	if is_streaming:
+		stdscr.timeout(-1)
+
+	return index
+
+VALIDATE_BATCH = 256	# Resources per thread pool task when checking that their .yy files exist
+
+# Returns the paths (relative to the project) of the given resources' .yy files that don't exist:
+def get_missing_resources(project, resources):
+	return [resource.path for resource in resources if not os.path.isfile(os.path.join(project.directory, resource.path))]
+
+# Returns the problems w/ a runtime: its folder or the executables a build runs are missing.
+def get_runtime_problems(runtime):
+	runtime_path = wine_gm_runtime_path + runtime
+	if not os.path.isdir(runtime_path):
+		return ["runtime folder {} doesn't exist".format(runtime_path)]
+
+	problems = []
+	for key, name in [("igor", "Igor.exe"), ("runner", "Runner.exe")]:
+		if len(get_prefix_index().find(key, runtime_path)) == 0:
+			problems.append("{} is missing from runtime {}".format(name, runtime))
+
+	return problems
+
+# Returns the problems w/ the login data and GameMaker install Igor needs to build:
+def get_login_problems():
+	problems = []
+	if len(wine_gm_user_dir) == 0 or not os.path.isdir(wine_gm_user_dir):
+		problems.append("GameMaker user login data not found, log in w/ the IDE once")
+	elif not os.path.isfile(os.path.join(wine_gm_user_dir, "Manifest.enc")):
+		problems.append("GameMaker login data in {} is incomplete (no Manifest.enc)".format(wine_gm_user_dir))
+	if len(wine_gm_path) == 0 or not os.path.isfile(wine_gm_path):
+		problems.append("GameMaker executable not found in the WINE prefix")
+
+	return problems
+
+# Checks everything a build of each (runtime, config) target relies on before WINE is started:
+# that the resources and included files referenced by the .yyp exist, that the config exists and
+# that the runtime and login data are complete. The file checks run side-by-side on a thread
+# pool. Returns {target: [problems]}, w/ an empty list for targets that are good to go.
+@profiled
+def validate_build(targets):
+	problems = []	# Problems every target shares
+	runtime_problems = {}
+	try:
+		project = get_project()
+		resources = project.get_resources()
+		configs = [config.name for config in project.get_configs()]
+	except (OSError, ValueError, KeyError, TypeError):
+		project = None
+		problems.append("project {} can't be read".format(system_project_path))
+
+	with ThreadPoolExecutor(max_workers = min(os.cpu_count() or 1, 8)) as executor:
+		login = executor.submit(get_login_problems)
+		runtimes = dict([(runtime, executor.submit(get_runtime_problems, runtime)) for runtime in set([target[0] for target in targets])])
+		missing = []
+		if project is not None:
+			missing = [executor.submit(get_missing_resources, project, resources[i:i + VALIDATE_BATCH]) for i in range(0, len(resources), VALIDATE_BATCH)]
+			included = [path for path in project.get_included_files() if not os.path.isfile(os.path.join(project.directory, path))]
+
+		problems += login.result()
+		missing = sum([future.result() for future in missing], [])
+		if len(missing) > 0:
+			problems.append("{} resource file(s) referenced by the project are missing: {}".format(len(missing), ", ".join(missing[:5]) + ("", ", ...")[len(missing) > 5]))
+		if project is not None and len(included) > 0:
+			problems.append("{} included file(s) are missing: {}".format(len(included), ", ".join(included[:5]) + ("", ", ...")[len(included) > 5]))
+		for runtime in runtimes:
+			runtime_problems[runtime] = runtimes[runtime].result()
+
+	results = {}
+	for runtime, config in targets:
+		results[(runtime, config)] = problems + runtime_problems[runtime]
+		if project is not None and not config in configs:
+			results[(runtime, config)].append("config '{}' doesn't exist, available configs: {}".format(config, ", ".join(configs)))
+
+	return results
+
+# Validates a build of the active project (see validate_build()); returns False w/ the problems
+# appended to the history if it would fail.
+def get_is_build_valid(history, runtime=None, config=None):
+	time_start = time.time()
+	problems = validate_build([(runtime or wine_gm_runtime, config or wine_gm_config)])[(runtime or wine_gm_runtime, config or wine_gm_config)]
+	for problem in problems:
+		history.append("[!] " + problem)
+	if len(problems) > 0:
+		history.append("[!] build not started, {} problem(s) found in {:.0f}ms".format(len(problems), (time.time() - time_start) * 1000))
+
+	return len(problems) == 0
+
+# Locates the build.bff and Igor.exe and returns the shell command that runs Igor w/ the requested
+# action, or None (w/ the reason appended to the history) if something is missing.
+def get_igor_command(history, use_existing=False, action="Run"):
+	global wine_gm_runtime
+
+	if use_existing:
+		bff_path = get_prefix_index().find("bff")
+		if len(bff_path) == 0:
+			history.append("[!] no build.bff file found!")
+			return None
+
+		try:
+			# Attempt to read the runtime version from the pre-generated build file:
+			file = open(bff_path, "r")
+			content = file.read()
+			file.close()
+			pyobj = json.loads(content)
+			runtime = re.findall("runtime-[0-9.]+$", pyobj["runtimeLocation"])[0]
+			history.append("[!] runtime set to {}".format(runtime));
+			wine_gm_runtime = runtime
+		except:
+			history.append("[!] error reading build.bff!")
+			return None
+	else:
+		wine_path_mod = wine_path.replace("$USER", system_user, 1)
+		bff_path = "{}:{}/drive_c/users/gmbuild/build.bff".format(wine_local_drive, wine_path_mod)
+
+	igorpath = get_prefix_index().find("igor", wine_gm_runtime_path + wine_gm_runtime)
+	if len(igorpath) == 0:
+		history.append("[!] failed to find Igor.exe!")
+		return None
+
+	history.append("executing: \"{}\" -options={} -v -- Windows {}".format(igorpath, bff_path, action))
+	return format_igor_command(wine_path, igorpath, bff_path, action)
+
+def format_igor_command(prefix, igorpath, bff_path, action):
+	if wine_output_errors:
+		return "env WINEPREFIX=\"{}\" wine \"{}\" -options={} -v -- Windows {}".format(prefix, igorpath, bff_path, action)
+
+	return "env WINEPREFIX=\"{}\" env WINEDEBUG=\"warn-all,fixme-all,trace-all,err-all\" wine \"{}\" -options={} -v -- Windows {}".format(prefix, igorpath, bff_path, action)
+
+# Launches an already built .win w/ the runtime's Runner; win_path is the WINE path of the file.
+def format_runner_command(prefix, runner_path, win_path):
+	return "env WINEPREFIX=\"{}\" env WINEDEBUG=\"warn-all,fixme-all,trace-all,err-all\" wine \"{}\" -game \"{}\"".format(prefix, runner_path, win_path)
+
+# Returns the directory wineserver keeps its socket in for a prefix (it is keyed by the device and
+# inode of the prefix, see server_init() in WINE):
+def get_wine_server_dir(prefix):
+	stat = os.stat(prefix)
+	return "/tmp/.wine-{}/server-{:x}-{:x}".format(os.getuid(), stat.st_dev, stat.st_ino)
+
+def get_is_wine_server_running(prefix):
+	try:
+		return os.path.exists(os.path.join(get_wine_server_dir(prefix.replace("$USER", system_user, 1)), "socket"))
+	except OSError:
+		return False
+
+# Starts a persistent wineserver for the prefix (it forks into the background) unless one is
+# already running; returns if one was started.
+def start_wine_server(prefix):
+	if get_is_wine_server_running(prefix):
+		return False
+
+	# The server forks and keeps the inherited stdout / stderr open; waiting on pipes would block
+	# until it exits, so only the foreground process is waited for.
+	env = dict(os.environ, WINEPREFIX=prefix.replace("$USER", system_user, 1))
+	subprocess.run(["wineserver", "-p"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+	return True
+
+# Stops the given processes (started w/ start_new_session). W/ a persistent wineserver only they
+# and whatever they started in their session are killed so the server stays warm for the next
+# build; otherwise the wineserver is told to take every process of the prefix down.
+def stop_wine_processes(prefix, processes):
+	if not wine_persistent_server:
+		subprocess.run(["env WINEPREFIX=\"{}\" wineserver -k".format(prefix)], shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
+		return
+
+	kill_process_groups(processes)
+
+# Stops processes started in a session of their own along w/ everything else in their process
+# group: SIGTERM first, SIGKILL for whatever is still running 5s later.
+def kill_process_groups(processes):
+	for sig in [signal.SIGTERM, signal.SIGKILL]:
+		for process in processes:
+			try:
+				os.killpg(process.pid, sig) # The group outlives its leader if the game is still up
+			except (ProcessLookupError, PermissionError):
+				pass
+
+		time_end = time.time() + 5
+		for process in processes:
+			try:
+				process.wait(max(time_end - time.time(), 0))
+			except subprocess.TimeoutExpired:
+				pass
+
+		if all([process.poll() is not None for process in processes]):
+			break
+
+# One entry of a build matrix. Every target builds in its own directory w/ its own temp, cache and
+# output folders so targets can run side-by-side.
+class BuildTarget:
+	def __init__(self, runtime, config):
+		self.runtime = runtime
+		self.config = config
+		self.build_dir = "{}/matrix/{}/{}".format(get_build_dir(), runtime, re.sub("[^\\w.-]", "_", config))
+		self.log_path = "{}/igor.log".format(self.build_dir)
+		self.igorpath = ""
+		self.prefix = ""	# WINE prefix the target ended up building in
+		self.process = None
+		self.exit_code = None
+		self.duration = 0
+
+	def get_name(self):
+		return "{} / {}".format(self.runtime, self.config)
+
+# Builds several runtime / config combinations at once. Each build runs in a worker thread that
+# only waits on its Igor process, so the worker count caps the number of concurrent builds. If
+# extra WINE prefixes are given every running build gets one to itself (and thereby its own
+# wineserver), otherwise all builds share the active prefix.
+class BuildMatrix:
+	def __init__(self, targets, jobs=0, prefixes=None, action="PackageZip"):
+		self.targets = targets
+		self.action = action
+		self.prefixes = Queue()
+		self.is_isolated = prefixes is not None and len(prefixes) > 0
+		self.is_terminated = False
+		self.lock = Lock()	# Orders terminate() against jobs spawning Igor
+		self.messages = Queue()	# Progress messages for the front-end
+		self.executor = None
+		self.futures = []
+		self.time_start = 0
+
+		if self.is_isolated:
+			for prefix in prefixes:
+				self.prefixes.put(prefix)
+		else:
+			self.prefixes.put(wine_path)
+
+		self.jobs = min(os.cpu_count() or 1, len(targets))
+		if jobs > 0:
+			self.jobs = min(self.jobs, jobs)
+		if self.is_isolated:
+			self.jobs = min(self.jobs, len(prefixes))
+		self.jobs = max(self.jobs, 1)
+
+	# Generates the build files for every target; must run on the main thread as it reads the
+	# global build settings. Returns the targets that are able to build.
+	def prepare(self, history):
+		runnable = []
+		problems = validate_build([(target.runtime, target.config) for target in self.targets])
+		for target in self.targets:
+			if len(problems[(target.runtime, target.config)]) > 0:
+				for problem in problems[(target.runtime, target.config)]:
+					history.append("[!] {}: {}".format(target.get_name(), problem))
+				target.exit_code = -1
+				continue
+
+			target.igorpath = get_prefix_index().find("igor", wine_gm_runtime_path + target.runtime)
+			if len(target.igorpath) == 0:
+				history.append("[!] {}: failed to find Igor.exe!".format(target.get_name()))
+				target.exit_code = -1
+				continue
+
+			zip_path = "{}:{}/build/{}.zip".format(wine_local_drive, target.build_dir, system_project_name)
+			write_default_files(target.build_dir, target.runtime, target.config, zip_path)
+			runnable.append(target)
+
+		return runnable
+
+	def build(self, target):
+		if self.is_terminated:
+			return
+
+		prefix = self.prefixes.get() if self.is_isolated else wine_path
+		cache = (system_project_path, target.runtime, target.config)
+		get_asset_cache().acquire(*cache)
+		try:
+			target.prefix = prefix
+			bff_path = "{}:{}/build.bff".format(wine_local_drive, target.build_dir)
+			bashscript = format_igor_command(prefix, target.igorpath, bff_path, self.action)
+			self.messages.put("{}: started in {}".format(target.get_name(), prefix))
+			time_start = time.time()
+			with open(target.log_path, "wb") as log:
+				with self.lock:
+					# Jobs that got this far before terminate() mustn't start Igor anymore
+					if self.is_terminated:
+						self.messages.put("[!] {}: cancelled".format(target.get_name()))
+						return
+					with ProfileSpan("spawn matrix target", {"target" : target.get_name()}):
+						target.process = subprocess.Popen([bashscript],shell=True,stdout=log,stderr=subprocess.STDOUT)
+				target.exit_code = target.process.wait()
+			target.duration = time.time() - time_start
+			zip_path = "{}/build/{}.zip".format(target.build_dir, system_project_name)
+			warning = record_build({
+				"time" : round(time_start, 3),
+				"project" : system_project_path,
+				"runtime" : target.runtime,
+				"config" : target.config,
+				"action" : self.action,
+				"duration" : round(target.duration, 3),
+				"exit_code" : target.exit_code,
+				"output_size" : get_output_size(zip_path),
+				"built" : target.exit_code == 0,
+			})
+			if warning is not None:
+				self.messages.put("[!] {}: {}".format(target.get_name(), warning[4:]))
+
+			# The prefix is ours alone, clean up whatever the build left behind
+			if self.is_isolated:
+				subprocess.run(["env WINEPREFIX=\"{}\" wineserver -k".format(prefix)], shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
+
+			self.messages.put("{}{}: finished in {:.2f}s w/ exit code {}".format(("", "[!] ")[target.exit_code != 0], target.get_name(), target.duration, target.exit_code))
+		finally:
+			for entry in get_asset_cache().release(*cache):
+				self.messages.put("asset cache budget exceeded, evicted {} ({})".format(entry["name"], format_size(entry["size"])))
+			if self.is_isolated:
+				self.prefixes.put(prefix)
+
+	def start(self, history):
+		self.time_start = time.time()
+		runnable = self.prepare(history)
+		history.append("building {} target(s), {} at a time...".format(len(runnable), self.jobs))
+		self.executor = ThreadPoolExecutor(max_workers = self.jobs)
+		self.futures = [self.executor.submit(self.build, target) for target in runnable]
+		self.executor.shutdown(wait=False)
+
+	def get_is_done(self):
+		for future in self.futures:
+			if not future.done():
+				return False
+
+		return True
+
+	# Returns any progress messages posted since the last poll:
+	def poll(self):
+		messages = []
+		while True:
+			try:
+				messages.append(self.messages.get_nowait())
+			except Empty:
+				return messages
+
+	def wait(self):
+		for future in self.futures:
+			if not future.cancelled():
+				future.result()
+
+	# Cancels the jobs that haven't started yet and kills the running ones
+	def terminate(self):
+		with self.lock:
+			self.is_terminated = True
+			for future in self.futures:
+				future.cancel()
+			for target in self.targets:
+				if target.process is not None and target.process.poll() is None:
+					target.process.kill()
+
+	def get_summary(self):
+		summary = ["{:<40} {:>10} {:>6}".format("target", "wall time", "exit")]
+		for target in self.targets:
+			exit_code = "-" if target.exit_code is None else str(target.exit_code)
+			summary.append("{:<40} {:>9.2f}s {:>6}".format(target.get_name(), target.duration, exit_code))
+		summary.append("total wall time {:.2f}s, logs are in {}/matrix".format(time.time() - self.time_start, get_build_dir()))
+		return summary
+
+	def get_exit_code(self):
+		for target in self.targets:
+			if target.exit_code != 0:
+				return 1
+
+		return 0
+
+def window_run_matrix(stdscr, titlebar, output_history, matrix):
+	matrix.start(output_history)
+	stdscr.nodelay(True)
+	lastchar = 0
+	last_height = 0
+	last_width = 0
+	history_view = HistoryView()
+	while True:
+		for message in matrix.poll():
+			output_history.append(message)
+
+		is_done = matrix.get_is_done()
+		if lastchar == ord('q') or lastchar == ord('Q'):
+			output_history.append("[!] aborting build matrix...")
+			matrix.terminate()
+			matrix.wait()
+			for message in matrix.poll():
+				output_history.append(message)
+			is_done = True
+
+		height, width = stdscr.getmaxyx()
+		if last_height != height or last_width != width:
+			stdscr.clear()
+			history_view.invalidate()
+			last_height = height
+			last_width = width
+
+		title = "  gmbuild-cli | " + titlebar
+		stdscr.attron(curses.color_pair(3))
+		addstr_fill(stdscr, 0, 0, title)
+		hint = "  [Q] abort matrix"
+		addstr_fill(stdscr, height - 1, 0, hint)
+		stdscr.attroff(curses.color_pair(3))
+
+		print_history(stdscr, output_history, -1, 0, history_view)
+		stdscr.move(0, width - 1)
+		stdscr.refresh()
+
+		if is_done:
+			break
+
+		time.sleep(0.1)
+		lastchar = stdscr.getch()
+
+	if not matrix.is_isolated:
+		subprocess.run(["env WINEPREFIX=\"{}\" wineserver -k".format(wine_path)], shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
+
+	for line in matrix.get_summary():
+		output_history.append(line)
+	stdscr.nodelay(False)
+
+# Phases of an Igor build, recognized by the first line that belongs to them. A line that matches
+# none stays in the current phase; the first pattern that matches wins (texture and audio chunks
+# are written as part of the .win, so they come before it).
+IGOR_LOG_PHASES = [
+	("runner launch", re.compile("^\\[Run\\]|^Running .*Runner\\.exe")),
+	("texture pages", re.compile("^Writing Chunk\\.\\.\\. TXTR|[Tt]exture ?[Pp]age|[Tt]exture [Gg]roup|Compressing texture|\\.yytex\\b")),
+	("audio groups", re.compile("^Writing Chunk\\.\\.\\. (AUDO|AGRP)|[Aa]udio ?[Gg]roup|^(Writing|Converting|Compressing) audio")),
+	("write .win", re.compile("^Saving IFF file|^Writing Chunk\\.\\.\\.")),
+	("GML compile", re.compile("^Compile \\w+\\.\\.\\.|^Final Compile|^Global scripts|^Remove DnD|^collapsing enums")),
+	("asset compile", re.compile("^\\[Compile\\]|GMAssetCompiler|^Reading project file|^Reading config|^Finished reading project")),
+]
+
+# Errors / warnings, most specific first; every pattern has a kind and message, most a file / line:
+IGOR_LOG_ISSUES = [
+	# Error : gml_Object_obj_player_Step_0(12) : malformed assignment
+	re.compile("^(?P<kind>error|warning)\\s*:\\s*(?P<file>gml_\\w+)\\((?P<line>\\d+)\\)\\s*:\\s*(?P<message>.*)$", re.I),
+	# C:\...\scripts\scr_move\scr_move.gml(12,4) : error GM1000 : unexpected symbol
+	re.compile("^(?P<file>.+?\\.(gml|yy|yyp))\\((?P<line>\\d+)(,\\d+)?\\)\\s*:\\s*(?P<kind>error|warning)\\b[^:]*:\\s*(?P<message>.*)$", re.I),
+	# Error : scr_move at line 12 : wrong number of arguments
+	re.compile("^(?P<kind>error|warning)\\s*:\\s*(?P<file>\\S+) at line (?P<line>\\d+)\\s*:\\s*(?P<message>.*)$", re.I),
+	# Error: something went wrong / [WARNING] something looks wrong
+	re.compile("^\\[?(?P<kind>error|warning)\\]?\\s*[:!-]?\\s+(?P<message>\\S.*)$", re.I),
+]
+
+# Follows Igor's output line by line: decodes it, tracks which phase the build is in (w/ the time
+# every phase started) and collects errors and warnings. The log is done once the game printed
+# its first line after being launched, or once finish() is called when Igor exits.
+class IgorLog:
+	def __init__(self, time_start=None, phase="startup"):
+		self.time_start = time_start if time_start is not None else time.time()
+		self.time_end = None
+		self.phase = phase
+		self.boundaries = [(phase, self.time_start)]	# (phase, time) every time the phase changes
+		self.issues = []	# {"kind", "file", "line", "message", "phase"}
+		self.line_count = 0
+		self.usage = None	# Peak RSS, CPU time and I/O of the build (see ResourceSampler.get_summary())
+
+	# Decodes a line of output w/o its line break. Igor writes UTF-8 but WINE passes some tools'
+	# output through in the Windows code page, so that is the fallback.
+	@staticmethod
+	def decode(line):
+		line = line.rstrip(b"\r\n")
+		try:
+			return line.decode("utf-8")
+		except UnicodeDecodeError:
+			return line.decode("cp1252", "replace")
+
+	def get_is_done(self):
+		return self.time_end is not None
+
+	# Takes a line of output (bytes) and returns it decoded
+	def feed(self, line, now=None):
+		text = self.decode(line)
+		if self.time_end is not None:
+			return text # The game's own output from here on
+
+		now = now if now is not None else time.time()
+		stripped = text.strip()
+		if self.phase == "runner launch" and not IGOR_LOG_PHASES[0][1].search(stripped):
+			self.finish(now) # First line from the running game
+			return text
+
+		self.line_count += 1
+		phase = self.phase
+		for name, pattern in IGOR_LOG_PHASES:
+			if pattern.search(stripped):
+				phase = name
+				break
+
+		if phase != self.phase:
+			self.phase = phase
+			self.boundaries.append((phase, now))
+
+		for pattern in IGOR_LOG_ISSUES:
+			match = pattern.match(stripped)
+			if match is not None:
+				groups = match.groupdict()
+				self.issues.append({
+					"kind" : groups["kind"].lower(),
+					"file" : groups.get("file"),
+					"line" : int(groups["line"]) if groups.get("line") is not None else None,
+					"message" : groups["message"],
+					"phase" : self.phase,
+				})
+				break
+
+		return text
+
+	def finish(self, now=None):
+		if self.time_end is None:
+			self.time_end = now if now is not None else time.time()
+
+	# Returns [(phase, seconds)] in the order the phases first showed up; phases the build went
+	# through more than once (e.g. writing the .win around texture pages) are summed up.
+	def get_phase_times(self):
+		time_end = self.time_end if self.time_end is not None else time.time()
+		times = {}
+		for i in range(0, len(self.boundaries)):
+			phase, time_phase = self.boundaries[i]
+			time_next = self.boundaries[i + 1][1] if i + 1 < len(self.boundaries) else time_end
+			times[phase] = times.get(phase, 0) + (time_next - time_phase)
+
+		return list(times.items())
+
+	def get_duration(self):
+		return (self.time_end if self.time_end is not None else time.time()) - self.time_start
+
+	# Returns the per-phase breakdown followed by the errors / warnings as lines of text
+	def get_report(self):
+		duration = self.get_duration()
+		lines = ["build phases ({:.1f}s total):".format(duration)]
+		for phase, seconds in self.get_phase_times():
+			lines.append("  {:<14}{:>8.2f}s {:>4.0f}%".format(phase, seconds, 100 * seconds / max(duration, 1e-9)))
+		if self.usage is not None:
+			lines.append("peak rss {}, cpu time {:.1f}s ({:.0f}% of a core), read {}, written {}".format(format_size(self.usage["peak_rss"]), self.usage["cpu_seconds"], 100 * self.usage["cpu_seconds"] / max(duration, 1e-9), format_size(self.usage["read_bytes"]), format_size(self.usage["write_bytes"])))
+
+		errors = len([issue for issue in self.issues if issue["kind"] == "error"])
+		warnings = len(self.issues) - errors
+		if len(self.issues) > 0:
+			lines.append("{} error(s), {} warning(s):".format(errors, warnings))
+		for issue in self.issues:
+			location = ""
+			if issue["file"] is not None:
+				location = issue["file"] + ("", "({})".format(issue["line"]))[issue["line"] is not None] + ": "
+			lines.append("  {}: {}{}".format(issue["kind"], location, issue["message"]))
+
+		return lines
+
+	def get_json(self):
+		return {
+			"duration" : round(self.get_duration(), 3),
+			"phases" : [{"phase" : phase, "seconds" : round(seconds, 3)} for phase, seconds in self.get_phase_times()],
+			"boundaries" : [{"phase" : phase, "offset" : round(time_phase - self.time_start, 3)} for phase, time_phase in self.boundaries],
+			"issues" : self.issues,
+			"lines" : self.line_count,
+			"usage" : self.usage,
+		}
+
+BUILD_HISTORY_WINDOW = 10	# Builds the rolling median is taken over
+BUILD_HISTORY_MIN = 3	# Builds needed before the median is trusted to flag slow builds
+
+# Append-only record of every build, one JSON object per line. Entries are only ever appended so
+# the UI, the daemon and headless builds can share it; lines that fail to parse (e.g. cut off by a
+# crash) are skipped.
+class BuildHistory:
+	def __init__(self, path):
+		self.path = path
+
+	def append(self, entry):
+		try:
+			with open(self.path, "a") as file:
+				file.write(json.dumps(entry) + "\n")
+			return True
+		except OSError:
+			return False
+
+	# Returns every entry (of a single project if given), oldest first
+	def load(self, project=None):
+		entries = []
+		try:
+			with open(self.path, "r") as file:
+				for line in file:
+					try:
+						entry = json.loads(line)
+					except ValueError:
+						continue
+					if isinstance(entry, dict) and (project is None or entry.get("project") == project):
+						entries.append(entry)
+		except OSError:
+			pass
+
+		return entries
+
+	# Builds are only compared to builds of the same project, runtime, config and action:
+	@staticmethod
+	def get_key(entry):
+		return (entry.get("project"), entry.get("runtime"), entry.get("config"), entry.get("action"))
+
+	# Returns if an entry measures an actual build: one that wrote its output and wasn't a relaunch
+	# of an up-to-date .win. Builds stopped after the .win was written (e.g. by closing the game)
+	# still count.
+	@staticmethod
+	def get_is_timed(entry):
+		return entry.get("built", False) and not entry.get("skipped", False) and entry.get("exit_code") in (0, None)
+
+	# Returns the median duration of the last BUILD_HISTORY_WINDOW timed builds like the given one,
+	# or None if there are too few of them
+	@staticmethod
+	def get_rolling_median(entries, entry):
+		key = BuildHistory.get_key(entry)
+		durations = [other["duration"] for other in entries if BuildHistory.get_key(other) == key and BuildHistory.get_is_timed(other)]
+		durations = durations[-BUILD_HISTORY_WINDOW:]
+		if len(durations) < BUILD_HISTORY_MIN:
+			return None
+
+		return statistics.median(durations)
+
+	# Groups the timed builds by project / runtime / config / action and returns, most recently
+	# built first, each group's duration percentiles, per-phase medians, trend (median of the last
+	# window vs. the one before it) and the builds that took more than factor times the rolling
+	# median of the builds before them.
+	@staticmethod
+	def get_stats(entries, factor):
+		groups = {}
+		for entry in entries:
+			if BuildHistory.get_is_timed(entry):
+				groups.setdefault(BuildHistory.get_key(entry), []).append(entry)
+
+		stats = []
+		for key, group in groups.items():
+			durations = [entry["duration"] for entry in group]
+			phases = {}
+			for entry in group:
+				for phase, seconds in entry.get("phases", {}).items():
+					phases.setdefault(phase, []).append(seconds)
+
+			slow = []
+			for i in range(BUILD_HISTORY_MIN, len(group)):
+				median = statistics.median(durations[max(i - BUILD_HISTORY_WINDOW, 0):i])
+				if durations[i] > median * factor:
+					slow.append({"time" : group[i]["time"], "duration" : durations[i], "median" : round(median, 3), "factor" : round(durations[i] / max(median, 1e-9), 2), "fingerprint" : group[i].get("fingerprint")})
+
+			trend = None
+			previous = durations[-2 * BUILD_HISTORY_WINDOW:-BUILD_HISTORY_WINDOW]
+			if len(previous) >= BUILD_HISTORY_MIN:
+				trend = round(statistics.median(durations[-BUILD_HISTORY_WINDOW:]) / max(statistics.median(previous), 1e-9) - 1, 3)
+
+			stats.append({
+				"project" : key[0],
+				"runtime" : key[1],
+				"config" : key[2],
+				"action" : key[3],
+				"builds" : len(group),
+				"last" : group[-1]["time"],
+				"min" : min(durations),
+				"p50" : get_percentile(durations, 50),
+				"p90" : get_percentile(durations, 90),
+				"p99" : get_percentile(durations, 99),
+				"max" : max(durations),
+				"trend" : trend,
+				"phases" : dict([(phase, round(statistics.median(values), 3)) for phase, values in phases.items()]),
+				"slow" : slow,
+			})
+
+		return sorted(stats, key=lambda group: group["last"], reverse=True)
+
+# Returns the nearest-rank percentile of a list of numbers:
+def get_percentile(values, percent):
+	values = sorted(values)
+	return values[max(-(-len(values) * percent // 100) - 1, 0)]
+
+def get_build_history():
+	global build_history
+	if build_history is None:
+		build_history = BuildHistory("/home/{}/.gmbuild_builds".format(system_user))
+
+	return build_history
+
+# Appends a build to the build history. Returns a warning if it took more than
+# build_regression_factor times the rolling median of the same kind of build, else None.
+def record_build(entry):
+	history = get_build_history()
+	median = BuildHistory.get_rolling_median(history.load(entry["project"]), entry)
+	history.append(entry)
+	if median is None or not BuildHistory.get_is_timed(entry) or entry["duration"] <= median * build_regression_factor:
+		return None
+
+	return "[!] build took {:.1f}s, {:.1f}x the rolling median ({:.1f}s)".format(entry["duration"], entry["duration"] / max(median, 1e-9), median)
+
+# Returns the output size of a finished build, or None if it has no output:
+def get_output_size(path):
+	try:
+		return os.stat(path).st_size
+	except OSError:
+		return None
+
+# Formats build statistics (see BuildHistory.get_stats()) as lines of text:
+def format_build_stats(stats):
+	if len(stats) == 0:
+		return ["no builds recorded yet"]
+
+	lines = []
+	for group in stats:
+		lines.append("{} / {} / {} ({}): {} build(s), last on {}".format(os.path.splitext(os.path.basename(group["project"] or "?"))[0], group["runtime"], group["config"], group["action"], group["builds"], time.strftime("%Y-%m-%d %H:%M", time.localtime(group["last"]))))
+		summary = "  p50 {:.1f}s, p90 {:.1f}s, p99 {:.1f}s, min {:.1f}s, max {:.1f}s".format(group["p50"], group["p90"], group["p99"], group["min"], group["max"])
+		if group["trend"] is not None:
+			summary += ", trend {:+.0f}% (last {} vs. the {} before)".format(group["trend"] * 100, BUILD_HISTORY_WINDOW, BUILD_HISTORY_WINDOW)
+		lines.append(summary)
+		if len(group["phases"]) > 0:
+			lines.append("  phase medians: " + ", ".join(["{} {:.1f}s".format(phase, seconds) for phase, seconds in group["phases"].items()]))
+		for slow in group["slow"][-5:]:
+			lines.append("  [!] {} took {:.1f}s, {:.1f}x the rolling median ({:.1f}s)".format(time.strftime("%Y-%m-%d %H:%M", time.localtime(slow["time"])), slow["duration"], slow["factor"], slow["median"]))
+
+	return lines
+
+ASSET_CACHE_INDEX = "index.json"
+
+# Asset compiler caches, one per project / runtime / config so builds never share (or wipe) each
+# other's compiled texture pages and audio groups. They live outside the gmbuild directory, so
+# cleaning build files leaves them warm. The size and last use of each cache are kept in an index;
+# once they add up to more than the budget the least recently used caches are evicted.
+class AssetCache:
+	def __init__(self, root, budget):
+		self.root = root
+		self.budget = budget	# Bytes the caches may take up in total
+		self.entries = None	# Cache name -> {"project", "runtime", "config", "size", "used"}
+		self.active = set()	# Names of the caches running builds use, never evicted
+		self.lock = Lock()	# Matrix builds finish on their own threads
+
+	# Returns the cache directory name (relative to the root) of a project / runtime / config.
+	# The project's path is hashed in so two projects w/ the same name don't collide.
+	@staticmethod
+	def get_name(project, runtime, config):
+		digest = hashlib.sha1(project.encode("utf-8")).hexdigest()[:8]
+		project_name = re.sub("[^\\w.-]", "_", os.path.splitext(os.path.basename(project))[0])
+		return "{}-{}/{}/{}".format(project_name, digest, re.sub("[^\\w.-]", "_", runtime), re.sub("[^\\w.-]", "_", config))
+
+	# Loads the index and reconciles it w/ the disk: caches deleted by hand are dropped, caches
+	# the index doesn't know about (e.g. from an older index) are measured and added.
+	def load(self):
+		if self.entries is not None:
+			return
+
+		self.entries = {}
+		try:
+			with open(os.path.join(self.root, ASSET_CACHE_INDEX), "r") as file:
+				self.entries = json.load(file)["caches"]
+		except (OSError, ValueError, KeyError, TypeError):
+			pass
+
+		names = []
+		try:
+			for project_dir in os.scandir(self.root):
+				if not project_dir.is_dir(follow_symlinks=False):
+					continue
+				for runtime_dir in os.scandir(project_dir.path):
+					if not runtime_dir.is_dir(follow_symlinks=False):
+						continue
+					for config_dir in os.scandir(runtime_dir.path):
+						if config_dir.is_dir(follow_symlinks=False):
+							names.append("{}/{}/{}".format(project_dir.name, runtime_dir.name, config_dir.name))
+		except OSError:
+			pass
+
+		for name in list(self.entries.keys()):
+			if not name in names:
+				del self.entries[name]
+		for name in names:
+			if not name in self.entries:
+				path = os.path.join(self.root, name)
+				self.entries[name] = {"project" : None, "runtime" : name.split("/")[1], "config" : name.split("/")[2], "size" : get_dir_size(path), "used" : os.stat(path).st_mtime}
+
+	def save(self):
+		try:
+			os.makedirs(self.root, exist_ok=True)
+			with tempfile.NamedTemporaryFile("w", dir=self.root, prefix=".index-", delete=False) as file:
+				file.write(json.dumps({"caches" : self.entries}))
+			os.replace(file.name, os.path.join(self.root, ASSET_CACHE_INDEX))
+		except OSError:
+			pass
+
+	# Returns the (Linux) cache directory for a build, creating it if needed
+	def get_path(self, project, runtime, config):
+		path = os.path.join(self.root, self.get_name(project, runtime, config))
+		os.makedirs(path, exist_ok=True)
+		return path
+
+	# Returns the cache directory for a build and marks it in use until release(); call right
+	# before the build starts
+	def acquire(self, project, runtime, config):
+		name = self.get_name(project, runtime, config)
+		path = self.get_path(project, runtime, config)
+		with self.lock:
+			self.load()
+			entry = self.entries.setdefault(name, {"size" : 0})
+			entry.update({"project" : project, "runtime" : runtime, "config" : config, "used" : time.time()})
+			self.active.add(name)
+
+		return path
+
+	# Call once a build is done w/ its cache: measures it, then evicts caches over the budget.
+	# Returns the entries evicted.
+	def release(self, project, runtime, config):
+		name = self.get_name(project, runtime, config)
+		size = get_dir_size(os.path.join(self.root, name))
+		with self.lock:
+			self.load()
+			self.active.discard(name)
+			entry = self.entries.setdefault(name, {"project" : project, "runtime" : runtime, "config" : config})
+			entry.update({"size" : size, "used" : time.time()})
+			evicted = self.evict()
+			self.save()
+
+		return evicted
+
+	# Removes the least recently used caches not in use until the rest fit in the budget:
+	def evict(self):
+		evicted = []
+		total = self.get_size()
+		for name, entry in sorted(self.entries.items(), key=lambda item: item[1].get("used", 0)):
+			if total <= self.budget:
+				break
+			if name in self.active:
+				continue
+			shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+			total -= entry.get("size", 0)
+			evicted.append(dict(entry, name=name))
+			del self.entries[name]
+
+		return evicted
+
+	# Removes every cache of a project, or every cache if no project is given. Returns the number
+	# of caches and bytes removed.
+	def remove(self, project=None):
+		with self.lock:
+			self.load()
+			prefix = None if project is None else self.get_name(project, "", "").split("/")[0] + "/"
+			names = [name for name in self.entries if prefix is None or name.startswith(prefix)]
+			size = 0
+			for name in names:
+				shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+				size += self.entries.pop(name).get("size", 0)
+			if prefix is not None:
+				shutil.rmtree(os.path.join(self.root, prefix), ignore_errors=True)
+			self.save()
+
+		return len(names), size
+
+	def get_size(self):
+		return sum([entry.get("size", 0) for entry in self.entries.values()])
+
+	# Returns the caches, most recently used first
+	def get_entries(self):
+		with self.lock:
+			self.load()
+			return sorted([dict(entry, name=name) for name, entry in self.entries.items()], key=lambda entry: entry.get("used", 0), reverse=True)
+
+# Returns the total size of the files in a directory tree:
+def get_dir_size(path):
+	size = 0
+	for root, dirs, files in os.walk(path):
+		for name in files:
+			try:
+				size += os.lstat(os.path.join(root, name)).st_size
+			except OSError:
+				pass
+
+	return size
+
+# Returns the asset cache of the active WINE prefix:
+def get_asset_cache():
+	global asset_cache
+	root = "{}/drive_c/users/gmbuild-cache".format(wine_path.replace("$USER", system_user, 1))
+	if asset_cache is None or asset_cache.root != root:
+		asset_cache = AssetCache(root, int(asset_cache_budget * 1024 ** 3))
+	asset_cache.budget = int(asset_cache_budget * 1024 ** 3)
+
+	return asset_cache
+
+# Formats a size in bytes for display:
+def format_size(size):
+	if size < 1024:
+		return "{} B".format(size)
+	for unit in ["KiB", "MiB"]:
+		size /= 1024
+		if size < 1024:
+			return "{:.1f} {}".format(size, unit)
+
+	return "{:.2f} GiB".format(size / 1024)
+
+SAMPLE_INTERVAL = 0.5	# Seconds between resource usage samples
+SAMPLE_FILE = "usage.csv"	# Time series of the last build's resource usage, in the build directory
+PROC_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+PROC_CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+# Reads /proc/<pid>/stat, status and io of every process in the given sessions in a single pass.
+# Builds and game instances are started in a session of their own, so it holds Igor / the Runner
+# along w/ every WINE process they spawned. Returns {session: {(pid, start time): [CPU ticks,
+# RSS bytes, bytes read, bytes written]}}; I/O counters read as 0 where /proc/<pid>/io is denied.
+def read_session_processes(sessions):
+	processes = dict([(session, {}) for session in sessions])
+	try:
+		pids = [name for name in os.listdir("/proc") if name.isdigit()]
+	except OSError:
+		return processes
+
+	for pid in pids:
+		try:
+			with open("/proc/{}/stat".format(pid), "rb") as file:
+				stat = file.read()
+		except OSError:
+			continue
+		# Fields after the command name (which can hold spaces), starting at the state:
+		fields = stat[stat.rfind(b")") + 2:].split()
+		session = int(fields[3])
+		if not session in processes:
+			continue
+
+		usage = [int(fields[11]) + int(fields[12]), int(fields[21]) * PROC_PAGE_SIZE, 0, 0]	# utime + stime, rss
+		try:
+			with open("/proc/{}/status".format(pid), "rb") as file:
+				for line in file:
+					if line.startswith(b"VmRSS:"):
+						usage[1] = int(line.split()[1]) * 1024
+						break
+			with open("/proc/{}/io".format(pid), "rb") as file:
+				for line in file:
+					if line.startswith(b"read_bytes:"):
+						usage[2] = int(line.split()[1])
+					elif line.startswith(b"write_bytes:"):
+						usage[3] = int(line.split()[1])
+		except (OSError, ValueError, IndexError):
+			pass
+		processes[session][(int(pid), int(fields[19]))] = usage
+
+	return processes
+
+# Samples the CPU, memory and disk I/O of process trees (a build, game instances, ...) every
+# SAMPLE_INTERVAL on a thread of its own, optionally writing every sample to a CSV time series.
+# Each tree is a session, added by name w/ the pid of its leader. The CPU time and I/O of
+# processes that already exited are kept, so the totals cover everything a tree ever ran. The
+# thread stops by itself once every tree has exited.
+class ResourceSampler:
+	def __init__(self, path=None):
+		self.path = path	# CSV time series, None to not write one
+		self.sessions = {}	# Name -> session id
+		self.processes = {}	# Name -> {(pid, start time): usage} of every process seen
+		self.usage = {}	# Name -> {"cpu", "rss", "read", "write", "ticks"} of the last sample
+		self.peak_rss = {}	# Name -> largest RSS sampled
+		self.time_sample = None
+		self.time_start = time.time()
+		self.lock = Lock()
+		self.stop_event = Event()
+		self.thread = None
+
+	def add(self, name, pid):
+		with self.lock:
+			self.sessions[name] = pid
+
+	def start(self):
+		self.thread = Thread(target=self.run, daemon=True)
+		self.thread.start()
+
+	def stop(self):
+		self.stop_event.set()
+		if self.thread is not None and self.thread is not current_thread():
+			self.thread.join()
+
+	def run(self):
+		file = None
+		if self.path is not None:
+			try:
+				file = open(self.path, "w")
+				file.write("time,process,cpu_percent,rss_bytes,read_bytes,write_bytes\n")
+			except OSError:
+				file = None
+
+		try:
+			while True:
+				is_running = self.sample(file)
+				if not is_running or self.stop_event.wait(SAMPLE_INTERVAL):
+					break
+		finally:
+			if file is not None:
+				file.close()
 
-			addstr(stdscr, i - scroll, 2, list[i - 1])
+	# Takes a sample of every tree; returns False once none of them has a process left
+	def sample(self, file=None):
+		with self.lock:
+			sessions = dict(self.sessions)
+		data = read_session_processes(list(sessions.values()))
+		now = time.time()
+		rows = []
+		with self.lock:
+			for name, session in sessions.items():
+				seen = self.processes.setdefault(name, {})
+				seen.update(data[session])
+				ticks = sum([usage[0] for usage in seen.values()])
+				previous = self.usage.get(name)
+				cpu = 0.0
+				if previous is not None and self.time_sample is not None:
+					cpu = (ticks - previous["ticks"]) / PROC_CLOCK_TICKS / max(now - self.time_sample, 1e-3) * 100
+				usage = {
+					"cpu" : cpu,
+					"rss" : sum([usage[1] for usage in data[session].values()]),
+					"read" : sum([usage[2] for usage in seen.values()]),
+					"write" : sum([usage[3] for usage in seen.values()]),
+					"ticks" : ticks,
+				}
+				self.usage[name] = usage
+				self.peak_rss[name] = max(self.peak_rss.get(name, 0), usage["rss"])
+				rows.append("{:.2f},{},{:.1f},{},{},{}\n".format(now - self.time_start, name, cpu, usage["rss"], usage["read"], usage["write"]))
+			self.time_sample = now
+
+		if file is not None:
+			file.write("".join(rows))
+			file.flush()
+
+		return any([len(processes) > 0 for processes in data.values()])
+
+	# Returns the last sample of a tree, or of every tree summed up if no name is given
+	def get_usage(self, name=None):
+		with self.lock:
+			samples = [self.usage[key] for key in self.usage if name is None or key == name]
+			return {
+				"cpu" : sum([usage["cpu"] for usage in samples]),
+				"rss" : sum([usage["rss"] for usage in samples]),
+				"read" : sum([usage["read"] for usage in samples]),
+				"write" : sum([usage["write"] for usage in samples]),
+			}
+
+	# Returns the peak RSS, CPU time and total I/O of a tree for the end-of-build summary
+	def get_summary(self, name):
+		usage = self.get_usage(name)
+		with self.lock:
+			return {
+				"peak_rss" : self.peak_rss.get(name, 0),
+				"cpu_seconds" : round(self.usage.get(name, {"ticks" : 0})["ticks"] / PROC_CLOCK_TICKS, 2),
+				"read_bytes" : usage["read"],
+				"write_bytes" : usage["write"],
+			}
+
+# Formats a resource usage sample (see ResourceSampler.get_usage()) for a status line:
+def format_usage(usage):
+	return "cpu {:.0f}% | rss {} | read {} | written {}".format(usage["cpu"], format_size(usage["rss"]), format_size(usage["read"]), format_size(usage["write"]))
+
+# A single build of the active project w/ its output read by an OutputPump. If the build
+# fingerprint still matches the last successful build, the existing .win is launched instead of
+# running Igor. Pass is_stderr_read=False to leave stderr to the terminal (or drop it).
+class WineBuild:
+	def __init__(self, history, pump, use_existing=False, action="Run", is_stderr_read=True, is_launched=False):
+		self.history = history
+		self.pump = pump
+		self.use_existing = use_existing
+		self.action = action
+		self.is_launched = is_launched	# Launch the last build's .win w/ the Runner instead of building
+		self.is_stderr_read = is_stderr_read
+		self.process = None
+		self.fingerprint = None
+		self.tag = "igor"	# Pump tag of the build's own output
+		self.name = "Igor"
+		self.time_start = 0
+		self.time_first_output = None	# Seconds until the first line of output arrived
+		self.is_server_warm = False	# If a wineserver was already running for the prefix
+		self.is_timed = False	# If the build time was reported
+		self.log = None	# IgorLog of the build's own output
+		self.is_reported = False	# If the phase report was handed out
+		self.is_recorded = False	# If the build was added to the build history
+		self.sampler = None	# ResourceSampler of the build's process tree (and extra game instances)
+		self.cache = None	# (project, runtime, config) of the asset cache held while Igor runs
+
+	# Generates the build files and starts Igor (or the Runner); returns False if it couldn't start
+	def start(self):
+		write_default_files() # Generate required files for the build
+		if not self.use_existing and not self.is_launched and self.action == "Run":
+			self.fingerprint = get_build_fingerprint(history=self.history)
+
+		self.time_start = time.time()
+		is_current = self.fingerprint is not None and get_is_build_current(self.fingerprint)
+		if is_current:
+			self.history.append("[!] project unchanged since the last build, launching {}.win directly".format(system_project_name))
+		elif self.is_launched and not os.path.exists(get_build_output_path()):
+			self.history.append("[!] {}.win hasn't been built yet!".format(system_project_name))
+			return False
+
+		if is_current or self.is_launched:
+			runpath = get_prefix_index().find("runner", wine_gm_runtime_path + wine_gm_runtime)
+			bashscript = format_runner_command(wine_path, runpath, cache_bff_data["compile_output_file_name"])
+			self.tag = "game instance 1"
+			self.name = "Runner"
+			self.is_timed = True
+		else:
+			# A generated build.bff is checked up front so a broken project fails in ms, not after WINE starts
+			if not self.use_existing and not get_is_build_valid(self.history):
+				return False
+			bashscript = get_igor_command(self.history, self.use_existing, self.action)
+		if bashscript is None:
+			return False
+
+		if self.name == "Igor":
+			self.cache = (system_project_path, wine_gm_runtime, wine_gm_config)
+			get_asset_cache().acquire(*self.cache)
+		self.log = IgorLog(self.time_start, ("startup", "runner launch")[self.name == "Runner"])
+		self.is_server_warm = get_is_wine_server_running(wine_path)
+		if wine_persistent_server:
+			start_wine_server(wine_path)
+
+		if self.is_stderr_read:
+			stderr = subprocess.PIPE
+		else:
+			stderr = (None if wine_output_errors else subprocess.DEVNULL)
+		# Own session so the build (and the game it starts) can be killed w/o the wineserver
+		with ProfileSpan("spawn " + self.name):
+			self.process = subprocess.Popen([bashscript],shell=True,stdout=subprocess.PIPE,stderr=stderr,start_new_session=True)
+		self.pump.add(self.process.stdout, self.tag, self.process)
+		if self.is_stderr_read:
+			# stderr is always drained (even if not displayed) so a full pipe can never stall WINE
+			self.pump.add(self.process.stderr, "wine", self.process)
+		self.sampler = ResourceSampler("{}/{}".format(get_build_dir(), SAMPLE_FILE))
+		self.sampler.add(self.name, self.process.pid)
+		self.sampler.start()
+
+		return True
+
+	# Call for every line from the pump; returns the line decoded
+	def on_line(self, tag, line):
+		if tag != self.tag or self.process is None:
+			return IgorLog.decode(line)
+
+		if self.time_first_output is None:
+			self.time_first_output = time.time() - self.time_start
+		return self.log.feed(line)
+
+	# Returns a short description of the build's timing once known, e.g. for watch mode
+	def get_timing(self, duration):
+		timing = "{:.1f}s".format(duration)
+		if self.time_first_output is not None:
+			timing += " (first output after {:.2f}s, wineserver {})".format(self.time_first_output, ("cold", "warm")[self.is_server_warm])
+		return timing
+
+	# Handles an exit event from the pump; returns if it belongs to this build. Events of an
+	# earlier, killed build may still arrive under the same tag while this one is running.
+	def on_exit(self, tag, code):
+		if tag != self.tag or self.process is None or self.process.poll() is None:
+			return False
+
+		self.log.finish()
+		if code == 0 and self.fingerprint is not None and get_is_output_fresh(self.time_start):
+			save_build_fingerprint(self.fingerprint)
+		self.record(code)
+		return True
+
+	# Lets go of the asset cache once the build is over, evicting caches over the budget:
+	def release_cache(self):
+		if self.cache is None:
+			return
 
-			if i - 1 == index:
-				stdscr.attroff(curses.color_pair(4))
-			else:
-				stdscr.attroff(curses.color_pair(1))
+		for entry in get_asset_cache().release(*self.cache):
+			self.history.append("asset cache budget exceeded, evicted {} ({})".format(entry["name"], format_size(entry["size"])))
+		self.cache = None
 
-		# Refresh the screen:
-		stdscr.move(0, width - 1)
-		stdscr.refresh()
+	# Adds the build to the build history once it is over (code is None if it was killed)
+	def record(self, code):
+		self.release_cache()
+		if self.is_recorded or self.log is None:
+			return
 
-		# Wait for next input
-		lastchar = stdscr.getch()
+		self.is_recorded = True
+		self.log.finish()
+		warning = record_build({
+			"time" : round(self.time_start, 3),
+			"project" : system_project_path,
+			"runtime" : wine_gm_runtime,
+			"config" : wine_gm_config,
+			"action" : self.action,
+			"fingerprint" : self.fingerprint,
+			"duration" : round(self.log.get_duration(), 3),
+			"phases" : dict([(phase, round(seconds, 3)) for phase, seconds in self.log.get_phase_times()]),
+			"exit_code" : code,
+			"output_size" : get_output_size(get_build_output_path()),
+			"built" : get_is_output_fresh(self.time_start),
+			"skipped" : self.name == "Runner",
+			"errors" : len([issue for issue in self.log.issues if issue["kind"] == "error"]),
+			"warnings" : len([issue for issue in self.log.issues if issue["kind"] == "warning"]),
+			"server" : ("cold", "warm")[self.is_server_warm],
+			"usage" : self.sampler.get_summary(self.name) if self.sampler is not None else None,
+		})
+		if warning is not None:
+			self.history.append(warning)
+
+	# Call periodically; returns the seconds the build took the first time the .win is complete
+	# (Igor moved on to launching the Runner or exited w/ 0) or the process exited, else None. A
+	# fresh mtime alone isn't enough as Igor writes the .win chunk by chunk. The fingerprint is
+	# recorded as soon as the .win is complete as Igor keeps running w/ the game (and may get
+	# killed w/ it).
+	def poll(self):
+		if self.is_timed or self.process is None:
+			return None
 
-	return index
+		code = self.process.poll()
+		is_complete = self.log.phase == "runner launch" or code == 0
+		if is_complete or code is not None:
+			self.is_timed = True
+			if is_complete and self.fingerprint is not None and get_is_output_fresh(self.time_start):
+				save_build_fingerprint(self.fingerprint)
+			return time.time() - self.time_start
 
-def window_run_wine(stdscr, titlebar, output_history, use_existing=False):
-	global wine_gm_runtime
+		return None
+
+	# Returns the IgorLog once the build is over (the game printed its first line or Igor exited)
+	# the first time it is called after that, else None
+	def poll_report(self):
+		if self.is_reported or self.log is None or not self.log.get_is_done():
+			return None
+
+		self.is_reported = True
+		if self.sampler is not None:
+			self.log.usage = self.sampler.get_summary(self.name)
+		return self.log
+
+	# Kills the build along w/ the given processes (e.g. extra game instances); see
+	# stop_wine_processes()
+	def kill(self, processes=[]):
+		if self.process is not None:
+			processes = [self.process] + processes
+		if self.sampler is not None:
+			self.sampler.stop()
+
+		stop_wine_processes(wine_path, processes)
+		if self.process is not None:
+			try:
+				self.process.wait(10)
+			except subprocess.TimeoutExpired:
+				self.process.kill()
+			self.record(None)
+
+INSTANCE_MAX = 8	# Game instances that can run at once, the build's own included
+# A running game: the build's own (instance 1) or one launched through an InstanceManager. Each
+# keeps the lines it printed in an output history of its own.
+class GameInstance:
+	def __init__(self, number, tag, process):
+		self.number = number
+		self.name = "game instance {}".format(number)
+		self.tag = tag	# Pump tag of the instance's output (Igor's for the build's own game)
+		self.process = process
+		self.output = OutputHistory()
+		self.time_start = time.time()
+		self.exit_code = None
+
+	def get_is_running(self):
+		return self.exit_code is None and self.process is not None and self.process.poll() is None
+
+	# Returns a line of status, w/ the CPU / memory use of a running instance if given (see
+	# ResourceSampler.get_usage())
+	def get_status(self, usage=None):
+		if self.process is None:
+			return "{}: not started".format(self.name)
+		if not self.get_is_running():
+			return "{}: exited w/ code {}".format(self.name, self.exit_code if self.exit_code is not None else self.process.poll())
+
+		status = "{}: pid {}, up {:.0f}s".format(self.name, self.process.pid, time.time() - self.time_start)
+		if usage is not None:
+			status += ", " + format_usage(usage).replace(" |", ",")
+
+		return status
+
+# Launches and tracks extra game instances next to the build's own (e.g. for multiplayer
+# testing). The Runner and .win are resolved once, each instance's output is tagged "game
+# instance N" and kept in its own channel, and single instances can be killed through their
+# session w/o taking the wineserver (and every other instance) down.
+class InstanceManager:
+	def __init__(self, history, pump):
+		self.history = history
+		self.pump = pump
+		self.runner_command = None	# Shell command to start an instance, resolved on first launch
+		self.build = None
+		self.instances = []	# GameInstance of the build first, then every extra one
+
+	# Makes a new build's game instance 1; extra instances of the previous build are dropped (kill
+	# them along w/ the build first, see get_processes()).
+	def set_build(self, build):
+		self.build = build
+		self.instances = [GameInstance(1, build.tag, build.process)]
+
+	def get_instance(self, number):
+		for instance in self.instances:
+			if instance.number == number:
+				return instance
+
+		return None
+
+	def get_instance_by_tag(self, tag):
+		for instance in self.instances:
+			if instance.tag == tag:
+				return instance
+
+		return None
+
+	# Returns the processes of the extra instances:
+	def get_processes(self):
+		return [instance.process for instance in self.instances[1:]]
+
+	def get_running_count(self):
+		return len([instance for instance in self.instances if instance.get_is_running()])
+
+	# Launches count more instances of the last build's .win at once. Returns the instances started.
+	def launch(self, count=1):
+		if self.runner_command is None:
+			runpath = get_prefix_index().find("runner", wine_gm_runtime_path + wine_gm_runtime)
+			if len(runpath) == 0 or not "compile_output_file_name" in cache_bff_data:
+				self.history.append("[!] failed to find Runner.exe, can't launch instances!")
+				return []
+			self.runner_command = format_runner_command(wine_path, runpath, cache_bff_data["compile_output_file_name"])
+
+		launched = []
+		for i in range(count):
+			if self.get_running_count() >= INSTANCE_MAX:
+				self.history.append("[!] {} game instances are running already, not launching more".format(INSTANCE_MAX))
+				break
+
+			number = self.instances[-1].number + 1
+			try:
+				with ProfileSpan("spawn game instance"):
+					process = subprocess.Popen([self.runner_command],shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE,start_new_session=True)
+			except OSError:
+				self.history.append("[!] failed to launch game instance {}!".format(number))
+				break
+			instance = GameInstance(number, "game instance {}".format(number), process)
+			self.instances.append(instance)
+			if self.build.sampler is not None:
+				self.build.sampler.add(instance.name, process.pid)
+			self.pump.add(process.stdout, instance.tag, process)
+			self.pump.add(process.stderr, "wine")
+			launched.append(instance)
+
+		if len(launched) > 0:
+			self.history.append("[!] launched game instance{} {}".format(("", "s")[len(launched) > 1], ", ".join([str(instance.number) for instance in launched])))
+
+		return launched
+
+	# Call for every line from the pump (decoded); adds it to its instance's channel. The build's
+	# own output only counts once the game is up.
+	def on_line(self, tag, text):
+		instance = self.get_instance_by_tag(tag)
+		if instance is None or (instance.number == 1 and self.build.log is not None and not self.build.log.get_is_done()):
+			return
+
+		instance.output.append(text)
+
+	def on_exit(self, tag, code):
+		instance = self.get_instance_by_tag(tag)
+		if instance is not None:
+			instance.exit_code = code
+
+	# Kills a single instance (and the WINE processes in its session); the wineserver and the
+	# other instances keep running.
+	def kill(self, number):
+		instance = self.get_instance(number)
+		if instance is None or not instance.get_is_running():
+			return False
+
+		kill_process_groups([instance.process])
+		self.history.append("[!] killed {}".format(instance.name))
+		return True
+
+	# Returns a line of status per instance w/ its CPU / memory use as last sampled by the build's
+	# ResourceSampler (instance 1 is the build's whole process tree, Igor included)
+	def get_status_lines(self):
+		lines = []
+		for instance in self.instances:
+			usage = None
+			if self.build.sampler is not None:
+				usage = self.build.sampler.get_usage((instance.name, self.build.name)[instance.number == 1])
+			lines.append(instance.get_status(usage))
+
+		return lines
+
+# Runs a build (see WineBuild) and shows its output until the user quits. If a ProjectWatcher is
+# passed, the game is killed and the project rebuilt whenever the project files change.
+def window_run_wine(stdscr, titlebar, output_history, use_existing=False, watcher=None):
 	global cache_bff_data
 	global wine_output_errors
 
 	is_output_paused = False	# Used to allow reading outputy
 	paused_start_index = 0		# Only print until this index if output is paused
 	compile_start_index = len(output_history)	# Where to start if we dump
-	instance_count = 1	# Number of instances of the game
-	if use_existing:
-		bashscript = "find \"{}\" -name \"build.bff\" | head -1".format(wine_path)
-		result = subprocess.run([bashscript],shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-		bff_path = str(result.stdout)[1:-3] + "'"
-		if result.returncode != 0 or len(bff_path) <= 2:
-			output_history.append("[!] no build.bff file found!")
-			return
+	output_filter = 0	# Game instance whose output is shown, 0 for all output
 
-		try:
-			# Attempt to read the runtime version from the pre-generated build file:
-			file = open(bff_path[1:-1], "r")
-			content = file.read()
-			file.close()
-			pyobj = json.loads(content)
-			runtime = re.findall("runtime-[0-9.]+$", pyobj["runtimeLocation"])[0]
-			output_history.append("[!] runtime set to {}".format(runtime));
-			wine_gm_runtime = runtime
-		except:
-			output_history.append("[!] error reading build.bff!")
+	pump = OutputPump()
+	build = WineBuild(output_history, pump, use_existing)
+	if not build.start():
+		if watcher is None:
+			pump.terminate()
 			return
-	else:
-		wine_path_mod = wine_path.replace("$USER", system_user, 1)
-		bff_path = "{}:{}/drive_c/users/gmbuild/build.bff".format(wine_local_drive, wine_path_mod)
-
-	igorpath = ""
-	bashresult = subprocess.run(["find \"{}\" -type f -name \"Igor.exe\" | head -1".format(wine_gm_runtime_path + wine_gm_runtime)],shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-	igorpath = str(bashresult.stdout)[2:-3]
-	if bashresult.returncode == 1 or len(wine_gm_user_dir.strip()) <= 2:
-		output_history.append("[!] failed to find Igor.exe!")
-		return
-
-	if wine_output_errors:
-		bashscript = "env WINEPREFIX=\"{}\" wine \"{}\" -options={} -v -- Windows Run".format(wine_path, igorpath, bff_path)
-	else:
-		bashscript = "env WINEPREFIX=\"{}\" env WINEDEBUG=\"warn-all,fixme-all,trace-all,err-all\" wine \"{}\" -options={} -v -- Windows Run".format(wine_path, igorpath, bff_path)
-
-	output_history.append("executing: \"{}\" -options={} -v -- Windows Run".format(igorpath, bff_path))
-	process = subprocess.Popen([bashscript],shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-
-	if wine_output_errors:
-		asyncprocess_list = [AsyncRead(process.stdout), AsyncRead(process.stderr)]
-	else:
-		asyncprocess_list = [AsyncRead(process.stdout)]
+		output_history.append("[!] failed to start the build, waiting for further changes...")
+	instances = InstanceManager(output_history, pump)
+	instances.set_build(build)
 
 	stdscr.nodelay(True)
 	lastchar = 0
-	time_last = time.time() - 0.1 # in S, update every 100
 
 	last_height = 0
 	last_width = 0
 	last_err_line = ""	# Simply for preventing wineserver spam
+	scroll_keys = {curses.KEY_UP : -1, curses.KEY_DOWN : 1, curses.KEY_PPAGE : -1, curses.KEY_NPAGE : 1}
+	history_view = HistoryView()
+
+	# Messages for the user are appended to the history like everything else; while output is
+	# paused they are also listed below the paused view so they show up right away.
+	notices = []
+	def notify(message):
+		output_history.append(message)
+		if is_output_paused:
+			notices.append(message)
 
 	while True:
 		line_array = []
 		# Grab lines for 0.1s or until a keypress is registered:
 		# NOTE: The 0.1s delay is to help w/ ncurses flickering
+		time_end = time.time() + 0.1
 		while True:
-			try:
-				time_current = time.time()
-				line = asyncprocess_list[0].readline(1) # Timeout if no new input, otherwise async
-				if not line:
-					break
-
-				line_array.append(str(line)[2:-5])
-				if time_current - time_last >= 0.1:
-					break
-			except:
+			event = pump.get(time_end - time.time())
+			if event is None:
 				break
-		if wine_output_errors:
-			while True:
-				try:
-					line = asyncprocess_list[1].readline(1) # Timeout if no new input, otherwise async
-					if not line:
-						break
 
-					if line == last_err_line:
-						continue
+			tag, kind, value = event
+			if kind == "exit":
+				line_array.append("[!] {} exited w/ code {}".format(tag, value))
+				build.on_exit(tag, value)
+				instances.on_exit(tag, value)
+				continue
+
+			text = build.on_line(tag, value)
+			instances.on_line(tag, text)
+			if tag == "igor":
+				line_array.append(text)
+			elif tag == "wine":
+				if not wine_output_errors or value == last_err_line:
+					continue
 
-					last_err_line = line
-					line_array.append("[!] " + str(line)[2:-3])
-					if time_current - time_last >= 0.1:
-						break
-				except:
-					break
+				last_err_line = value
+				line_array.append("[!] " + text)
+			else:
+				line_array.append("{}: {}".format(tag, text))
+
+		time_frame = time.perf_counter()	# Everything from here to the refresh is one frame
+		report = build.poll_report()
+		if report is not None:
+			line_array += ["[!] " + line for line in report.get_report()]
 
-		time_last = time.time() # MS, update every 100
 		for line in line_array:
-			output_history.append(str(line))
+			output_history.append(line)
+
+		# Once the build's game is up the rest of the configured instances join it:
+		if report is not None and wine_instance_count > 1 and build.process.poll() is None and len(instances.instances) == 1:
+			instances.launch(wine_instance_count - 1)
+
+		# Watch mode; report how long builds take and rebuild once changes settled:
+		build_time = build.poll()
+		if watcher is not None:
+			if build_time is not None:
+				notify("[!] build took {}".format(build.get_timing(build_time)))
+
+			changes = watcher.poll()
+			if len(changes) > 0:
+				notify("[!] {}, rebuilding...".format(get_changes_summary(changes)))
+				build.kill(instances.get_processes())
+				build = WineBuild(output_history, pump, use_existing)
+				if not build.start():
+					notify("[!] failed to start the build, waiting for further changes...")
+				instances.set_build(build)
 
 		height, width = stdscr.getmaxyx()
 
 		if last_height != height or last_width != width:
 			stdscr.clear()
+			history_view.invalidate()
 			last_height = height
 			last_width = width
 
 		title = "  gmbuild-cli | " + titlebar
+		if build.sampler is not None:
+			title += " | " + format_usage(build.sampler.get_usage())
 		is_too_small = False
 		if height < 3 or width < 32:
 			try:
@@ -526,8 +3335,7 @@ def window_run_wine(stdscr, titlebar, output_history, use_existing=False):
 				stdscr.refresh()
 
 		stdscr.attron(curses.color_pair(3))
-		addstr(stdscr, 0, 0, title)
-		addstr(stdscr, 0, len(title), " " * (width - len(title) - 1))
+		addstr_fill(stdscr, 0, 0, title)
 		stdscr.attroff(curses.color_pair(3))
 
 		if is_too_small:
@@ -536,144 +3344,248 @@ def window_run_wine(stdscr, titlebar, output_history, use_existing=False):
 
 		# Output instruction line:
 		stdscr.attron(curses.color_pair(3))
-		hint = "  [Q] kill wineserver"
+		hint = ("  [Q] kill wineserver", "  [Q] stop game")[wine_persistent_server]
+		if watcher is not None:
+			hint = "  [Q] stop watching"
 		if is_output_paused:
-			hint += " | [P] resume output"
+			hint += " | [P] resume output | [UP/DOWN/PGUP/PGDN] scroll"
 		else:
 			hint += " | [P] pause output"
 
 		hint2 = "  [D] dump output    "
-		hint2 += " | [X] launch instance {}".format(instance_count + 1)
+		hint2 += " | [X] launch instance {} | [F] show: {}".format(instances.instances[-1].number + 1, ("all", "instance {}".format(output_filter))[output_filter > 0])
+		hint2 += " | [K] kill instance {} | [I] usage".format(output_filter if output_filter > 0 else instances.instances[-1].number)
 
-		try:
-			addstr(stdscr, height - 2, 0, hint)
-			addstr(stdscr, height - 2, len(hint), " " * (width - len(hint)))
-			addstr(stdscr, height - 1, 0, hint2)
-			addstr(stdscr, height - 1, len(hint2), " " * (width - len(hint2)))
-		except:
-			stdscr.refresh()
-			height, width = stdscr.getmaxyx()
+		addstr_fill(stdscr, height - 2, 0, hint, 0)
+		addstr_fill(stdscr, height - 1, 0, hint2, 0)
 
 		stdscr.attroff(curses.color_pair(3))
 
+		# Output of the selected instance, or all of it:
+		if output_filter > 0 and instances.get_instance(output_filter) is None:
+			output_filter = 0
+		shown = output_history if output_filter == 0 else instances.get_instance(output_filter).output
+
 		# Handle 'close' input
 		break_loop = False
 		if lastchar == ord('q') or lastchar == ord('Q'):
 			break_loop = True
-			output_history.append("killing WINE server...")
+			output_history.append(("killing WINE server...", "stopping game...")[wine_persistent_server])
 		elif lastchar == ord('p') or lastchar == ord('P'):
 			output_history.append("[!] output paused, WINE server running in the background...")
 			is_output_paused = not is_output_paused
-			paused_start_index = len(output_history) - 1 # Account for just appended line
+			paused_start_index = len(shown) - 1 # Account for just appended line
+			notices = []
+		elif is_output_paused and lastchar in scroll_keys:
+			# Scrolling can go all the way back, including lines spilled to disk
+			paused_start_index += scroll_keys[lastchar] * (1, max(height - 4, 1))[lastchar in [curses.KEY_PPAGE, curses.KEY_NPAGE]]
+			paused_start_index = max(1, min(paused_start_index, len(shown) - 1))
 
 		if not is_output_paused:
-			paused_start_index = len(output_history) - 1
+			paused_start_index = len(shown) - 1
 
 		if lastchar == ord('d') or lastchar == ord('D'):
-			paused_start_index += 1
+			# Dumps what is shown up to the paused line; an instance's own output is all from this run
+			dump_start_index = compile_start_index if shown is output_history else 0
 			try:
 				file = open("/home/{}/dump.log".format(system_user), "w")
-				log_copy = output_history[compile_start_index:paused_start_index]
-				file.write("\n".join(log_copy))
+				for index, line in enumerate(shown.iter_range(dump_start_index, paused_start_index + 1)):
+					file.write(("\n", "")[index == 0] + line)
 				file.close()
-				output_history.insert(paused_start_index, "[!] dumped output to ~/dump.log")
+				notify("[!] dumped output to ~/dump.log")
 			except:
-				output_history.insert(paused_start_index, "[!] failed to dump log!")
+				notify("[!] failed to dump log!")
 		elif lastchar == ord('x') or lastchar == ord('X'):
-			instance_count += 1
-			try:
+			instances.launch(1)
+		elif lastchar == ord('f') or lastchar == ord('F'):
+			# Cycle through all output and each instance's own
+			numbers = [0] + [instance.number for instance in instances.instances]
+			output_filter = numbers[(numbers.index(output_filter) + 1) % len(numbers)]
+			shown = output_history if output_filter == 0 else instances.get_instance(output_filter).output
+			is_output_paused = False
+			notices = []
+			history_view.invalidate()
+		elif lastchar == ord('k') or lastchar == ord('K'):
+			number = output_filter if output_filter > 0 else instances.instances[-1].number
+			if not instances.kill(number):
+				notify("[!] game instance {} isn't running".format(number))
+		elif lastchar == ord('i') or lastchar == ord('I'):
+			for line in instances.get_status_lines():
+				notify("[!] " + line)
 
-				wine_path_mod = wine_path.replace("$USER", system_user, 1)
-				runpath = ""
-				bashresult = subprocess.run(["find \"{}\" -type f -name \"Runner.exe\" | head -1".format(wine_gm_runtime_path + wine_gm_runtime)],shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-				runpath = str(bashresult.stdout)[2:-3]
-				bashscript = "env WINEPREFIX=\"{}\" env WINEDEBUG=\"warn-all,fixme-all,trace-all,err-all\" wine \"{}\" -game \"{}\"".format(wine_path, runpath, cache_bff_data["compile_output_file_name"])
-				process = subprocess.Popen([bashscript],shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-				asyncprocess_list.append(AsyncRead(process))
-				paused_start_index += 1
-				output_history.insert(paused_start_index, "[!] launched game instance {}".format(instance_count))
-			except:
-				paused_start_index += 1
-				output_history.insert(paused_start_index, "[!] failed to launch new instance!")
-				instance_count -= 1
+		if not is_output_paused:
+			paused_start_index = len(shown) - 1
 
-		# Output history (and thus incoming terminal info):
-		print_history(stdscr, output_history, paused_start_index, -1)
+		# Output history (and thus incoming terminal info), w/ notices below it while paused:
+		notices = notices[-3:]
+		print_history(stdscr, shown, paused_start_index, -1 - len(notices), history_view)
+		stdscr.attron(curses.color_pair(2))
+		for i in range(0, len(notices)):
+			addstr_fill(stdscr, height - 2 - len(notices) + i, 0, ": " + notices[i])
+		stdscr.attroff(curses.color_pair(2))
 
 		stdscr.move(0, width - 1)
 		stdscr.refresh()
+		if profiler is not None:
+			profiler.add("window_run_wine frame", time_frame, time.perf_counter(), {"lines" : len(line_array)})
 
 		if break_loop:
 			break
 
 		lastchar = stdscr.getch()
 
-	# Trigger killing the wineserver if not already killed:
-	subprocess.run(["env WINEPREFIX=\"{}\" wineserver -k".format(wine_path)], shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-	# Tell the iothread to die and wait until it closes:
-	for thread in asyncprocess_list:
-		thread.terminate()
+	# Kill the game / Igor (and the wineserver unless it is kept running):
+	build.kill(instances.get_processes())
+	# Tell the output pump to stop and wait until it closes:
+	pump.terminate()
 
-	output_history.append("[!] WINE server killed...")
+	output_history.append(("[!] WINE server killed...", "[!] game stopped, wineserver kept running")[wine_persistent_server])
 	stdscr.nodelay(False)
 	return
 
-def print_history(stdscr, output_history, start_index=-1, yoff=0):
-	height, width = stdscr.getmaxyx()
-	output_history_y = height - 2 + yoff
+# Renders the output history into rows 1 .. (height - 2 + yoff) of a window, bottom-up from
+# start_index. Wrapped rows are cached per line (lines never change once appended) and the rows
+# of the last frame are kept so only rows that changed are redrawn. When new output pushes the
+# view up, the region is scrolled w/ curses and only the new rows are drawn.
+HISTORY_VIEW_BLANK = (-1, 0, False, "")	# Row w/o content
+
+class HistoryView:
+	def __init__(self):
+		self.rows = None	# (index, sub-row, is_urgent, text) per row of the last frame
+		self.geometry = None	# (width, bottom row) the rows were drawn for
+		self.history = None	# Output history the rows / wrap cache belong to
+		self.wrap_cache = {}	# History index -> (is_urgent, wrapped rows) for the current width
+		self.draw_count = 0	# Rows drawn by the last frame (for profiling / benchmarks)
+
+	# Forces a full redraw on the next frame; needed whenever something else drew over the area
+	def invalidate(self):
+		self.rows = None
+		self.wrap_cache = {}
+
+	@staticmethod
+	def wrap(value, width):
+		value = value.strip()
+		is_urgent = value.startswith("[!]")
+		if get_text_width(": " + value) < width:
+			return (is_urgent, [": " + value])
+
+		value_list = []
+		value_mod = value
+		while get_text_width(value_mod) >= width - 2:
+			head = clip_text(value_mod, width - 7, 2)[0] or value_mod[:1]
+			value_list.append(head)
+			value_mod = value_mod[len(head):]
+
+		if len(value_mod) > 0:
+			value_list.append(value_mod)
+
+		rows = []
+		for i in range(0, len(value_list)):
+			if len(value_list[i]) <= 0:
+				continue
+			if i == 0:
+				rows.append(": " + value_list[i] + "...")
+			elif i < len(value_list) - 1:
+				rows.append("  " + value_list[i] + "...")
+			else:
+				rows.append("  " + value_list[i])
 
-	if start_index < 0:
-		start_index += len(output_history)
-	for i in range(start_index, 0, -1):
-		value = output_history[i]
-		if output_history_y < 1:
-			break
+		return (is_urgent, rows)
 
-		value = value.strip()
-		is_urgent = False
-		if value.startswith("[!]"):
-			stdscr.attron(curses.color_pair(2))
-			is_urgent = True
-
-		if len(": " + value) < width:
-			addstr(stdscr, output_history_y, 0, ": " + value)
-			addstr(stdscr, output_history_y, len(": " + value), " " * (width - len(": " + value) - 1))
-		else:
-			value_list = []
-			value_mod = value
-			while len(value_mod) >= width - 2:
-				value_list.append(value_mod[:width - 7])
-				value_mod = value_mod[width - 7:]
+	# Returns how many rows the old frame has to scroll up to line up w/ the new one, or 0
+	@staticmethod
+	def get_shift(old_rows, rows):
+		last = old_rows[-1]
+		if last[0] < 0:
+			return 0
 
-			if len(value_mod) > 0:
-				value_list.append(value_mod)
+		for shift in range(1, len(rows)):
+			if rows[-1 - shift] == last:
+				if rows[:-shift] == old_rows[shift:]:
+					return shift
+				return 0
 
-			for i in range(0, len(value_list)):
-				if output_history_y < 1:
-					break
+		return 0
 
-				subvalue = value_list[len(value_list) - 1 - i]
-				if len(subvalue) <= 0:
-					continue
-				if i == len(value_list) - 1:
-					subvalue = ": " + subvalue + "..."
-				elif i > 0:
-					subvalue = "  " + subvalue + "..."
-				else:
-					subvalue = "  " + subvalue
+	def render(self, stdscr, output_history, start_index=-1, yoff=0):
+		height, width = stdscr.getmaxyx()
+		bottom = height - 2 + yoff
+		if self.geometry is None or self.geometry[0] != width or output_history is not self.history:
+			self.wrap_cache = {}	# Indexes into another history (e.g. after [F]) don't line up
+			self.history = output_history
+			self.rows = None
+		if self.geometry != (width, bottom):
+			self.geometry = (width, bottom)
+			self.rows = None
+
+		if start_index < 0:
+			start_index += len(output_history)
+
+		# Lay out the frame:
+		rows = [HISTORY_VIEW_BLANK] * max(bottom, 0)
+		wrap_cache = {}
+		output_history_y = bottom
+		for i in range(start_index, -1, -1):
+			if output_history_y < 1:
+				break
 
-				addstr(stdscr, output_history_y, 0, subvalue);
-				addstr(stdscr, output_history_y, len(subvalue), " " * (width - len(subvalue) - 1))
+			wrapped = self.wrap_cache.get(i)
+			if wrapped is None:
+				wrapped = self.wrap(output_history[i], width)
+			wrap_cache[i] = wrapped
 
+			is_urgent, value_rows = wrapped
+			for sub in range(len(value_rows) - 1, -1, -1):
+				if output_history_y < 1:
+					break
+				rows[output_history_y - 1] = (i, sub, is_urgent, value_rows[sub])
 				output_history_y -= 1
 
-			if is_urgent:
+		self.wrap_cache = wrap_cache # Only keep what is on screen
+
+		# Draw whatever changed since the last frame:
+		old_rows = self.rows
+		if old_rows is not None and len(rows) > 1:
+			shift = self.get_shift(old_rows, rows)
+			if shift > 0:
+				stdscr.setscrreg(1, bottom)
+				stdscr.scrollok(True)
+				stdscr.scroll(shift)
+				stdscr.scrollok(False)
+				stdscr.setscrreg(0, height - 1)
+				old_rows = old_rows[shift:] + [HISTORY_VIEW_BLANK] * shift
+
+		self.draw_count = 0
+		for y in range(0, len(rows)):
+			row = rows[y]
+			if old_rows is not None and old_rows[y] == row:
+				continue
+
+			self.draw_count += 1
+			if row[2]:
+				stdscr.attron(curses.color_pair(2))
+			addstr_fill(stdscr, y + 1, 0, row[3])
+			if row[2]:
 				stdscr.attroff(curses.color_pair(2))
-			continue
 
-		output_history_y -= 1
-		if is_urgent:
-			stdscr.attroff(curses.color_pair(2))
+		self.rows = rows
+
+@profiled
+def print_history(stdscr, output_history, start_index=-1, yoff=0, view=None):
+	if view is None:
+		view = HistoryView()
+
+	view.render(stdscr, output_history, start_index, yoff)
+
+# Sets the active project from the path to its .yyp; raises IndexError if the project name
+# can't be parsed from the path.
+def set_project_path(path):
+	global system_project_path
+	global system_project_name
+	global system_project_directory
+	system_project_name = re.findall("/[a-zA-Z.\\s0-9-]+\.yyp$", path)[0][1:-4]
+	system_project_path = path
+	system_project_directory = system_project_path.replace(system_project_name + "yyp", "")
 
 def import_autoload():
 	global system_user
@@ -686,6 +3598,13 @@ def import_autoload():
 	global wine_gm_config
 	global wine_gm_lts_suffix
 	global wine_output_errors
+	global wine_persistent_server
+	global wine_instance_count
+	global build_regression_factor
+	global asset_cache_budget
+	global search_roots
+	global search_excludes
+	global search_max_depth
 	try:
 		file = open("/home/{}/.gmbuild_autoload".format(system_user))
 		content = file.read()
@@ -700,30 +3619,406 @@ def import_autoload():
 		wine_gm_config = data["config"]
 		wine_gm_lts_suffix = data["lts"]
 		wine_output_errors = data["perror"]
+		wine_persistent_server = data.get("pserver", wine_persistent_server)
+		wine_instance_count = data.get("instances", wine_instance_count)
+		build_regression_factor = data.get("regress", build_regression_factor)
+		asset_cache_budget = data.get("cbudget", asset_cache_budget)
+		search_roots = data.get("sroots", search_roots)
+		search_excludes = data.get("sexclude", search_excludes)
+		search_max_depth = data.get("sdepth", search_max_depth)
 	except:
 		return False
 
 	return True
 
-def curses_main(stdscr):
+# Interactive commands. Each handler receives the screen and output history, and returns
+# COMMAND_EXIT to leave the program, COMMAND_REDRAW if it drew over the whole screen or None.
+COMMAND_EXIT = 1
+COMMAND_REDRAW = 2
+
+def command_exit(stdscr, history):
+	return COMMAND_EXIT
+
+def command_print_runtimes(stdscr, history):
+	runtime_list = get_runtime_list()
+	if len(runtime_list) == 0:
+		history.append("no runtimes found!")
+	else:
+		for value in runtime_list:
+			history.append("\t{}".format(value))
+
+def command_set_runtime(stdscr, history):
 	global wine_gm_runtime
 	global wine_gm_runtime_index
+
+	runtime_list = get_runtime_list()
+	if len(runtime_list) == 0:
+		history.append("[!] no runtimes found!")
+	else:
+		wine_gm_runtime_index = window_select_list(stdscr, "set runtime", runtime_list, wine_gm_runtime_index)
+		wine_gm_runtime = runtime_list[wine_gm_runtime_index]
+		history.append("GameMaker runtime set to {}".format(wine_gm_runtime))
+
+def command_set_config(stdscr, history):
+	global wine_gm_config
+	global wine_gm_config_index
+
+	config_list = get_config_list()
+	if len(config_list) == 0:
+		history.append("[!] no configs found!")
+	else:
+		wine_gm_config_index = window_select_list(stdscr, "set config", config_list, wine_gm_config_index)
+		wine_gm_config = get_config_name(config_list[wine_gm_config_index])
+		history.append("GameMaker config set to {}".format(wine_gm_config))
+
+def command_set_debug(stdscr, history):
 	global wine_gm_debug_mode
-	global wine_local_drive_index
+
+	wine_gm_debug_mode = window_select_list(stdscr, "debug mode", ["disabled", "enabled"], wine_gm_debug_mode)
+	history.append("debug mode {}".format("enabled" if wine_gm_debug_mode == 1 else "disabled"))
+
+def command_set_print_errors(stdscr, history):
+	global wine_output_errors
+
+	wine_output_errors = window_select_list(stdscr, "print wineserver errors", ["False", "True"], wine_output_errors)
+	history.append("wineserver errors {}".format("enabled" if wine_output_errors == 1 else "disabled"))
+
+def command_set_persistent_server(stdscr, history):
+	global wine_persistent_server
+
+	wine_persistent_server = window_select_list(stdscr, "keep wineserver running", ["False", "True"], wine_persistent_server) == 1
+	if wine_persistent_server:
+		start_wine_server(wine_path)
+		history.append("persistent wineserver enabled, only Igor / the game are stopped between builds")
+	else:
+		subprocess.run(["env WINEPREFIX=\"{}\" wineserver -k".format(wine_path)], shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
+		history.append("persistent wineserver disabled")
+
+def command_set_wine_drive(stdscr, history):
 	global wine_local_drive
+	global wine_local_drive_index
+
+	letter_list = ["A",'B','C','D','E','F','G','H','I','J','K','L','M','N','O','P','Q','R','S','T','U','V','W','X','Y','Z']
+	if wine_local_drive_index < 0:
+		wine_local_drive_index = len(letter_list) - 1
+
+	wine_local_drive_index = window_select_list(stdscr, "set wine drive letter", letter_list, wine_local_drive_index)
+	wine_local_drive = letter_list[wine_local_drive_index]
+	history.append("WINE drive specified as {}:\\".format(wine_local_drive))
+
+def command_set_wine_prefix(stdscr, history):
 	global wine_path
-	global system_project_name
-	global system_project_directory
-	global system_project_path
+	global wine_gm_runtime
+	global wine_gm_runtime_index
+
+	prefix_list = get_prefix_list()
+	wine_path_index = window_select_list(stdscr, "set wine prefix", prefix_list)
+	if wine_path_index >= 0:
+		wine_path = prefix_list[wine_path_index]
+		history.append("WINE prefix set to {}".format(wine_path))
+		find_gm_user_dir(history);
+		scan_wine_data(history)
+		history.append("[!] please select a valid runtime!")
+		wine_gm_runtime = ""
+		wine_gm_runtime_index = -1
+	else:
+		history.append("[!] no wine prefixes found!")
+
+def command_set_project(stdscr, history):
 	global wine_gm_config
 	global wine_gm_config_index
-	global wine_gm_lts_suffix
-	global wine_output_errors
+
+	project_list = get_project_list()
+	project_path_index = window_select_list(stdscr, "set gamemaker project", project_list)
+	if project_path_index >= 0:
+		try:
+			set_project_path(project_list[project_path_index])
+			wine_gm_config = "Default"
+			wine_gm_config_index = 0
+			history.append("project set to {}".format(system_project_name))
+		except:
+			history.append("[!] error processing project name (invalid characters?)")
+	else:
+		history.append("[!] no GameMaker projects found!")
+
+def command_set_search_depth(stdscr, history):
+	global search_max_depth
+
+	depth_list = [str(depth) for depth in range(1, 17)]
+	search_max_depth = int(depth_list[window_select_list(stdscr, "search depth", depth_list, search_max_depth - 1)])
+	history.append("search depth set to {}".format(search_max_depth))
+
+def command_set_instance_count(stdscr, history):
+	global wine_instance_count
+
+	count_list = [str(count) for count in range(1, INSTANCE_MAX + 1)]
+	wine_instance_count = int(count_list[window_select_list(stdscr, "game instances", count_list, min(wine_instance_count, INSTANCE_MAX) - 1)])
+	history.append("{} game instance(s) will run once a build's game is up".format(wine_instance_count))
+
+def command_set_regression_factor(stdscr, history):
+	global build_regression_factor
+
+	factor_list = ["1.25", "1.5", "2", "3"]
+	index = factor_list.index(str(build_regression_factor)) if str(build_regression_factor) in factor_list else 1
+	build_regression_factor = float(factor_list[window_select_list(stdscr, "slow build factor", factor_list, index)])
+	history.append("builds slower than {}x the rolling median will be flagged".format(build_regression_factor))
+
+def command_stats(stdscr, history):
+	for line in format_build_stats(BuildHistory.get_stats(get_build_history().load(system_project_path), build_regression_factor)):
+		history.append(line)
+
+def command_validate(stdscr, history):
+	if len(system_project_name) <= 0:
+		history.append("[!] please select a valid GameMaker project first!")
+		return
+	time_start = time.time()
+	if get_is_build_valid(history):
+		history.append("{} ({} / {}) is ready to build, checked in {:.0f}ms".format(system_project_name, wine_gm_runtime, wine_gm_config, (time.time() - time_start) * 1000))
+
+def command_rescan(stdscr, history):
+	rescan_discovery(history)
+
+def command_kill_wineserver(stdscr, history):
+	subprocess.run(["wineserver -k"], shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
+	history.append("WINE server killed...")
+
+def command_build_matrix(stdscr, history):
+	config_list = get_config_list()
+	runtime_list = get_runtime_list()
+	if len(system_project_name) <= 0:
+		history.append("[!] please select a valid GameMaker project before building!")
+		return
+	if len(config_list) == 0 or len(runtime_list) == 0:
+		history.append("[!] no configs or runtimes found!")
+		return
+
+	config_selected = [wine_gm_config_index]
+	window_select_list(stdscr, "matrix configs", config_list, wine_gm_config_index, config_selected)
+	runtime_selected = [max(wine_gm_runtime_index, 0)]
+	window_select_list(stdscr, "matrix runtimes", runtime_list, max(wine_gm_runtime_index, 0), runtime_selected)
+	targets = []
+	for runtime_index in sorted(runtime_selected):
+		for config_index in sorted(config_selected):
+			targets.append(BuildTarget(runtime_list[runtime_index], get_config_name(config_list[config_index])))
+
+	if len(targets) == 0:
+		history.append("[!] nothing selected to build!")
+		return
+
+	stdscr.clear()
+	window_run_matrix(stdscr, "building matrix...", history, BuildMatrix(targets))
+	stdscr.clear()
+	return COMMAND_REDRAW
+
+def command_build_wine(stdscr, history, use_existing=False, is_watched=False):
+	is_valid = True
+	if len(system_project_name) <= 0:
+		is_valid = False
+		history.append("[!] please select a valid GameMaker project before building!")
+
+	if wine_gm_runtime_index < 0:
+		is_valid = False
+		history.append("[!] please select a valid runtime before building!")
+
+	if is_valid:
+		watcher = None
+		titlebar = "running program..."
+		if is_watched:
+			watcher = get_project_watcher(os.path.dirname(system_project_path))
+			titlebar = "watching project..."
+			history.append("watching {} for changes ({})".format(watcher.root, ("polling", "inotify")[isinstance(watcher, InotifyWatcher)]))
+
+		stdscr.clear()
+		window_run_wine(stdscr, titlebar, history, use_existing, watcher)
+		stdscr.clear()
+		if watcher is not None:
+			watcher.close()
+		return COMMAND_REDRAW
+
+def command_build_wine_existing(stdscr, history):
+	return command_build_wine(stdscr, history, True)
+
+def command_watch(stdscr, history):
+	return command_build_wine(stdscr, history, False, True)
+
+# What 'clean wine build' / 'gmbuild-cli.py clean' can remove: the build files and outputs (the
+# asset caches stay warm), the active project's asset caches, or both along w/ every other cache.
+CLEAN_SCOPES = ["build", "cache", "all"]
+CLEAN_SCOPE_LABELS = ["build files only (keeps the asset caches)", "asset caches of the active project", "everything"]
+
+def clean_build_files(scope, history):
+	if scope in ["build", "all"]:
+		shutil.rmtree(get_build_dir(), ignore_errors=True)
+		history.append("build files removed")
+	if scope in ["cache", "all"]:
+		count, size = get_asset_cache().remove(None if scope == "all" else system_project_path)
+		history.append("{} asset cache(s) removed, {} freed".format(count, format_size(size)))
+
+def command_clean_wine_build(stdscr, history):
+	clean_build_files(CLEAN_SCOPES[window_select_list(stdscr, "clean", CLEAN_SCOPE_LABELS)], history)
+
+def command_cache(stdscr, history):
+	cache = get_asset_cache()
+	entries = cache.get_entries()
+	history.append("{} asset cache(s) in {}, {} of {} GiB used".format(len(entries), cache.root, format_size(sum([entry.get("size", 0) for entry in entries])), asset_cache_budget))
+	for entry in entries:
+		history.append("  {:<48} {:>10}  last used {}".format(entry["name"], format_size(entry.get("size", 0)), time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.get("used", 0)))))
+
+def command_set_cache_budget(stdscr, history):
+	global asset_cache_budget
+
+	budget_list = ["1", "2", "5", "10", "20", "50", "100"]
+	index = budget_list.index(str(asset_cache_budget)) if str(asset_cache_budget) in budget_list else 3
+	asset_cache_budget = int(budget_list[window_select_list(stdscr, "asset cache budget (GiB)", budget_list, index)])
+	history.append("asset caches limited to {} GiB, least recently used caches are evicted after the next build".format(asset_cache_budget))
+
+def command_export_autoload(stdscr, history):
+	try:
+		data = {
+			"ppath" : system_project_path,
+			"prefix" : wine_path,
+			"rtpath" : wine_gm_runtime_path,
+			"rt" : wine_gm_runtime,
+			"debug" : wine_gm_debug_mode,
+			"drive" : wine_local_drive,
+			"config" : wine_gm_config,
+			"lts" : wine_gm_lts_suffix,
+			"perror" : wine_output_errors,
+			"pserver" : wine_persistent_server,
+			"instances" : wine_instance_count,
+			"regress" : build_regression_factor,
+			"cbudget" : asset_cache_budget,
+			"sroots" : search_roots,
+			"sexclude" : search_excludes,
+			"sdepth" : search_max_depth
+		}
+		file = open("/home/{}/.gmbuild_autoload".format(system_user), "w")
+		file.write(json.dumps(data))
+		file.close()
+		history.append("autoload exported, to prevent autoload delete ~/.gmbuild_autoload")
+	except:
+		history.append("failed to write autoload file")
+
+# Every interactive command; name, aliases, handler and the lines printed by 'help [command]'.
+# Adding an entry here is all that is needed for a command to show up in 'help', get hints / tab
+# completion and be dispatched.
+command_registry = [
+	{"name" : "exit", "aliases" : ["quit"], "handler" : command_exit,
+		"help" : ["immediately terminates the program"]},
+	{"name" : "print runtimes", "aliases" : [], "handler" : command_print_runtimes,
+		"help" : ["lists recognized GameMaker build runtimes"]},
+	{"name" : "set gm runtime", "aliases" : ["set gamemaker runtime"], "handler" : command_set_runtime,
+		"help" : ["opens a list to select which GameMaker runtime to compile with"]},
+	{"name" : "set gm config", "aliases" : ["set gamemaker config"], "handler" : command_set_config,
+		"help" : ["opens a list to select which GameMaker config to compile with"]},
+	{"name" : "set debug", "aliases" : [], "handler" : command_set_debug,
+		"help" : ["opens a list to select whether or not to compile with debugging enabled"]},
+	{"name" : "set wine print errors", "aliases" : [], "handler" : command_set_print_errors,
+		"help" : ["prints out wineserver errors while the project is running"]},
+	{"name" : "set wine persistent server", "aliases" : [], "handler" : command_set_persistent_server,
+		"help" : ["opens a list to select whether to keep a wineserver running for the prefix between builds",
+			"skips the WINE startup cost on every build; only Igor and the game are stopped when a run ends"]},
+	{"name" : "set wine drive", "aliases" : [], "handler" : command_set_wine_drive,
+		"help" : ["opens a list to select which drive letter is being used by WINE to point to drive's root directory"]},
+	{"name" : "set wine prefix", "aliases" : [], "handler" : command_set_wine_prefix,
+		"help" : ["opens a list to select which WINE prefix should be used and scanned for GameMaker executables"]},
+	{"name" : "set gm project", "aliases" : ["set gamemaker project"], "handler" : command_set_project,
+		"help" : ["opens a list to select which GameMaker project should be compiled on the next build"]},
+	{"name" : "set search depth", "aliases" : [], "handler" : command_set_search_depth,
+		"help" : ["opens a list to select how many directory levels deep to search for WINE prefixes and projects",
+			"search roots and exclude globs can be changed through the 'sroots' and 'sexclude' entries of ~/.gmbuild_autoload"]},
+	{"name" : "set instance count", "aliases" : [], "handler" : command_set_instance_count,
+		"help" : ["opens a list to select how many game instances to run (e.g. for multiplayer testing)",
+			"the extra instances are launched at once when the build's game is up; while it runs [X] launches one more,",
+			"[F] cycles through each instance's own output, [K] kills a single instance and [I] shows their CPU / memory use"]},
+	{"name" : "set regression factor", "aliases" : [], "handler" : command_set_regression_factor,
+		"help" : ["opens a list to select how many times slower than the rolling median a build has to be to get flagged"]},
+	{"name" : "stats", "aliases" : [], "handler" : command_stats,
+		"help" : ["shows build time percentiles, trends and per-phase medians for the active project",
+			"builds are grouped by runtime / config; every build is recorded in ~/.gmbuild_builds"]},
+	{"name" : "validate", "aliases" : [], "handler" : command_validate,
+		"help" : ["checks the project's resource files, included files and config, the runtime and the login data w/o starting WINE",
+			"builds run the same checks first and aren't started if any of them fail"]},
+	{"name" : "rescan", "aliases" : [], "handler" : command_rescan,
+		"help" : ["drops all cached discovery results and rescans the WINE prefix, runtimes and projects",
+			"the cached prefix / project lists only notice changes to the search roots and the directories of what was found,",
+			"so run this after creating a prefix or project in a new sub-directory (e.g. ~/Projects/NewGame)"]},
+	{"name" : "kill wineserver", "aliases" : [], "handler" : command_kill_wineserver,
+		"help" : ["forcefully kills any background running WINE processes"]},
+	{"name" : "build matrix", "aliases" : [], "handler" : command_build_matrix,
+		"help" : ["opens lists to select several configs and runtimes and builds every combination at once",
+			"each target builds in its own directory under the gmbuild folder; see 'gmbuild-cli.py matrix -h' for more options"]},
+	{"name" : "build wine", "aliases" : [], "handler" : command_build_wine,
+		"help" : ["begins a build of the currently active project",
+			"see 'build wine existing' to reuse the build-properties file already in the WINE prefix"]},
+	{"name" : "build wine existing", "aliases" : [], "handler" : command_build_wine_existing,
+		"help" : ["begins a build of the currently active project",
+			"the first build-properties file found in the active WINE prefix will be used instead of generating a new file"]},
+	{"name" : "watch", "aliases" : [], "handler" : command_watch,
+		"help" : ["builds and runs the active project, then rebuilds it whenever a project file is saved",
+			"a running game is killed first; bursts of saves result in a single rebuild"]},
+	{"name" : "clean wine build", "aliases" : [], "handler" : command_clean_wine_build,
+		"help" : ["opens a list to delete the build files, the active project's asset caches or everything",
+			"the asset caches (compiled texture pages and audio groups) are kept per project, runtime and config"]},
+	{"name" : "cache", "aliases" : [], "handler" : command_cache,
+		"help" : ["lists the asset compiler caches w/ their sizes, most recently used first"]},
+	{"name" : "set cache budget", "aliases" : [], "handler" : command_set_cache_budget,
+		"help" : ["opens a list to select how much disk space the asset caches may take up",
+			"once it's exceeded the least recently used caches are evicted"]},
+	{"name" : "export autoload", "aliases" : [], "handler" : command_export_autoload,
+		"help" : ["exports build settings to your home directory to be auto-loaded next startup"]},
+]
+
+# Name / alias -> registry entry, w/ words separated by single spaces:
+command_table = {}
+for command in command_registry:
+	for name in [command["name"]] + command["aliases"]:
+		command_table[name] = command
+
+command_list = sorted(command_table.keys())
+command_list = sorted(command_list + ["help " + value for value in command_list] + ["help"])
+command_trie = CommandTrie(command_list)
+
+# Runs the command typed into the prompt; returns the handler's result (see COMMAND_EXIT).
+def run_command(stdscr, history, inputstr):
+	words = inputstr.lower().split()
+	if len(words) == 0:
+		return
+
+	is_help = (words[0] == "help")
+	if is_help:
+		words = words[1:]
+
+	if len(words) == 0:
+		history.append("[!] info:")
+		history.append("available commands:")
+		for value in command_list:
+			if value.find("help") >= 0:
+				continue
+
+			history.append("- " + value)
+		history.append("you can find more info on a specific command by typing `help [command]`")
+		return
+
+	command = command_table.get(" ".join(words))
+	if command is None:
+		history.append("invalid command!");
+	elif is_help:
+		history.append("[!] info:")
+		for line in command["help"]:
+			history.append(line)
+	else:
+		return command["handler"](stdscr, history)
+
+def curses_main(stdscr):
+	global wine_gm_runtime
+	global wine_gm_runtime_index
+	global wine_path
 
 	lastchar = 0
 	inputstr = ""
 	input_x = 0	# Cursor relative to the input string
-	output_history = []	# All history
+	output_history = OutputHistory()	# All history
 	input_history = []	# User-inputted history
 	input_history_index = -1
 
@@ -753,8 +4048,8 @@ def curses_main(stdscr):
 		find_gm_user_dir(output_history)
 	else:
 		prefix_list = get_prefix_list()
-		if len(prefix_list) > 0:
-			wine_path_index = window_select_list(stdscr, "set wine prefix", prefix_list)
+		wine_path_index = window_select_list(stdscr, "set wine prefix", prefix_list)
+		if wine_path_index >= 0:
 			wine_path = prefix_list[wine_path_index]
 			output_history.append("WINE prefix set to {}".format(wine_path))
 			find_gm_user_dir(output_history)
@@ -777,17 +4072,14 @@ def curses_main(stdscr):
 
 	# Show default GameMaker project selection list:
 	if is_autoload:
-		system_project_name = re.findall("/[a-zA-Z.\\s0-9-]+\.yyp$", system_project_path)[0][1:-4]
-		system_project_directory = system_project_path.replace(system_project_name + "yyp", "")
+		set_project_path(system_project_path)
 		output_history.append("project set to {}".format(system_project_name))
 	else:
 		project_list = get_project_list()
-		if len(project_list) > 0:
+		project_path_index = window_select_list(stdscr, "set gamemaker project", project_list)
+		if project_path_index >= 0:
 			try:
-				project_path_index = window_select_list(stdscr, "set gamemaker project", project_list)
-				system_project_path = project_list[project_path_index]
-				system_project_name = re.findall("/[a-zA-Z.\\s0-9-]+\.yyp$", system_project_path)[0][1:-4]
-				system_project_directory = system_project_path.replace(system_project_name + "yyp", "")
+				set_project_path(project_list[project_path_index])
 				output_history.append("project set to {}".format(system_project_name))
 			except:
 				output_history.append("[!] error processing project name (invalid characters?)")
@@ -801,6 +4093,7 @@ def curses_main(stdscr):
 
 	last_height = 0
 	last_width = 0
+	history_view = HistoryView()
 
 	# Loop where 'lastchar' is the last character pressed:
 	while (True):
@@ -818,13 +4111,13 @@ def curses_main(stdscr):
 
 		if last_height != height or last_width != width:
 			stdscr.clear()
+			history_view.invalidate()
 			last_height = height
 			last_width = width
 
 		# Render title bar:
 		stdscr.attron(curses.color_pair(3))
-		addstr(stdscr, 0, 0, title) # Print title text
-		addstr(stdscr, 0, len(title), " " * (width - len(title) - 1)) # Fill remaining column w/ white
+		addstr_fill(stdscr, 0, 0, title) # Print title text, fill remaining column w/ white
 		stdscr.attroff(curses.color_pair(3))
 
 		if is_too_small:
@@ -867,11 +4160,12 @@ def curses_main(stdscr):
 				input_x = 0
 				inputstr = ""
 			elif lastchar == 261 or lastchar == 9: # RIGHT / LTAB
-				index = get_best_command_match(inputstr)["index"]
-				if index >= 0:
-					inputstr = command_list[index]
+				match = get_best_command_match(inputstr)["command"]
+				if match is not None:
+					inputstr = match
 					input_x = len(inputstr)
 			elif lastchar == 10: # ENTER
+				history_view.invalidate() # Commands may open other windows over the history
 				input_x = 0
 				if len(inputstr.strip()) > 0:
 					output_history.append(inputstr)
@@ -879,199 +4173,22 @@ def curses_main(stdscr):
 
 				input_history_index = len(input_history)
 				inputstr = ""
-				is_help = (inputstr_lower.find("help") >= 0)
-
-				if get_is_regex_command(inputstr_lower, "exit"):
-					if is_help:
-						output_history.append("[!] info:")
-						output_history.append("immediately terminates the program")
-					else:
-						break
-				elif get_is_regex_command(inputstr_lower, "print runtimes"):
-					if is_help:
-						output_history.append("[!] info:")
-						output_history.append("lists recognized GameMaker build runtimes")
-					else:
-						runtime_list = get_runtime_list()
-						if len(runtime_list) == 0:
-							output_history.append("no runtimes found!")
-						else:
-							for value in runtime_list:
-								output_history.append("\t{}".format(value))
-				elif get_is_regex_command(inputstr_lower,"set (gm|gamemaker) runtime"):
-					if is_help:
-						output_history.append("[!] info:")
-						output_history.append("opens a list to select which GameMaker runtime to compile with")
-					else:
-						runtime_list = get_runtime_list()
-						if len(runtime_list) == 0:
-							output_history.append("[!] no runtimes found!")
-						else:
-							wine_gm_runtime_index = window_select_list(stdscr, "set runtime", runtime_list, wine_gm_runtime_index)
-							wine_gm_runtime = runtime_list[wine_gm_runtime_index]
-							output_history.append("GameMaker runtime set to {}".format(wine_gm_runtime))
-				elif get_is_regex_command(inputstr_lower,"set (gm|gamemaker) config"):
-					if is_help:
-						output_history.append("[!] info:")
-						output_history.append("opens a list to select which GameMaker config to compile with")
-					else:
-						config_list = get_config_list()
-						if len(config_list) == 0:
-							output_history.append("[!] no configs found!")
-						else:
-							wine_gm_config_index = window_select_list(stdscr, "set config", config_list, wine_gm_config_index)
-							match_array = re.findall("-> \\w*$", config_list[wine_gm_config_index])
-							if len(match_array) > 0:
-								wine_gm_config = match_array[0][3:]
-							else:
-								wine_gm_config = config_list[wine_gm_config_index]
-							output_history.append("GameMaker config set to {}".format(wine_gm_config))
-				elif get_is_regex_command(inputstr_lower, "set debug"):
-					if is_help:
-						output_history.append("[!] info:")
-						output_history.append("opens a list to select whether or not to compile with debugging enabled")
-					else:
-						wine_gm_debug_mode = window_select_list(stdscr, "debug mode", ["disabled", "enabled"], wine_gm_debug_mode)
-						output_history.append("debug mode {}".format("enabled" if wine_gm_debug_mode == 1 else "disabled"))
-				elif get_is_regex_command(inputstr_lower, "set wine print errors"):
-					if is_help:
-						output_history.append("[!] info:")
-						output_history.append("prints out wineserver errors while the project is running")
-					else:
-						wine_output_errors = window_select_list(stdscr, "print wineserver errors", ["False", "True"], wine_output_errors)
-						output_history.append("wineserver errors {}".format("enabled" if wine_output_errors == 1 else "disabled"))
-				elif get_is_regex_command(inputstr_lower, "set wine drive"):
-					if is_help:
-						output_history.append("[!] info:")
-						output_history.append("opens a list to select which drive letter is being used by WINE to point to drive's root directory")
-					else:
-						letter_list = ["A",'B','C','D','E','F','G','H','I','J','K','L','M','N','O','P','Q','R','S','T','U','V','W','X','Y','Z']
-						if wine_local_drive_index < 0:
-							wine_local_drive_index = len(letter_list) - 1
-
-						wine_local_drive_index = window_select_list(stdscr, "set wine drive letter", letter_list, wine_local_drive_index)
-						wine_local_drive = letter_list[wine_local_drive_index]
-						output_history.append("WINE drive specified as {}:\\".format(wine_local_drive))
-				elif get_is_regex_command(inputstr_lower, "set wine prefix"):
-					if is_help:
-						output_history.append("[!] info:")
-						output_history.append("opens a list to select which WINE prefix should be used and scanned for GameMaker executables")
-					else:
-						prefix_list = get_prefix_list()
-						if len(prefix_list) > 0:
-							wine_path_index = window_select_list(stdscr, "set wine prefix", prefix_list)
-							wine_path = prefix_list[wine_path_index]
-							output_history.append("WINE prefix set to {}".format(wine_path))
-							find_gm_user_dir(output_history);
-							scan_wine_data(output_history)
-							output_history.append("[!] please select a valid runtime!")
-							wine_gm_runtime = ""
-							wine_gm_runtime_index = -1
-						else:
-							output_history.append("[!] no wine prefixes found!")
-				elif get_is_regex_command(inputstr_lower, "set (gamemaker|gm) project"):
-					if is_help:
-						output_history.append("[!] info:")
-						output_history.append("opens a list to select which GameMaker project should be compiled on the next build")
-					else:
-						project_list = get_project_list()
-						if len(project_list) > 0:
-							try:
-								project_path_index = window_select_list(stdscr, "set gamemaker project", project_list)
-								system_project_path = project_list[project_path_index]
-								system_project_name = re.findall("/[a-zA-Z.\\s0-9-]+\.yyp$", system_project_path)[0][1:-4]
-								system_project_directory = system_project_path.replace(system_project_name + "yyp", "")
-								wine_gm_config = "Default"
-								wine_gm_config_index = 0
-								output_history.append("project set to {}".format(system_project_name))
-							except:
-								output_history.append("[!] error processing project name (invalid characters?)")
-						else:
-							output_history.append("[!] no GameMaker projects found!")
-				elif get_is_regex_command(inputstr_lower, "kill wineserver"):
-					if is_help:
-						output_history.append("[!] info:")
-						output_history.append("forcefully kills any background running WINE processes")
-					else:
-						subprocess.run(["wineserver -k"], shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-						output_history.append("WINE server killed...")
-				elif get_is_regex_command(inputstr_lower, "build wine(\\s*existing)?"):
-					if is_help:
-						output_history.append("[!] info:")
-						output_history.append("begins a build of the currently active project")
-						output_history.append("if 'existing' is specified the first build-properties file found in the active WINE prefix will be used instead of generating a new file")
-					else:
-						is_valid = True
-						if len(system_project_name) <= 0:
-							is_valid = False
-							output_history.append("[!] please select a valid GameMaker project before building!")
-
-						if wine_gm_runtime_index < 0:
-							is_valid = False
-							output_history.append("[!] please select a valid runtime before building!")
-
-						if is_valid:
-							write_default_files() # Generate required files for the build
-							stdscr.clear()
-							window_run_wine(stdscr, "running program...", output_history, inputstr_lower.find("existing") >= 0)
-							stdscr.clear()
-							continue
-				elif get_is_regex_command(inputstr_lower, "clean wine build"):
-					if is_help:
-						output_history.append("[!] info:")
-						output_history.append("deletes all cached GameMaker builds and build files")
-					else:
-						subprocess.run(["rm -rf {}/drive_c/users/gmbuild".format(wine_path)],shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-						output_history.append("build files removed")
-
-				elif get_is_regex_command(inputstr_lower, "export autoload"):
-					if is_help:
-						output_history.append("[!] info:")
-						output_history.append("exports build settings to your home directory to be auto-loaded next startup")
-					else:
-						try:
-							data = {
-								"ppath" : system_project_path,
-								"prefix" : wine_path,
-								"rtpath" : wine_gm_runtime_path,
-								"rt" : wine_gm_runtime,
-								"debug" : wine_gm_debug_mode,
-								"drive" : wine_local_drive,
-								"config" : wine_gm_config,
-								"lts" : wine_gm_lts_suffix,
-								"perror" : wine_output_errors
-							}
-							file = open("/home/{}/.gmbuild_autoload".format(system_user), "w")
-							file.write(json.dumps(data))
-							file.close()
-							output_history.append("autoload exported, to prevent autoload delete ~/.gmbuild_autoload")
-						except:
-							output_history.append("failed to write autoload file")
-				elif re.compile("^\\s*help*\\s*$").match(inputstr_lower):
-					output_history.append("[!] info:")
-					output_history.append("available commands:")
-					for value in command_list:
-						if value.find("help") >= 0:
-							continue
-
-						output_history.append("- " + value)
-					output_history.append("you can find more info on a specific command by typing `help [command]`")
-				elif not re.compile("^[\\s\\t]*$").match(inputstr_lower):
-					output_history.append("invalid command!");
-
-		# Clear input line:
-		addstr(stdscr, height - 1, 0, " " * (width - 1))
+				result = run_command(stdscr, output_history, inputstr_lower)
+				if result == COMMAND_EXIT:
+					break
+				elif result == COMMAND_REDRAW:
+					continue
 
-		# Add prompt:
-		addstr(stdscr, height - 1, 0, "> " + inputstr)
+		# Clear input line and add prompt:
+		addstr_fill(stdscr, height - 1, 0, "> " + inputstr)
 
-		# Render hint:
+		# Render hint right after the prompt:
 		stdscr.attron(curses.color_pair(1))
-		addstr(stdscr, height - 1, len("> " + inputstr), get_best_command_match(inputstr)["hint"])
+		addstr(stdscr, height - 1, get_text_width("> " + inputstr), get_best_command_match(inputstr)["hint"])
 		stdscr.attroff(curses.color_pair(1))
 
 		# Output history:
-		print_history(stdscr, output_history)
+		print_history(stdscr, output_history, -1, 0, history_view)
 
 		# Adjust visual cursor back to input:
 		stdscr.move(height - 1, len("> ") + input_x)
@@ -1082,28 +4199,745 @@ def curses_main(stdscr):
 		# Wait for next input
 		lastchar = stdscr.getch()
 
+# Stands in for the output history when running headless; status messages go to stderr so
+# stdout only carries Igor's output.
+class ConsoleHistory:
+	def append(self, line):
+		print(line, file=sys.stderr, flush=True)
+
+# Applies the autoload and any command-line overrides, then runs discovery. Returns False if
+# anything required for a build is missing.
+def headless_setup(args, history, is_runtime_required=True):
+	global asset_cache_budget
+	global wine_path
+	global wine_gm_runtime
+	global wine_gm_config
+	global wine_gm_debug_mode
+	global wine_local_drive
+	global wine_output_errors
+	global wine_persistent_server
+
+	import_autoload()
+	if args.prefix is not None:
+		wine_path = os.path.abspath(os.path.expanduser(args.prefix))
+	if args.runtime is not None:
+		wine_gm_runtime = args.runtime
+	if args.config is not None:
+		wine_gm_config = args.config
+	if args.debug:
+		wine_gm_debug_mode = 1
+	if args.drive is not None:
+		wine_local_drive = args.drive.upper()
+	if args.print_errors:
+		wine_output_errors = True
+	if args.persistent_server:
+		wine_persistent_server = True
+	if args.cache_budget is not None:
+		asset_cache_budget = args.cache_budget
+
+	history.append("WINE prefix set to {}".format(wine_path))
+	find_gm_user_dir(history)
+	scan_wine_data(history)
+
+	runtime_list = get_runtime_list()
+	if is_runtime_required:
+		if not wine_gm_runtime in runtime_list:
+			history.append("[!] runtime '{}' not found, available runtimes: {}".format(wine_gm_runtime, ", ".join(runtime_list)))
+			return False
+		history.append("GameMaker runtime set to {}".format(wine_gm_runtime))
+
+	try:
+		if args.project is not None:
+			set_project_path(os.path.abspath(os.path.expanduser(args.project)))
+		else:
+			set_project_path(system_project_path)
+	except IndexError:
+		history.append("[!] please specify a valid GameMaker project w/ --project!")
+		return False
+	history.append("project set to {}".format(system_project_name))
+	history.append("config set to {}".format(wine_gm_config))
+
+	return True
+
+# Writes a build's phase report as JSON ("-" prints it to stderr as stdout carries the output):
+def save_build_report(log, path, history):
+	report = json.dumps(dict({"project" : system_project_name, "runtime" : wine_gm_runtime, "config" : wine_gm_config}, **log.get_json()), indent=4)
+	if path == "-":
+		print(report, file=sys.stderr, flush=True)
+		return
+
+	try:
+		with open(os.path.expanduser(path), "w") as file:
+			file.write(report + "\n")
+	except OSError as error:
+		history.append("[!] failed to write the build report to {}: {}".format(path, error.strerror))
+
+# Runs a single build w/o curses, streaming Igor's output to stdout. Returns Igor's exit code, or
+# 130 if interrupted (CTRL+C) before Igor exited. W/ --watch the project is rebuilt whenever its
+# files change until interrupted; the exit code is then that of the last build: 0 if it launched
+# the game, 1 if it failed to start (the initial one included) and 130 if it was still building.
+def headless_build(args):
+	history = ConsoleHistory()
+	if not headless_setup(args, history):
+		return 1
+
+	watcher = None
+	if args.watch:
+		watcher = get_project_watcher(os.path.dirname(system_project_path))
+		history.append("watching {} for changes ({}), press CTRL+C to stop".format(watcher.root, ("polling", "inotify")[isinstance(watcher, InotifyWatcher)]))
+
+	pump = OutputPump()
+	build = WineBuild(history, pump, args.existing, args.action, False)
+	is_started = build.start()
+	exit_code = (1, None)[is_started]
+	instances = InstanceManager(history, pump)
+	instances.set_build(build)
+	try:
+		while is_started or watcher is not None:
+			event = pump.get(0.1)
+			while event is not None:
+				tag, kind, value = event
+				if kind == "line":
+					instances.on_line(tag, build.on_line(tag, value))
+					if tag != build.tag:
+						sys.stdout.buffer.write(tag.encode() + b": ") # Extra instances' lines are tagged
+					sys.stdout.buffer.write(value)
+					sys.stdout.buffer.flush()
+				elif build.on_exit(tag, value):
+					exit_code = value
+					history.append("{} exited w/ code {}".format(build.name, value))
+				elif tag != build.tag and instances.get_instance_by_tag(tag) is not None:
+					instances.on_exit(tag, value)
+					history.append("{} exited w/ code {}".format(tag, value))
+				event = pump.get(0)
+
+			report = build.poll_report()
+			if report is not None:
+				for line in report.get_report():
+					history.append(line)
+				if args.report_json is not None:
+					save_build_report(report, args.report_json, history)
+				if args.instances > 1 and build.process.poll() is None and len(instances.instances) == 1:
+					instances.launch(args.instances - 1)
+
+			build_time = build.poll()
+			if watcher is None:
+				if exit_code is not None:
+					break
+				continue
+
+			if build_time is not None:
+				history.append("build took {}".format(build.get_timing(build_time)))
+
+			changes = watcher.poll()
+			if len(changes) > 0:
+				history.append("{}, rebuilding...".format(get_changes_summary(changes)))
+				build.kill(instances.get_processes())
+				build = WineBuild(history, pump, args.existing, args.action, False)
+				exit_code = None
+				if not build.start():
+					exit_code = 1
+					history.append("[!] failed to start the build, waiting for further changes...")
+				instances.set_build(build)
+	except KeyboardInterrupt:
+		# Igor never finished, so the build mustn't pass for a success. W/ --watch a build that got
+		# as far as launching the game succeeded, only the game is being stopped.
+		if exit_code is None:
+			is_built = watcher is not None and build.log is not None and build.log.phase == "runner launch"
+			exit_code = (130, 0)[is_built]
+	finally:
+		if len(instances.instances) > 1:
+			for line in instances.get_status_lines():
+				history.append(line)
+		build.kill(instances.get_processes())
+		pump.terminate()
+		if watcher is not None:
+			watcher.close()
+
+	return exit_code if exit_code is not None else 0
+
+# Prints the build statistics of the project (or every project w/ --all) w/o running discovery.
+def headless_stats(args):
+	global build_regression_factor
+
+	import_autoload()
+	if args.factor is not None:
+		build_regression_factor = args.factor
+
+	project = None
+	if not args.all:
+		project = os.path.abspath(os.path.expanduser(args.project)) if args.project is not None else system_project_path
+	stats = BuildHistory.get_stats(get_build_history().load(project), build_regression_factor)
+	if args.json:
+		print(json.dumps(stats, indent=4))
+	else:
+		print("\n".join(format_build_stats(stats)))
+
+	return 0
+
+# Removes build files and / or asset caches (see clean_build_files()) w/o the interactive UI.
+def headless_clean(args):
+	history = ConsoleHistory()
+	if not headless_setup(args, history, False):
+		return 1
+
+	clean_build_files(args.scope, history)
+	return 0
+
+# Checks that the project would build (see validate_build()) w/o starting WINE.
+def headless_validate(args):
+	history = ConsoleHistory()
+	if not headless_setup(args, history):
+		return 1
+
+	time_start = time.time()
+	if not get_is_build_valid(history):
+		return 1
+	history.append("{} ({} / {}) is ready to build, checked in {:.0f}ms".format(system_project_name, wine_gm_runtime, wine_gm_config, (time.time() - time_start) * 1000))
+
+	return 0
+
+# Builds every requested runtime / config combination w/o curses and prints a summary.
+def headless_matrix(args):
+	history = ConsoleHistory()
+	if not headless_setup(args, history, args.runtimes is None):
+		return 1
+
+	runtimes = [wine_gm_runtime] if args.runtimes is None else args.runtimes.split(",")
+	configs = [wine_gm_config] if args.configs is None else args.configs.split(",")
+	runtime_list = get_runtime_list()
+	for runtime in runtimes:
+		if not runtime in runtime_list:
+			history.append("[!] runtime '{}' not found, available runtimes: {}".format(runtime, ", ".join(runtime_list)))
+			return 1
+
+	config_list = [get_config_name(entry) for entry in get_config_list()]
+	for config in configs:
+		if not config in config_list:
+			history.append("[!] config '{}' not found, available configs: {}".format(config, ", ".join(config_list)))
+			return 1
+
+	prefixes = None
+	if args.prefixes is not None:
+		prefixes = [os.path.abspath(os.path.expanduser(prefix)) for prefix in args.prefixes.split(",")]
+
+	targets = [BuildTarget(runtime, config) for runtime in runtimes for config in configs]
+	matrix = BuildMatrix(targets, args.jobs, prefixes, args.action)
+	matrix.start(history)
+	while not matrix.get_is_done():
+		for message in matrix.poll():
+			history.append(message)
+		time.sleep(0.1)
+	for message in matrix.poll():
+		history.append(message)
+
+	if not matrix.is_isolated:
+		subprocess.run(["env WINEPREFIX=\"{}\" wineserver -k".format(wine_path)], shell=True,stdout=subprocess.PIPE,stderr=subprocess.PIPE)
+
+	print("\n".join(matrix.get_summary()))
+	return matrix.get_exit_code()
+
+DAEMON_CLIENT_BUFFER = 4 << 20	# Bytes of unsent output a client may lag behind before it is dropped
+DAEMON_QUEUE_LENGTH = 4	# Build requests that may wait behind the running one
+
+# Returns the path of the daemon's socket; under $XDG_RUNTIME_DIR if there is one, else /tmp.
+def get_daemon_socket_path():
+	root = os.environ.get("XDG_RUNTIME_DIR", "")
+	if len(root) == 0 or not os.path.isdir(root):
+		return "/tmp/gmbuild-{}.sock".format(os.getuid())
+
+	return os.path.join(root, "gmbuild.sock")
+
+# Encodes a daemon message; every message is a single line of JSON.
+def format_daemon_message(message):
+	return (json.dumps(message) + "\n").encode("utf-8")
+
+# A connection to the daemon. Requests are read line by line; replies and events are buffered
+# until the socket takes them so a slow client never blocks the daemon.
+class DaemonClient:
+	def __init__(self, sock):
+		self.sock = sock
+		self.read_buffer = b""
+		self.write_buffer = bytearray()
+		self.is_subscribed = False	# Receives build output and status messages
+
+	def send(self, message):
+		self.write_buffer += format_daemon_message(message)
+
+# Keeps the resolved prefix, runtime, project and caches in memory and runs builds on request.
+# Clients connect to a Unix domain socket and send one JSON object per line:
+# 	{"id": any, "command": "build" | "run" | "kill" | "status" | "subscribe" | "unsubscribe" | "shutdown", ...}
+# Every request gets {"event": "reply", "id": ..., "ok": bool, ...} ("error" says why a request
+# failed). "build" takes an Igor "action" (default: Run), "run" launches the last build's .win w/
+# the Runner. While a build runs, further ones are rejected unless "mode" is "queue" (wait behind
+# it) or "replace" (kill it). "follow" subscribes the client, which then receives
+# 	{"event": "line", "job": n, "tag": ..., "text": ...}	Igor / game output
+# 	{"event": "message", "text": ...}	status messages
+# 	{"event": "started", "job": n, ...} and {"event": "finished", "job": n, "code": ...}
+# 	{"event": "report", "job": n, "phases": [...], "issues": [...], ...}	see IgorLog.get_json()
+# where the code is null for killed builds.
+class BuildDaemon:
+	def __init__(self, path):
+		self.path = path
+		self.selector = selectors.DefaultSelector()
+		self.server = None
+		self.clients = []
+		self.pump = OutputPump()
+		self.build = None	# Running WineBuild
+		self.job = None	# Request the build was started for
+		self.queue = []	# Requests waiting for the build to finish
+		self.job_count = 0
+		self.last_job = None	# Last finished request
+		self.time_start = time.time()
+		self.is_running = True
+
+	# Opens the socket (only accessible by the user); returns False if another daemon answers on it
+	def listen(self):
+		if os.path.exists(self.path):
+			probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			try:
+				probe.connect(self.path)
+				return False
+			except OSError:
+				os.unlink(self.path) # Left behind by a daemon that didn't shut down cleanly
+			finally:
+				probe.close()
+
+		self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		umask = os.umask(0o177)
+		try:
+			self.server.bind(self.path)
+		finally:
+			os.umask(umask)
+		self.server.listen(8)
+		self.server.setblocking(False)
+		self.selector.register(self.server, selectors.EVENT_READ, None)
+		return True
+
+	# Stands in for the output history: status messages are logged and sent to subscribers
+	def append(self, line):
+		print(line, file=sys.stderr, flush=True)
+		self.broadcast({"event" : "message", "text" : line})
+
+	def broadcast(self, message):
+		for client in self.clients:
+			if client.is_subscribed:
+				client.send(message)
+
+	def get_status(self):
+		state = "idle"
+		if self.build is not None:
+			state = ("building", "running")[self.build.is_timed]
+
+		return {
+			"state" : state,
+			"job" : self.job,
+			"queue" : self.queue,
+			"last" : self.last_job,
+			"prefix" : wine_path,
+			"runtime" : wine_gm_runtime,
+			"config" : wine_gm_config,
+			"project" : system_project_path,
+			"persistent_server" : wine_persistent_server,
+			"uptime" : round(time.time() - self.time_start, 1),
+		}
+
+	# Starts the build for a request; returns False (w/ the reason sent to subscribers) on failure
+	def start(self, job):
+		self.build = WineBuild(self, self.pump, action=job["action"], is_stderr_read=False, is_launched=job["command"] == "run")
+		self.job = job
+		job["time_start"] = time.time()
+		self.broadcast({"event" : "started", "job" : job["job"], "command" : job["command"], "action" : job["action"]})
+		if not self.build.start():
+			self.finish(None)
+			return False
+
+		return True
+
+	# Wraps up the running build and starts the next queued one
+	def finish(self, code):
+		job = self.job
+		job["code"] = code
+		job["duration"] = round(time.time() - job.pop("time_start"), 2)
+		self.last_job = job
+		self.build = None
+		self.job = None
+		self.broadcast({"event" : "finished", "job" : job["job"], "code" : code, "duration" : job["duration"]})
+
+		if len(self.queue) > 0:
+			self.start(self.queue.pop(0)) # Moves on through the queue by itself if it fails
+
+	# Sends the build's phase report once it is over
+	def report(self):
+		log = self.build.poll_report()
+		if log is not None:
+			for line in log.get_report():
+				self.append(line)
+			self.broadcast(dict({"event" : "report", "job" : self.job["job"]}, **log.get_json()))
+
+	def kill(self):
+		if self.build is not None:
+			self.build.kill()
+			self.append("{} killed".format(self.build.name))
+			self.finish(None)
+
+	def handle(self, client, request):
+		command = request.get("command")
+		reply = {"event" : "reply", "id" : request.get("id"), "ok" : True}
+		if request.get("follow", False) or command == "subscribe":
+			client.is_subscribed = True
+
+		if command == "build" or command == "run":
+			mode = request.get("mode", "reject")
+			self.job_count += 1
+			job = {"job" : self.job_count, "command" : command, "action" : str(request.get("action", "Run"))}
+			reply["job"] = job["job"]
+			if self.build is None:
+				reply["ok"] = self.start(job)
+			elif mode == "replace":
+				self.queue.insert(0, job) # Started as soon as the running build is killed
+				self.kill()
+				reply["ok"] = self.job is job
+			elif mode == "queue" and len(self.queue) < DAEMON_QUEUE_LENGTH:
+				self.queue.append(job)
+				reply["queued"] = len(self.queue)
+			else:
+				reply["ok"] = False
+				reply["error"] = ("busy", "queue full")[mode == "queue"]
+
+			if not reply["ok"] and not "error" in reply:
+				reply["error"] = "failed to start"
+		elif command == "kill":
+			reply["ok"] = self.build is not None
+			self.queue = []
+			self.kill()
+			if not reply["ok"]:
+				reply["error"] = "nothing running"
+		elif command == "status":
+			reply.update(self.get_status())
+		elif command == "unsubscribe":
+			client.is_subscribed = False
+		elif command == "shutdown":
+			self.is_running = False
+		elif command != "subscribe":
+			reply["ok"] = False
+			reply["error"] = "unknown command '{}'".format(command)
+
+		client.send(reply)
+
+	def accept(self):
+		try:
+			sock, address = self.server.accept()
+		except BlockingIOError:
+			return
+
+		sock.setblocking(False)
+		client = DaemonClient(sock)
+		self.clients.append(client)
+		self.selector.register(sock, selectors.EVENT_READ, client)
+
+	def drop(self, client):
+		self.selector.unregister(client.sock)
+		client.sock.close()
+		self.clients.remove(client)
+
+	def read(self, client):
+		try:
+			chunk = client.sock.recv(65536)
+		except BlockingIOError:
+			return
+		except OSError:
+			chunk = b""
+
+		if len(chunk) == 0:
+			self.drop(client)
+			return
+
+		lines = (client.read_buffer + chunk).split(b"\n")
+		client.read_buffer = lines.pop()
+		for line in lines:
+			if len(line.strip()) == 0:
+				continue
+			try:
+				request = json.loads(line)
+				if not isinstance(request, dict):
+					raise ValueError
+			except ValueError:
+				client.send({"event" : "reply", "id" : None, "ok" : False, "error" : "malformed request"})
+				continue
+			self.handle(client, request)
+
+	# Sends whatever the clients' sockets take, dropping clients that fell too far behind
+	def flush(self):
+		for client in list(self.clients):
+			if len(client.write_buffer) > 0:
+				try:
+					sent = client.sock.send(client.write_buffer)
+					del client.write_buffer[:sent]
+				except BlockingIOError:
+					pass
+				except OSError:
+					self.drop(client)
+					continue
+
+			if len(client.write_buffer) > DAEMON_CLIENT_BUFFER:
+				self.drop(client)
+				continue
+
+			events = selectors.EVENT_READ
+			if len(client.write_buffer) > 0:
+				events |= selectors.EVENT_WRITE
+			if self.selector.get_key(client.sock).events != events:
+				self.selector.modify(client.sock, events, client)
+
+	def run(self):
+		while self.is_running:
+			# Only wake up periodically while there is a build to watch:
+			timeout = None
+			if self.build is not None:
+				timeout = 0.05
+
+			for key, mask in self.selector.select(timeout):
+				if key.data is None:
+					self.accept()
+				elif mask & selectors.EVENT_READ and key.data in self.clients:
+					self.read(key.data)
+
+			event = self.pump.get(0)
+			while event is not None:
+				tag, kind, value = event
+				if kind == "line":
+					text = self.build.on_line(tag, value) if self.build is not None else IgorLog.decode(value)
+					self.broadcast({"event" : "line", "job" : (self.job or {}).get("job"), "tag" : tag, "text" : text})
+				elif self.build is not None and self.build.on_exit(tag, value):
+					self.append("{} exited w/ code {}".format(self.build.name, value))
+					self.report()
+					self.finish(value)
+				event = self.pump.get(0)
+
+			if self.build is not None:
+				build_time = self.build.poll()
+				if build_time is not None:
+					self.append("build took {}".format(self.build.get_timing(build_time)))
+
+				self.report()
+
+			self.flush()
+
+	def close(self):
+		self.queue = []
+		self.kill()
+		self.flush()
+		for client in list(self.clients):
+			self.drop(client)
+		if self.server is not None:
+			self.selector.unregister(self.server)
+			self.server.close()
+			os.unlink(self.path)
+		self.selector.close()
+		self.pump.terminate()
+
+# Resolves the settings once and serves build requests until shut down (see BuildDaemon).
+def headless_daemon(args):
+	history = ConsoleHistory()
+	if not headless_setup(args, history):
+		return 1
+
+	daemon = BuildDaemon(os.path.abspath(os.path.expanduser(args.socket or get_daemon_socket_path())))
+	if not daemon.listen():
+		history.append("[!] a daemon is already listening on {}".format(daemon.path))
+		return 1
+
+	# Shut down cleanly (killing the running build) when stopped by the system:
+	signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+	history.append("listening on {}".format(daemon.path))
+	try:
+		daemon.run()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		daemon.close()
+
+	return 0
+
+# Sends one request to the daemon and prints the reply. W/ --follow the build's output is streamed
+# to stdout until it finishes, and its exit code is returned.
+def headless_client(args):
+	path = os.path.abspath(os.path.expanduser(args.socket or get_daemon_socket_path()))
+	sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	try:
+		sock.connect(path)
+	except OSError as error:
+		print("[!] failed to connect to the daemon at {}: {}".format(path, error.strerror), file=sys.stderr)
+		return 1
+
+	request = {"id" : 1, "command" : args.request, "follow" : args.follow and args.request != "status"}
+	if args.request == "build":
+		request["action"] = args.action
+	if args.queue:
+		request["mode"] = "queue"
+	elif args.replace:
+		request["mode"] = "replace"
+	sock.sendall(format_daemon_message(request))
+
+	job = None
+	exit_code = 0
+	file = sock.makefile("rb")
+	try:
+		for line in file:
+			message = json.loads(line)
+			event = message.get("event")
+			if event == "reply" and message.get("id") == 1:
+				if not message["ok"]:
+					print("[!] {}".format(message.get("error")), file=sys.stderr)
+					return 1
+				if args.request == "status":
+					print(json.dumps(message, indent=4))
+				elif "queued" in message:
+					print("queued at position {}".format(message["queued"]), file=sys.stderr)
+				job = message.get("job")
+				if not request["follow"] or job is None:
+					break
+			elif event == "line":
+				sys.stdout.buffer.write((message["text"] + "\n").encode("utf-8"))
+				sys.stdout.buffer.flush()
+			elif event == "message":
+				print(message["text"], file=sys.stderr, flush=True)
+			elif event == "finished" and message["job"] == job:
+				exit_code = message["code"] if message["code"] is not None else 1
+				break
+	except KeyboardInterrupt:
+		pass
+	finally:
+		file.close()
+		sock.close()
+
+	return exit_code
+
+def get_argument_parser():
+	parser = argparse.ArgumentParser(prog="gmbuild-cli.py", description="Compile GameMaker projects through WINE. Starts the interactive UI if no command is given.")
+	parser.add_argument("--profile", metavar="PREFIX", help="profile the tool itself; writes cProfile stats to PREFIX.prof and timing spans to PREFIX.trace.json (Chrome trace events)")
+	subparsers = parser.add_subparsers(dest="command")
+
+	# Settings shared by every headless command; anything not given falls back to ~/.gmbuild_autoload
+	settings_parser = argparse.ArgumentParser(add_help=False)
+	settings_parser.add_argument("--project", help="path to the project's .yyp")
+	settings_parser.add_argument("--runtime", help="runtime folder name, e.g., runtime-2.3.7.606")
+	settings_parser.add_argument("--config", help="project config to build")
+	settings_parser.add_argument("--prefix", help="WINE prefix GameMaker is installed in")
+	settings_parser.add_argument("--drive", help="WINE drive letter mapped to the file system root (default: Z)")
+	settings_parser.add_argument("--debug", action="store_true", help="compile w/ debugging enabled")
+	settings_parser.add_argument("--print-errors", action="store_true", help="pass wineserver errors through to stderr")
+	settings_parser.add_argument("--persistent-server", action="store_true", help="keep a wineserver running for the prefix between builds (only Igor / the game are stopped)")
+	settings_parser.add_argument("--cache-budget", type=float, metavar="GIB", help="disk space the asset caches may take up before the least recently used are evicted (default: 10)")
+
+	build_parser = subparsers.add_parser("build", parents=[settings_parser], help="build the project w/o the interactive UI")
+	build_parser.add_argument("--existing", action="store_true", help="use the first build.bff found in the prefix")
+	build_parser.add_argument("--action", default="Run", help="Igor action to perform (default: Run)")
+	build_parser.add_argument("--watch", action="store_true", help="rebuild whenever a project file changes, until interrupted; exits w/ the last build's code (130 if it was still building)")
+	build_parser.add_argument("--instances", type=int, default=1, metavar="N", help="run N game instances once the build's game is up, each w/ its output tagged (max: {})".format(INSTANCE_MAX))
+	build_parser.add_argument("--report-json", metavar="PATH", help="write the per-phase timings and errors / warnings of the build as JSON ('-' for stderr)")
+
+	matrix_parser = subparsers.add_parser("matrix", parents=[settings_parser], help="build several configs / runtimes at once")
+	matrix_parser.add_argument("--configs", help="comma-separated configs to build (default: --config)")
+	matrix_parser.add_argument("--runtimes", help="comma-separated runtimes to build w/ (default: --runtime)")
+	matrix_parser.add_argument("--jobs", type=int, default=0, help="maximum concurrent builds (default and cap: CPU core count)")
+	matrix_parser.add_argument("--prefixes", help="comma-separated, already initialized WINE prefixes; each running build gets one to itself")
+	matrix_parser.add_argument("--action", default="PackageZip", help="Igor action to perform (default: PackageZip)")
+
+	daemon_parser = subparsers.add_parser("daemon", parents=[settings_parser], help="keep the settings resolved in memory and serve build requests over a Unix socket")
+	daemon_parser.add_argument("--socket", help="socket path (default: $XDG_RUNTIME_DIR/gmbuild.sock or /tmp/gmbuild-UID.sock)")
+
+	clean_parser = subparsers.add_parser("clean", parents=[settings_parser], help="remove build files and / or asset caches")
+	clean_parser.add_argument("scope", nargs="?", choices=CLEAN_SCOPES, default="build", help="build: build files only, cache: the project's asset caches, all: both and every other project's caches (default: build)")
+
+	subparsers.add_parser("validate", parents=[settings_parser], help="check the project, config, runtime and login data w/o building")
+
+	stats_parser = subparsers.add_parser("stats", help="show build time statistics and flag slow builds")
+	stats_parser.add_argument("--project", help="path to the project's .yyp (default: from the autoload)")
+	stats_parser.add_argument("--all", action="store_true", help="show every project")
+	stats_parser.add_argument("--factor", type=float, help="flag builds this many times slower than the rolling median (default: 1.5)")
+	stats_parser.add_argument("--json", action="store_true", help="print the statistics as JSON")
+
+	client_parser = subparsers.add_parser("client", help="send a request to a running daemon")
+	client_parser.add_argument("request", choices=["build", "run", "kill", "status", "shutdown"], help="build the project, run the last build, kill the running build, print the daemon's state or stop it")
+	client_parser.add_argument("--action", default="Run", help="Igor action to perform (default: Run)")
+	client_parser.add_argument("--follow", action="store_true", help="stream the build's output and return its exit code")
+	client_parser.add_argument("--queue", action="store_true", help="wait behind a running build instead of failing")
+	client_parser.add_argument("--replace", action="store_true", help="kill a running build instead of failing")
+	client_parser.add_argument("--socket", help="socket path of the daemon")
+
+	return parser
+
+# Runs the tool under cProfile w/ timing spans collected (see Profiler). The cProfile stats go to
+# PREFIX.prof (see 'python3 -m pstats') and the spans to PREFIX.trace.json, even if interrupted.
+def run_profiled(args):
+	global profiler
+	import cProfile
+	import pstats
+
+	profiler = Profiler()
+	profile = cProfile.Profile()
+	profile.enable()
+	try:
+		with ProfileSpan("main", {"command" : args.command or "ui"}):
+			return run(args)
+	finally:
+		profile.disable()
+		prefix = os.path.expanduser(args.profile)
+		profile.dump_stats(prefix + ".prof")
+		with open(prefix + ".trace.json", "w") as file:
+			json.dump(profiler.get_trace(), file)
+		pstats.Stats(profile, stream=sys.stderr).sort_stats("cumulative").print_stats(PROFILE_TOP)
+		print("profile written to {0}.prof (python3 -m pstats {0}.prof), spans to {0}.trace.json (chrome://tracing)".format(prefix), file=sys.stderr)
+
 def main():
+	args = get_argument_parser().parse_args()
+	if args.profile is not None:
+		return run_profiled(args)
+
+	return run(args)
+
+def run(args):
 	global system_user
+	global curses
+
+	if args.command == "client":
+		return headless_client(args) # Only talks to the daemon, which already checked everything
 
-	result = subprocess.run(["printf $USER"],shell=True,stdout=subprocess.PIPE)
-	if result.returncode != 0:
+	system_user = os.environ.get("USER", "")
+	if len(system_user) == 0:
 		print("Failed to fetch system user name, exiting...")
-		return
+		return 1
 
-	system_user = str(result.stdout)[2:-1]
+	if args.command == "stats":
+		return headless_stats(args) # Only reads the build history
 
 	# Check that we have required tools installed:
 	bashscript = "if ! hash wine; then exit 1; else exit 0; fi"
 	if subprocess.run([bashscript],shell=True).returncode != 0:
 		print ("WINE is not installed, exiting...")
-		return
+		return 1
+
+	if args.command == "build":
+		return headless_build(args)
+	elif args.command == "matrix":
+		return headless_matrix(args)
+	elif args.command == "validate":
+		return headless_validate(args)
+	elif args.command == "clean":
+		return headless_clean(args)
+	elif args.command == "daemon":
+		return headless_daemon(args)
 
 	# Start curses:
+	import curses
 	curses.wrapper(curses_main)
+	return 0
 
 if __name__ == "__main__":
 	try:
-		main()
+		sys.exit(main())
 	except KeyboardInterrupt:
 		subprocess.run(["wineserver -k"],shell=True) # Kill any WINE processes just in case
 		sys.exit(0)